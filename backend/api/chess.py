@@ -1,25 +1,44 @@
+import io
 import logging
-import math
 import sys
-from collections import Counter, defaultdict
+import tempfile
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
-from cachetools import TTLCache
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import JSON
 
 from core.auth import get_current_user
 from db.models import User, UserGame
-from db.repositories import UserGameRepository
-from db.dependencies import get_user_game_repository
+from db.repositories import (
+    UserGameRepository, GameMoveRepository, MistakeIndexRepository, ExplorerRepository, GamePositionRepository,
+    ImportJobRepository, AnalysisJobRepository,
+)
+from db.dependencies import (
+    get_user_game_repository, get_game_move_repository, get_mistake_index_repository, get_explorer_repository,
+    get_game_position_repository, get_import_job_repository, get_analysis_job_repository,
+)
 from schema import (
     FetchGamesRequest, GameResponse, ListGamesResponse, AnalysedGame,
-    CommonMistake, CommonMistakesResponse, Timeframe,
+    CommonMistake, CommonMistakesResponse, Timeframe, ImportJobResponse,
+    GameType, PgnImportResponse, ExplorerMoveStats, ExplorerResponse, GameSearchHit, GameSearchResponse,
+    EnqueueAnalysisRequest, AnalysisQueueResponse, AnalysisEnqueueResponse, AnalysisCancelResponse,
+    AnalysedGamesBatch, BatchAnalysisStatus, BatchAnalysisResponse,
 )
 from schema.chess_response import MistakeGame
-from services.chess_com import fetch_chess_com_games
+from services.analysis_jobs import PRIORITY_OPEN, enqueue_analysis
+from services.game_analysis import save_game_analysis, save_games_analysis
+from services.import_jobs import game_types_key, submit_import_job
+from services.pagination import InvalidCursor, decode_cursor, paginate
+from services.pgn_import import import_pgn_games
+from services.position_index import parse_material
+from services.position_keys import position_key
+
+# Uploaded PGN is spooled in memory up to this size, then to a temp file
+PGN_SPOOL_MAX_BYTES = 8 * 1024 * 1024
 
 TIMEFRAME_MONTHS = {
     "3_months": 3,
@@ -28,24 +47,11 @@ TIMEFRAME_MONTHS = {
     "10_years": 120,
 }
 
-OPENING_WC_THRESHOLD = 0.2
-ENDGAME_WC_THRESHOLD = 0.2
-OPENING_MAX_MOVE = 12
-ENDGAME_LAST_HALF_MOVES = 40  # 20 full moves
-
-
-def _cp_to_wc(cp: float) -> float:
-    """Convert centipawns to winning chances [-1, 1] using Lichess sigmoid."""
-    return 2.0 / (1.0 + math.exp(-0.00368208 * cp)) - 1.0
-
-
-def _eval_to_wc(evaluation: dict) -> float:
-    """Convert an eval dict {type, value} to winning chances."""
-    if not evaluation:
-        return 0.0
-    if evaluation.get("type") == "mate":
-        return 1.0 if evaluation.get("value", 0) > 0 else -1.0
-    return _cp_to_wc(evaluation.get("value", 0))
+COMMON_MISTAKES_LIMIT = 20
+GAMES_PAGE_SIZE = 500
+GAMES_MAX_PAGE_SIZE = 1000
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
 
 
 def _timeframe_to_min_end_time(timeframe: Optional[str]) -> Optional[int]:
@@ -65,10 +71,18 @@ def _timeframe_to_min_end_time(timeframe: Optional[str]) -> Optional[int]:
     cutoff = datetime(year, month, day, tzinfo=timezone.utc)
     return int(cutoff.timestamp())
 
+def _cursor_key(cursor: Optional[str], types) -> Optional[tuple]:
+    """The sort key in a list endpoint's `cursor` parameter, or a 400."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, types)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 logger = logging.getLogger(__name__)
 
-# Cache fetch results per (user_id, username, timeframe, game_types) for 5 min
-_fetch_cache: TTLCache = TTLCache(maxsize=128, ttl=300)
 
 router = APIRouter(tags=["games"])
 
@@ -79,16 +93,32 @@ router = APIRouter(tags=["games"])
 def list_games(
     timeframe: Optional[str] = Query(None, description="Filter by timeframe: 3_months, 1_year, 5_years, 10_years"),
     time_class: Optional[str] = Query(None, description="Filter by time control: rapid, blitz, bullet"),
+    include_pgn: bool = Query(False, description="Include each game's PGN"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(GAMES_PAGE_SIZE, ge=1, le=GAMES_MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     user_game_repo: UserGameRepository = Depends(get_user_game_repository),
 ):
-    """Return all stored games for the current user, optionally filtered by timeframe and time class."""
-    min_end_time = _timeframe_to_min_end_time(timeframe)
-    games = user_game_repo.get_by_user_id(current_user.id, limit=1000, min_end_time=min_end_time, time_class=time_class)
-    return ListGamesResponse(
-        games=[GameResponse.model_validate(g) for g in games],
-        total=len(games),
+    """Return a page of the current user's games, newest first, optionally filtered by timeframe and time class.
+
+    Only the columns in GameResponse are read (the PGN only with include_pgn),
+    and the response is serialised straight from the rows: a big account's
+    list is thousands of games, and neither the stored analysis nor per-game
+    validation is needed to list them. Pages are read from an index starting
+    at the cursor's key, so a deep page costs the same as the first.
+    """
+    columns = [name for name in GameResponse.model_fields if include_pgn or name != "pgn"]
+    rows = user_game_repo.get_list_rows(
+        current_user.id, columns, limit=limit + 1, after=_cursor_key(cursor, (int, UUID)),
+        min_end_time=_timeframe_to_min_end_time(timeframe), time_class=time_class,
+    )
+    page, next_cursor = paginate(rows, limit, lambda row: (row.end_time, row.game_id))
+    response = ListGamesResponse.model_construct(
+        games=[GameResponse.model_construct(**row._mapping) for row in page],
+        total=len(page),
+        next_cursor=next_cursor,
     )
+    return Response(response.model_dump_json(), media_type="application/json")
 
 
 @router.get("/games/common-mistakes", response_model=CommonMistakesResponse)
@@ -97,105 +127,175 @@ def get_common_mistakes(
     time_class: Optional[str] = Query(None, description="Filter by time control: rapid, blitz, bullet"),
     current_user: User = Depends(get_current_user),
     user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    mistake_index_repo: MistakeIndexRepository = Depends(get_mistake_index_repository),
 ):
-    """Compute common opening and endgame mistakes from analysed games."""
+    """Return the user's most repeated opening and endgame mistakes from the mistake index."""
     min_end_time = _timeframe_to_min_end_time(timeframe)
-    games = user_game_repo.get_analysed_by_user_id(current_user.id, min_end_time=min_end_time, time_class=time_class)
-
-    opening_map: dict[str, list] = defaultdict(list)
-    endgame_map: dict[str, list] = defaultdict(list)
-
-    for game in games:
-        analysis = game.analysed_game
-        if not analysis or "moves" not in analysis:
-            continue
-
-        moves = analysis["moves"]
-        total_half_moves = len(moves)
-        username = (game.chess_com_username or "").lower()
-        user_side = "white" if (game.white_username or "").lower() == username else "black"
-
-        for i, move in enumerate(moves):
-            if move.get("side") != user_side:
-                continue
-
-            eval_before = move.get("eval_before")
-            eval_after = move.get("eval_after")
-            if not eval_before or not eval_after:
-                continue
-
-            wc_before = _eval_to_wc(eval_before)
-            wc_after = _eval_to_wc(eval_after)
-            wc_loss = (wc_before - wc_after) if user_side == "white" else (wc_after - wc_before)
-            wc_loss = max(0.0, wc_loss)
-
-            fen = move.get("fen_before")
-            if not fen:
-                continue
-
-            entry = {
-                "played_move": move.get("san", ""),
-                "best_move": move.get("best_move", ""),
-                "wc_loss": round(wc_loss, 3),
-                "game_id": str(game.game_id),
-                "half_move_index": i,
-            }
-
-            move_number = move.get("move_number", i // 2 + 1)
-            if move_number <= OPENING_MAX_MOVE and wc_loss >= OPENING_WC_THRESHOLD:
-                opening_map[fen].append(entry)
-
-            if i >= total_half_moves - ENDGAME_LAST_HALF_MOVES and wc_loss >= ENDGAME_WC_THRESHOLD:
-                endgame_map[fen].append(entry)
-
-    def build_mistakes(mistake_map: dict[str, list]) -> list[CommonMistake]:
-        results = []
-        for fen, occurrences in mistake_map.items():
-            if len(occurrences) < 2:
-                continue
-            most_common_move = Counter(o["played_move"] for o in occurrences).most_common(1)[0][0]
-            matching = [o for o in occurrences if o["played_move"] == most_common_move]
-            results.append(CommonMistake(
-                fen=fen,
-                played_move=most_common_move,
-                best_move=matching[0]["best_move"] or None,
-                avg_wc_loss=round(sum(o["wc_loss"] for o in matching) / len(matching), 3),
-                count=len(matching),
-                games=[
-                    MistakeGame(game_id=UUID(o["game_id"]), half_move_index=o["half_move_index"])
-                    for o in matching[:3]
-                ],
-            ))
-        results.sort(key=lambda m: m.count, reverse=True)
-        return results[:20]
+    total_analysed = user_game_repo.count_analysed_by_user_id(
+        current_user.id, min_end_time=min_end_time, time_class=time_class,
+    )
+    rows = mistake_index_repo.get_common_mistakes(
+        current_user.id,
+        limit=COMMON_MISTAKES_LIMIT,
+        min_end_time=min_end_time,
+        time_class=time_class,
+    )
+
+    mistakes: dict[str, list[CommonMistake]] = defaultdict(list)
+    for row in rows:
+        mistakes[row.phase].append(CommonMistake(
+            fen=row.fen,
+            played_move=row.played_move,
+            best_move=row.refs[0][3] or None,
+            avg_wc_loss=round(row.wc_loss_sum / row.count, 3),
+            count=row.count,
+            games=[
+                MistakeGame(game_id=UUID(game_id), half_move_index=index)
+                for _, game_id, index, *_ in row.refs
+            ],
+        ))
 
     return CommonMistakesResponse(
-        opening_mistakes=build_mistakes(opening_map),
-        endgame_mistakes=build_mistakes(endgame_map),
-        total_analysed=len(games),
+        opening_mistakes=mistakes["opening"],
+        endgame_mistakes=mistakes["endgame"],
+        total_analysed=total_analysed,
     )
 
 
+@router.get("/games/explorer", response_model=ExplorerResponse)
+def get_explorer(
+    fen: str = Query(..., description="Position to look up; move counters are ignored"),
+    color: Optional[str] = Query(None, pattern="^(white|black)$", description="Only games where you had this colour"),
+    current_user: User = Depends(get_current_user),
+    explorer_repo: ExplorerRepository = Depends(get_explorer_repository),
+):
+    """Return how the current user's games continued from a position, and how they scored."""
+    key = position_key(fen)
+    if key is None:
+        raise HTTPException(status_code=400, detail="Invalid FEN")
+    moves = [
+        ExplorerMoveStats(
+            uci=row.uci,
+            san=row.san,
+            games=row.games,
+            wins=row.wins,
+            draws=row.draws,
+            losses=row.losses,
+            avg_eval=round(row.eval_sum / row.eval_count, 1) if row.eval_count else None,
+            avg_wc_loss=round(row.wc_loss_sum / row.wc_loss_count, 3) if row.wc_loss_count else None,
+            analysed=row.eval_count,
+        )
+        for row in explorer_repo.get_moves(current_user.id, key, color)
+    ]
+    return ExplorerResponse(fen=fen, games=sum(move.games for move in moves), moves=moves)
+
+
+@router.get("/games/search", response_model=GameSearchResponse)
+def search_games(
+    fen: Optional[str] = Query(None, description="Games that reached this position; move counters are ignored"),
+    material: Optional[str] = Query(
+        None, description="Games that reached this material, White first, e.g. KRPPvKRP or KRvKR",
+    ),
+    any_pawns: bool = Query(False, description="Match `material` with any number of pawns"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    position_repo: GamePositionRepository = Depends(get_game_position_repository),
+):
+    """Return the current user's games that reached a position and/or material balance, newest first."""
+    if fen is None and material is None:
+        raise HTTPException(status_code=400, detail="Pass a fen or a material signature")
+    key = None
+    if fen is not None:
+        key = position_key(fen)
+        if key is None:
+            raise HTTPException(status_code=400, detail="Invalid FEN")
+    signature = white_pawns = black_pawns = None
+    if material is not None:
+        parsed = parse_material(material)
+        if parsed is None:
+            raise HTTPException(status_code=400, detail="Invalid material signature")
+        signature, white_pawns, black_pawns = parsed
+        if any_pawns:
+            white_pawns = black_pawns = None
+
+    rows = position_repo.search_games(
+        current_user.id,
+        position_key=key,
+        material=signature,
+        white_pawns=white_pawns,
+        black_pawns=black_pawns,
+        before=_cursor_key(cursor, (int, UUID)),
+        limit=limit + 1,
+    )
+    page, next_cursor = paginate(rows, limit, lambda row: (row.end_time or 0, row.game_id))
+    return GameSearchResponse(games=[GameSearchHit.model_validate(row) for row in page], next_cursor=next_cursor)
+
+
 @router.get("/games/{game_id}", response_model=GameResponse)
 def get_game(
     game_id: UUID,
     current_user: User = Depends(get_current_user),
     user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    analysis_job_repo: AnalysisJobRepository = Depends(get_analysis_job_repository),
 ):
-    """Return a single game by ID, if it belongs to the current user."""
+    """Return a single game by ID, if it belongs to the current user.
+
+    A queued analysis of the game is moved to the front of the queue, since
+    the user is looking at it.
+    """
     game = user_game_repo.get_by_game_id(game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     if game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this game")
+    if not game.is_analysed:
+        analysis_job_repo.prioritise(current_user.id, game_id, PRIORITY_OPEN)
     return GameResponse.model_validate(game)
 
+# Declared before PATCH /games/{game_id}, which would otherwise match it
+@router.patch("/games/analysis:batch", response_model=BatchAnalysisResponse)
+def patch_games_analysis(
+        batch: AnalysedGamesBatch,
+        current_user: User = Depends(get_current_user),
+        user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+        game_move_repo: GameMoveRepository = Depends(get_game_move_repository),
+        mistake_index_repo: MistakeIndexRepository = Depends(get_mistake_index_repository),
+        explorer_repo: ExplorerRepository = Depends(get_explorer_repository),
+        position_repo: GamePositionRepository = Depends(get_game_position_repository),
+):
+    """Save several games' analyses in one transaction.
+
+    Each entry is a PATCH /games/{game_id} body plus its game_id. Games that
+    are missing or not yours are reported and skipped; the rest are saved
+    together. If a game appears more than once, its last entry is saved.
+    """
+    bodies = {entry.game_id: entry for entry in batch.games}
+    statuses = save_games_analysis(
+        current_user.id, bodies, user_game_repo, game_move_repo, mistake_index_repo, explorer_repo, position_repo,
+    )
+    results = [
+        BatchAnalysisStatus(
+            game_id=entry.game_id,
+            status=statuses[entry.game_id] if bodies[entry.game_id] is entry else "duplicate",
+        )
+        for entry in batch.games
+    ]
+    return BatchAnalysisResponse(
+        results=results, saved=sum(result.status == "saved" for result in results),
+    )
+
+
 @router.patch("/games/{game_id}", response_model=GameResponse)
 def patch_game(
         game_id: UUID,
         analysis_body: AnalysedGame,
         current_user: User = Depends(get_current_user),
         user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+        game_move_repo: GameMoveRepository = Depends(get_game_move_repository),
+        mistake_index_repo: MistakeIndexRepository = Depends(get_mistake_index_repository),
+        explorer_repo: ExplorerRepository = Depends(get_explorer_repository),
+        position_repo: GamePositionRepository = Depends(get_game_position_repository),
 ):
     game = user_game_repo.get_by_game_id(game_id)
     if not game:
@@ -203,26 +303,26 @@ def patch_game(
     if game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this game")
 
-    game = user_game_repo.update(
-        game.game_id,
-        analysed_game=analysis_body.analysed_game,
-        white_accuracy=analysis_body.white_accuracy,
-        black_accuracy=analysis_body.black_accuracy,
-        user_blunder_count=analysis_body.user_blunder_count,
-        is_analysed=True,
+    game = save_game_analysis(
+        game, analysis_body, user_game_repo, game_move_repo, mistake_index_repo, explorer_repo, position_repo,
     )
 
     return GameResponse.model_validate(game)
 
 
 
-@router.post("/games/import")
+@router.post("/games/import", response_model=ImportJobResponse, status_code=202)
 def fetch_games(
     request: FetchGamesRequest = FetchGamesRequest(),
     current_user: User = Depends(get_current_user),
-    user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    import_job_repo: ImportJobRepository = Depends(get_import_job_repository),
 ):
-    """Fetch games from Chess.com for the current user's linked username and store them."""
+    """Queue a Chess.com import for the current user's linked username.
+
+    Returns the job immediately; poll `GET /games/import/{job_id}` for progress.
+    An identical import that is already queued or running is returned instead
+    of starting a second one.
+    """
     username = (current_user.chess_com_username or "").strip()
     if not username:
         raise HTTPException(
@@ -231,51 +331,137 @@ def fetch_games(
         )
     username = username.lower()
 
-    cache_key = (
-        str(current_user.id),
-        username,
-        request.timeframe,
-        tuple(sorted(request.game_types or [])),
+    job, created = import_job_repo.create_or_get_active(
+        user_id=current_user.id,
+        chess_com_username=username,
+        timeframe=request.timeframe.value,
+        game_types=game_types_key(request.game_types),
     )
-    if cache_key in _fetch_cache:
-        return _fetch_cache[cache_key]
+    if created:
+        submit_import_job(job.job_id)
+    return ImportJobResponse.model_validate(job)
 
-    raw_games = fetch_chess_com_games(
-        username=username,
-        timeframe=request.timeframe,
-        game_types=request.game_types,
-    )
 
-    existing_uuids = user_game_repo.get_existing_chess_com_uuids(current_user.id)
-    new_games = []
-    for game in raw_games:
-        ccuuid = game.chess_com_game_uuid
-        if ccuuid and ccuuid in existing_uuids:
-            continue
-        new_games.append(dict(
+@router.post("/games/import/pgn", response_model=PgnImportResponse)
+async def import_pgn(
+    request: Request,
+    username: Optional[str] = Query(None, description="Player whose games these are; defaults to your Chess.com username"),
+    game_types: Optional[List[GameType]] = Query(None, description="Only import these time classes"),
+    current_user: User = Depends(get_current_user),
+    user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    explorer_repo: ExplorerRepository = Depends(get_explorer_repository),
+    position_repo: GamePositionRepository = Depends(get_game_position_repository),
+):
+    """Import games from a multi-game PGN file sent as the raw request body.
+
+    The body is streamed to a spooled temp file and then scanned game by game,
+    so uploads of any size are handled in bounded memory. Games already stored
+    are skipped.
+    """
+    username = (username or current_user.chess_com_username or "").strip().lower()
+    if not username:
+        raise HTTPException(
+            status_code=400,
+            detail="Pass a username or link a Chess.com username in your profile first",
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=PGN_SPOOL_MAX_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", errors="replace")
+        result = await run_in_threadpool(
+            import_pgn_games,
+            lines,
             user_id=current_user.id,
-            pgn=game.pgn,
-            tcn=game.tcn,
-            chess_com_username=game.chess_com_username or username,
-            chess_com_game_uuid=ccuuid,
-            end_time=game.end_time,
-            time_class=game.time_class,
-            time_control=game.time_control,
-            white_username=game.white_username,
-            black_username=game.black_username,
-            white_result=game.white_result,
-            black_result=game.black_result,
-            white_rating=game.white_rating,
-            black_rating=game.black_rating,
-        ))
-    if new_games:
-        user_game_repo.bulk_create(new_games)
-    added = len(new_games)
-
-    result = {
-        "fetched": len(raw_games),
-        "added": added,
-        "message": f"Added {added} new games (total fetched: {len(raw_games)}).",
-    }
-    _fetch_cache[cache_key] = result
-    return result
+            username=username,
+            user_game_repo=user_game_repo,
+            explorer_repo=explorer_repo,
+            position_repo=position_repo,
+            game_types=game_types,
+        )
+
+    logger.info(
+        "PGN import for user %s: %d games read, %d added in %.2fs (%.0f games/s)",
+        current_user.id, result.games_read, result.added, result.seconds, result.games_per_second,
+    )
+    return PgnImportResponse(
+        games_read=result.games_read,
+        games_added=result.added,
+        games_skipped=result.skipped,
+        seconds=round(result.seconds, 3),
+        games_per_second=round(result.games_per_second, 1),
+    )
+
+
+@router.get("/games/import/{job_id}", response_model=ImportJobResponse)
+def get_import_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    import_job_repo: ImportJobRepository = Depends(get_import_job_repository),
+):
+    """Return the progress of an import job, if it belongs to the current user."""
+    job = import_job_repo.get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this import job")
+    return ImportJobResponse.model_validate(job)
+
+
+def _analysis_queue(user_id: UUID, analysis_job_repo: AnalysisJobRepository) -> AnalysisQueueResponse:
+    return AnalysisQueueResponse(
+        **analysis_job_repo.counts(user_id),
+        queued_ahead=analysis_job_repo.queued_ahead(user_id),
+        total_queued=analysis_job_repo.counts()["queued"],
+    )
+
+
+@router.post("/games/analysis/jobs", response_model=AnalysisEnqueueResponse, status_code=202)
+def enqueue_analysis_jobs(
+    request: EnqueueAnalysisRequest = EnqueueAnalysisRequest(),
+    current_user: User = Depends(get_current_user),
+    analysis_job_repo: AnalysisJobRepository = Depends(get_analysis_job_repository),
+):
+    """Queue server-side analysis of your games (default: all unanalysed).
+
+    Games already queued keep their place unless `open` moves them up. Ids
+    of games that are not yours, or are already analysed (without `force`),
+    are ignored.
+    """
+    enqueued = enqueue_analysis(
+        analysis_job_repo, current_user.id, request.game_ids, open=request.open, force=request.force,
+    )
+    return AnalysisEnqueueResponse(enqueued=enqueued, queue=_analysis_queue(current_user.id, analysis_job_repo))
+
+
+@router.get("/games/analysis/jobs", response_model=AnalysisQueueResponse)
+def get_analysis_queue(
+    current_user: User = Depends(get_current_user),
+    analysis_job_repo: AnalysisJobRepository = Depends(get_analysis_job_repository),
+):
+    """Your analysis jobs by status, and how much of the queue is ahead of them."""
+    return _analysis_queue(current_user.id, analysis_job_repo)
+
+
+@router.delete("/games/analysis/jobs", response_model=AnalysisCancelResponse)
+def cancel_analysis_jobs(
+    current_user: User = Depends(get_current_user),
+    analysis_job_repo: AnalysisJobRepository = Depends(get_analysis_job_repository),
+):
+    """Cancel all your queued and running analysis jobs."""
+    cancelled = analysis_job_repo.cancel(current_user.id)
+    return AnalysisCancelResponse(cancelled=cancelled, queue=_analysis_queue(current_user.id, analysis_job_repo))
+
+
+@router.delete("/games/analysis/jobs/{game_id}", response_model=AnalysisCancelResponse)
+def cancel_analysis_job(
+    game_id: UUID,
+    current_user: User = Depends(get_current_user),
+    analysis_job_repo: AnalysisJobRepository = Depends(get_analysis_job_repository),
+):
+    """Cancel the queued or running analysis of one of your games."""
+    cancelled = analysis_job_repo.cancel(current_user.id, game_id)
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="No active analysis job for this game")
+    return AnalysisCancelResponse(cancelled=cancelled, queue=_analysis_queue(current_user.id, analysis_job_repo))
@@ -0,0 +1,44 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from core.auth import get_current_user
+from core.config import settings
+from db.dependencies import get_position_eval_repository
+from db.models import User
+from db.repositories import PositionEvalRepository
+from schema import EvalLookupRequest, EvalLookupResponse, PositionEvalResult
+from services.eval_cache import LOOKUP_MAX_FENS, cached_result, lookup_fens
+
+logger = logging.getLogger(__name__)
+
+
+router = APIRouter(tags=["evals"])
+
+
+@router.post("/evals/lookup", response_model=EvalLookupResponse)
+def lookup_evals(
+    request: EvalLookupRequest,
+    current_user: User = Depends(get_current_user),
+    eval_repo: PositionEvalRepository = Depends(get_position_eval_repository),
+):
+    """Cached engine evaluations of positions, from every user's analysed games.
+
+    The browser calls this before analysing a game and only runs its own
+    engine on the misses. Evals shallower than `depth` count as misses.
+    """
+    if len(request.fens) > LOOKUP_MAX_FENS:
+        raise HTTPException(status_code=400, detail=f"At most {LOOKUP_MAX_FENS} FENs per lookup")
+    rows = lookup_fens(eval_repo, request.fens, request.depth or settings.ANALYSIS_DEPTH, request.multipv)
+    results = [
+        PositionEvalResult(**cached_result(row, request.multipv), depth=row.depth) if row is not None else None
+        for row in rows
+    ]
+    hits = sum(result is not None for result in results)
+    logger.info("Eval lookup for user %s: %d of %d positions cached", current_user.id, hits, len(results))
+    return EvalLookupResponse(
+        results=results,
+        hits=hits,
+        misses=len(results) - hits,
+        hit_rate=round(hits / len(results), 4) if results else 0.0,
+    )
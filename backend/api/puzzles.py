@@ -1,11 +1,12 @@
+from typing import Any, Iterable
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from core.auth import get_current_user
-from db.dependencies import get_user_game_repository, get_user_puzzle_repository
+from db.dependencies import get_game_move_repository, get_user_game_repository, get_user_puzzle_repository
 from db.models import User, UserGame, UserPuzzle
-from db.repositories import UserGameRepository, UserPuzzleRepository
+from db.repositories import GameMoveRepository, UserGameRepository, UserPuzzleRepository
 from schema import (
     ClassifyPuzzleResponse,
     GeneratePuzzlesResponse,
@@ -13,10 +14,16 @@ from schema import (
     PuzzleCandidateResponse,
     UserPuzzleResponse,
 )
+from services.analysis_codec import game_analysis
+from services.pagination import InvalidCursor, decode_cursor, paginate
 from services.puzzle_candidates import extract_puzzle_candidate
 from services.puzzle_classifier import classify_puzzle_candidate
+from services.puzzle_generation import generate_all_puzzles, puzzle_row
 
 
+PUZZLES_PAGE_SIZE = 100
+PUZZLES_MAX_PAGE_SIZE = 500
+
 router = APIRouter(tags=["puzzles"])
 
 
@@ -38,11 +45,12 @@ def _serialize_user_puzzle(puzzle) -> UserPuzzleResponse:
 
 def _classify_and_store_puzzle(
     game: UserGame,
+    sources: Iterable[Any],
     *,
     current_user: User,
     user_puzzle_repo: UserPuzzleRepository,
 ) -> UserPuzzle:
-    candidate = extract_puzzle_candidate(game)
+    candidate = extract_puzzle_candidate(game, sources)
 
     existing = user_puzzle_repo.get_existing_candidate(
         current_user.id,
@@ -62,20 +70,7 @@ def _classify_and_store_puzzle(
         cp=candidate.cp,
     )
 
-    payload = {
-        "user_id": current_user.id,
-        "game_id": game.game_id,
-        "start_fen": candidate.start_fen,
-        "source_half_move_index": candidate.source_half_move_index,
-        "played_move": candidate.played_move,
-        "best_move": candidate.best_move,
-        "solution_uci": candidate.solution_uci,
-        "cp": candidate.cp,
-        "raw_tags": raw_tags,
-        "normalized_tags": [],
-        "candidate_score": candidate.candidate_score,
-        "status": "classified",
-    }
+    payload = puzzle_row(current_user.id, game, candidate, raw_tags)
 
     return (
         user_puzzle_repo.update(existing.puzzle_id, **payload)
@@ -105,13 +100,21 @@ def _build_classify_response(game: UserGame, puzzle: UserPuzzle) -> ClassifyPuzz
 @router.get("/puzzles", response_model=ListPuzzlesResponse)
 def list_puzzles(
     status: str | None = Query(None, description="Optional status filter"),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(PUZZLES_PAGE_SIZE, ge=1, le=PUZZLES_MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     user_puzzle_repo: UserPuzzleRepository = Depends(get_user_puzzle_repository),
 ):
-    puzzles = user_puzzle_repo.get_by_user_id(current_user.id, limit=500, status=status)
+    try:
+        after = decode_cursor(cursor, (int, UUID, int)) if cursor is not None else None
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    puzzles = user_puzzle_repo.get_by_user_id(current_user.id, limit=limit + 1, after=after, status=status)
+    page, next_cursor = paginate(puzzles, limit, lambda p: (p.end_time, p.game_id, p.source_half_move_index))
     return ListPuzzlesResponse(
-        puzzles=[_serialize_user_puzzle(p) for p in puzzles],
-        total=len(puzzles),
+        puzzles=[_serialize_user_puzzle(p) for p in page],
+        total=len(page),
+        next_cursor=next_cursor,
     )
 
 
@@ -119,35 +122,18 @@ def list_puzzles(
 def generate_puzzles(
     current_user: User = Depends(get_current_user),
     user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    game_move_repo: GameMoveRepository = Depends(get_game_move_repository),
     user_puzzle_repo: UserPuzzleRepository = Depends(get_user_puzzle_repository),
+    force: bool = Query(False, description="Process every analysed game, not only new or re-analysed ones"),
 ):
-    games = user_game_repo.get_analysed_by_user_id(current_user.id)
-    generated = 0
-    skipped = 0
-    failed = 0
-    errors: list[str] = []
-
-    for game in games:
-        try:
-            _classify_and_store_puzzle(
-                game,
-                current_user=current_user,
-                user_puzzle_repo=user_puzzle_repo,
-            )
-            generated += 1
-        except ValueError as exc:
-            skipped += 1
-            errors.append(f"{game.game_id}: {exc}")
-        except Exception as exc:
-            failed += 1
-            errors.append(f"{game.game_id}: {exc}")
-
+    result = generate_all_puzzles(current_user.id, user_game_repo, game_move_repo, user_puzzle_repo, force=force)
     return GeneratePuzzlesResponse(
-        total=len(games),
-        generated=generated,
-        skipped=skipped,
-        failed=failed,
-        errors=errors[:20],
+        total=result.total,
+        generated=result.generated,
+        skipped=result.skipped,
+        failed=result.failed,
+        up_to_date=result.up_to_date,
+        errors=result.errors,
     )
 
 
@@ -170,6 +156,7 @@ def classify_game_puzzle(
     game_id: UUID,
     current_user: User = Depends(get_current_user),
     user_game_repo: UserGameRepository = Depends(get_user_game_repository),
+    game_move_repo: GameMoveRepository = Depends(get_game_move_repository),
     user_puzzle_repo: UserPuzzleRepository = Depends(get_user_puzzle_repository),
 ):
     game = user_game_repo.get_by_game_id(game_id)
@@ -177,12 +164,13 @@ def classify_game_puzzle(
         raise HTTPException(status_code=404, detail="Game not found")
     if game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this game")
-    if not game.is_analysed or not game.analysed_game:
+    if not game.is_analysed or game_analysis(game) is None:
         raise HTTPException(status_code=400, detail="Game must be analyzed before classification")
 
     try:
         puzzle = _classify_and_store_puzzle(
             game,
+            game_move_repo.get_puzzle_sources(current_user.id, game_id=game.game_id),
             current_user=current_user,
             user_puzzle_repo=user_puzzle_repo,
         )
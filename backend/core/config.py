@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,6 +14,20 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str
     JWT_EXPIRATION_MINUTES: int
 
+    # On-disk cache of Chess.com month archives
+    CHESS_COM_CACHE_DIR: str = ".cache/chess_com"
+
+    # Server-side engine analysis (services.engine_analysis). Depth matches the
+    # browser's batch depth; ANALYSIS_NODES, if set, also caps each search.
+    STOCKFISH_PATH: str = "stockfish"
+    ANALYSIS_DEPTH: int = 13
+    ANALYSIS_NODES: Optional[int] = None
+    ANALYSIS_WORKERS: int = 0  # engine processes; 0 for one per core
+    ANALYSIS_HASH_MB: int = 16  # per engine process
+
+    # Puzzle tagging (services.puzzle_generation) runs in a process pool
+    PUZZLE_WORKERS: int = 0  # processes; 0 for one per core
+
     class Config:
         env_file = ".env"
 
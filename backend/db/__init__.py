@@ -1,18 +1,42 @@
 from db.base import Base
-from db.models import User, UserGame, UserPuzzle
+from db.models import (
+    User, UserGame, GameMove, MistakeIndex, ExplorerMove, GamePosition, GameMaterial, UserPuzzle, ImportWatermark,
+    ImportJob, AnalysisJob, PositionEval,
+)
 from db.repository import BaseRepository
-from db.repositories import UserRepository, UserGameRepository, UserPuzzleRepository
+from db.repositories import (
+    UserRepository, UserGameRepository, GameMoveRepository, MistakeIndexRepository, ExplorerRepository,
+    GamePositionRepository, UserPuzzleRepository, ImportWatermarkRepository, ImportJobRepository,
+    AnalysisJobRepository, PositionEvalRepository,
+)
 from db.sessions import get_session, SessionLocal
 
 __all__ = [
     "Base",
     "User",
     "UserGame",
+    "GameMove",
+    "MistakeIndex",
+    "ExplorerMove",
+    "GamePosition",
+    "GameMaterial",
     "UserPuzzle",
+    "ImportWatermark",
+    "ImportJob",
+    "AnalysisJob",
+    "PositionEval",
     "BaseRepository",
     "UserRepository",
     "UserGameRepository",
+    "GameMoveRepository",
+    "MistakeIndexRepository",
+    "ExplorerRepository",
+    "GamePositionRepository",
     "UserPuzzleRepository",
+    "ImportWatermarkRepository",
+    "ImportJobRepository",
+    "AnalysisJobRepository",
+    "PositionEvalRepository",
     "get_session",
     "SessionLocal",
 ]
@@ -3,7 +3,11 @@ from typing import Generator
 from fastapi import Depends
 
 from db.sessions import get_session
-from db.repositories import UserRepository, UserGameRepository, UserPuzzleRepository
+from db.repositories import (
+    UserRepository, UserGameRepository, GameMoveRepository, MistakeIndexRepository, ExplorerRepository,
+    GamePositionRepository, UserPuzzleRepository, ImportWatermarkRepository, ImportJobRepository,
+    AnalysisJobRepository, PositionEvalRepository,
+)
 from sqlalchemy.orm import Session
 
 
@@ -21,8 +25,64 @@ def get_user_game_repository(
     yield UserGameRepository(session)
 
 
+def get_game_move_repository(
+    session: Session = Depends(get_session)
+) -> Generator[GameMoveRepository, None, None]:
+    """Get GameMoveRepository instance."""
+    yield GameMoveRepository(session)
+
+
+def get_mistake_index_repository(
+    session: Session = Depends(get_session)
+) -> Generator[MistakeIndexRepository, None, None]:
+    """Get MistakeIndexRepository instance."""
+    yield MistakeIndexRepository(session)
+
+
+def get_explorer_repository(
+    session: Session = Depends(get_session)
+) -> Generator[ExplorerRepository, None, None]:
+    """Get ExplorerRepository instance."""
+    yield ExplorerRepository(session)
+
+
+def get_game_position_repository(
+    session: Session = Depends(get_session)
+) -> Generator[GamePositionRepository, None, None]:
+    """Get GamePositionRepository instance."""
+    yield GamePositionRepository(session)
+
+
 def get_user_puzzle_repository(
     session: Session = Depends(get_session)
 ) -> Generator[UserPuzzleRepository, None, None]:
     """Get UserPuzzleRepository instance."""
     yield UserPuzzleRepository(session)
+
+
+def get_import_watermark_repository(
+    session: Session = Depends(get_session)
+) -> Generator[ImportWatermarkRepository, None, None]:
+    """Get ImportWatermarkRepository instance."""
+    yield ImportWatermarkRepository(session)
+
+
+def get_import_job_repository(
+    session: Session = Depends(get_session)
+) -> Generator[ImportJobRepository, None, None]:
+    """Get ImportJobRepository instance."""
+    yield ImportJobRepository(session)
+
+
+def get_analysis_job_repository(
+    session: Session = Depends(get_session)
+) -> Generator[AnalysisJobRepository, None, None]:
+    """Get AnalysisJobRepository instance."""
+    yield AnalysisJobRepository(session)
+
+
+def get_position_eval_repository(
+    session: Session = Depends(get_session)
+) -> Generator[PositionEvalRepository, None, None]:
+    """Get PositionEvalRepository instance."""
+    yield PositionEvalRepository(session)
@@ -1,5 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, BigInteger, JSON, Float, Integer, Boolean
+from sqlalchemy import (
+    Column, String, DateTime, Text, ForeignKey, BigInteger, JSON, Float, Integer, Boolean, Index, LargeBinary,
+    UniqueConstraint, text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
@@ -23,6 +26,21 @@ class UserGame(Base):
     """Stored Chess.com games for a user."""
 
     __tablename__ = "user_games"
+    __table_args__ = (
+        # Newest-first pages (GET /games), whole or by time class; game_id breaks end_time ties
+        Index("ix_user_games_user_id_end_time", "user_id", text("end_time DESC NULLS LAST"), text("game_id DESC")),
+        Index(
+            "ix_user_games_user_id_time_class_end_time",
+            "user_id", "time_class", text("end_time DESC NULLS LAST"), text("game_id DESC"),
+        ),
+        Index("ix_user_games_user_id_is_analysed", "user_id", "is_analysed"),
+        # The same Chess.com game imported from the API and from a PGN export is stored once
+        Index(
+            "uq_user_games_user_chess_com_game_id", "user_id", "chess_com_game_id",
+            unique=True,
+            postgresql_where=text("chess_com_game_id IS NOT NULL"),
+        ),
+    )
 
     game_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -30,6 +48,7 @@ class UserGame(Base):
     tcn = Column(Text, nullable=True)
     chess_com_username = Column(String, nullable=False)
     chess_com_game_uuid = Column(String, nullable=True)
+    chess_com_game_id = Column(String, nullable=True)  # "live/123456789", see services.chess_com.chess_com_game_id
     end_time = Column(BigInteger, nullable=True)
     time_class = Column(String, nullable=True)
     time_control = Column(String, nullable=True)
@@ -37,23 +56,190 @@ class UserGame(Base):
     black_username = Column(String, nullable=True)
     white_result = Column(String, nullable=True)
     black_result = Column(String, nullable=True)
-    analysed_game = Column(JSON, nullable=True)
+    analysed_game = Column(JSON(none_as_null=True), nullable=True)  # only analyses analysis_blob cannot hold
+    analysis_blob = Column(LargeBinary, nullable=True)  # compact analysed_game, see services.analysis_codec
     white_accuracy = Column(Float, nullable=True)
     black_accuracy = Column(Float, nullable=True)
     user_blunder_count = Column(Integer, nullable=True)
     white_rating = Column(Integer, nullable=True)
     black_rating = Column(Integer, nullable=True)
     is_analysed = Column(Boolean, nullable=False, default=False, server_default="false")
+    analysed_at = Column(DateTime, nullable=True)  # when the stored analysis was saved
+    puzzles_analysed_at = Column(DateTime, nullable=True)  # analysed_at of the analysis puzzles were generated from
+
+
+class GameMove(Base):
+    """One analysed half-move of a stored game.
+
+    Written alongside `UserGame.analysed_game` whenever an analysis is saved so
+    mistake and puzzle queries can scan typed, indexed rows instead of decoding
+    every game's JSON.
+    """
+
+    __tablename__ = "game_moves"
+
+    game_id = Column(UUID(as_uuid=True), ForeignKey("user_games.game_id", ondelete="CASCADE"), primary_key=True)
+    half_move_index = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    move_number = Column(Integer, nullable=False)
+    side = Column(String, nullable=False)
+    is_user_move = Column(Boolean, nullable=False, default=False, server_default="false")
+    san = Column(String, nullable=True)
+    uci = Column(String, nullable=True)
+    fen_before = Column(Text, nullable=True)
+    position_key = Column(BigInteger, nullable=True)  # Zobrist hash of fen_before (services.position_keys)
+    eval_before_type = Column(String, nullable=True)  # "cp" or "mate", from White's point of view
+    eval_before_value = Column(Integer, nullable=True)
+    eval_after_type = Column(String, nullable=True)
+    eval_after_value = Column(Integer, nullable=True)
+    best_move = Column(String, nullable=True)
+    pv = Column(Text, nullable=True)  # engine's best line from fen_before, space-separated UCI
+    cp_loss = Column(Float, nullable=True)
+    wc_loss = Column(Float, nullable=True)  # winning chances lost by the moving side, 0..2
+    plies_from_end = Column(Integer, nullable=False)  # half-moves from this one to the end, 1 for the last
+    classification = Column(String, nullable=True)
+
+
+class MistakeIndex(Base):
+    """Running totals of a user's repeated mistakes, kept in step with their analysed games.
+
+    One row per (user, phase, position key, played move, time class, UTC day
+    the game ended), so the common-mistakes report can be filtered by timeframe
+    and time class without rescanning moves. `fen` is one FEN of the position
+    for display; occurrences may differ in their move counters. `refs` lists every occurrence as
+    [end_time, game_id, half_move_index, best_move, wc_loss].
+    """
+
+    __tablename__ = "mistake_index"
+    __table_args__ = (
+        Index(
+            "uq_mistake_index_key",
+            "user_id", "phase", "position_key", "played_move", "time_class", "end_day",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    phase = Column(String, nullable=False)  # "opening" or "endgame"
+    position_key = Column(BigInteger, nullable=False)
+    fen = Column(Text, nullable=False)
+    played_move = Column(String, nullable=False)
+    time_class = Column(String, nullable=True)
+    end_day = Column(Integer, nullable=True)  # end_time // 86400
+    count = Column(Integer, nullable=False, default=0)
+    wc_loss_sum = Column(Float, nullable=False, default=0.0)
+    last_end_time = Column(BigInteger, nullable=True)
+    refs = Column(JSON, nullable=False, default=list)
+
+
+class ExplorerMove(Base):
+    """One move out of a position in a user's opening tree, with running totals.
+
+    Keyed by the position's Zobrist key and the colour the user had in those
+    games. Results come from imported games (from the user's side); evals and
+    winning-chances losses from analysed ones, so their counts are separate.
+    """
+
+    __tablename__ = "explorer_moves"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    position_key = Column(BigInteger, primary_key=True)
+    color = Column(String, primary_key=True)  # the user's colour: "white" or "black"
+    uci = Column(String, primary_key=True)
+    san = Column(String, nullable=False)
+    games = Column(Integer, nullable=False, default=0, server_default="0")
+    wins = Column(Integer, nullable=False, default=0, server_default="0")
+    draws = Column(Integer, nullable=False, default=0, server_default="0")
+    losses = Column(Integer, nullable=False, default=0, server_default="0")
+    eval_sum = Column(Float, nullable=False, default=0.0, server_default="0")  # cp after the move, user's view
+    eval_count = Column(Integer, nullable=False, default=0, server_default="0")
+    wc_loss_sum = Column(Float, nullable=False, default=0.0, server_default="0")  # lost by the side moving
+    wc_loss_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class PositionEval(Base):
+    """A Stockfish evaluation of a position, shared by every user's games.
+
+    Keyed by the position's Zobrist key (see services.position_keys), which
+    ignores move counters, so the same opening position from any game hits the
+    same row. Only server-side engine results are stored; the deepest search
+    of a position wins.
+    """
+
+    __tablename__ = "position_evals"
+
+    position_key = Column(BigInteger, primary_key=True)
+    depth = Column(Integer, nullable=False)
+    multipv = Column(Integer, nullable=False)  # lines searched; top_lines may hold fewer
+    eval_type = Column(String, nullable=False)  # "cp" or "mate", from White's side
+    eval_value = Column(Integer, nullable=False)
+    best_move = Column(String, nullable=False)  # uci
+    top_lines = Column(JSON, nullable=False)  # [{"Centipawn" or "Mate": n, "Line": "e2e4 e7e5 ..."}]
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class GamePosition(Base):
+    """One position reached in a stored game: the position before half-move
+    `ply` (0 is the starting position), with the final position last.
+
+    Filled from the PGN on import, so any game can be found by position with an
+    index lookup instead of replaying every PGN.
+    """
+
+    __tablename__ = "game_positions"
+    __table_args__ = (
+        Index("ix_game_positions_user_id_position_key", "user_id", "position_key", "game_id"),
+    )
+
+    game_id = Column(UUID(as_uuid=True), ForeignKey("user_games.game_id", ondelete="CASCADE"), primary_key=True)
+    ply = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    position_key = Column(BigInteger, nullable=False)  # services.position_keys
+
+
+class GameMaterial(Base):
+    """A material balance a stored game passed through, from the ply it was first reached.
+
+    `material` lists both sides' pieces other than pawns, White first
+    ("KRvKR"); pawns are counted separately so signatures can be matched with
+    or without them.
+    """
+
+    __tablename__ = "game_material"
+    __table_args__ = (
+        Index(
+            "ix_game_material_user_id_material",
+            "user_id", "material", "white_pawns", "black_pawns", "game_id",
+        ),
+    )
+
+    game_id = Column(UUID(as_uuid=True), ForeignKey("user_games.game_id", ondelete="CASCADE"), primary_key=True)
+    material = Column(String, primary_key=True)
+    white_pawns = Column(Integer, primary_key=True)
+    black_pawns = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    first_ply = Column(Integer, nullable=False)
 
 
 class UserPuzzle(Base):
     """Stored puzzle candidates extracted from a user's analyzed games."""
 
     __tablename__ = "user_puzzles"
+    __table_args__ = (
+        UniqueConstraint("user_id", "game_id", "source_half_move_index", name="uq_user_puzzles_candidate_key"),
+        Index(
+            "ix_user_puzzles_user_id_end_time",
+            "user_id", text("end_time DESC NULLS LAST"), text("game_id DESC"), text("source_half_move_index DESC"),
+        ),
+    )
 
     puzzle_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     game_id = Column(UUID(as_uuid=True), ForeignKey("user_games.game_id", ondelete="CASCADE"), nullable=False)
+    end_time = Column(BigInteger, nullable=True)  # the game's, copied so listing needs no join
     start_fen = Column(Text, nullable=False)
     source_half_move_index = Column(Integer, nullable=False)
     played_move = Column(String, nullable=False)
@@ -64,3 +250,94 @@ class UserPuzzle(Base):
     normalized_tags = Column(JSON, nullable=True)
     candidate_score = Column(Float, nullable=True)
     status = Column(String, nullable=False, default="candidate", server_default="candidate")
+
+
+class ImportWatermark(Base):
+    """Range of Chess.com month archives already imported for a user, username and time class.
+
+    Months are stored as YYYYMM integers. Every month in
+    [covered_from_month, covered_through_month) has been fully imported; the
+    through month itself may still gain games and is always refetched.
+    """
+
+    __tablename__ = "import_watermarks"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    chess_com_username = Column(String, primary_key=True)
+    time_class = Column(String, primary_key=True)
+    covered_from_month = Column(Integer, nullable=False)
+    covered_through_month = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class ImportJob(Base):
+    """A background Chess.com import and its progress."""
+
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_user_id", "user_id"),
+        # At most one queued/running job per user and request; duplicates merge into it
+        Index(
+            "uq_import_jobs_active", "user_id", "timeframe", "game_types",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    chess_com_username = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    game_types = Column(String, nullable=False)  # sorted, comma-separated time classes
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    months_total = Column(Integer, nullable=False, default=0, server_default="0")
+    months_done = Column(Integer, nullable=False, default=0, server_default="0")
+    games_fetched = Column(Integer, nullable=False, default=0, server_default="0")
+    games_added = Column(Integer, nullable=False, default=0, server_default="0")
+    errors = Column(JSON, nullable=True, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AnalysisJob(Base):
+    """A stored game waiting for (or given) server-side engine analysis.
+
+    Workers dequeue the highest-priority queued job with FOR UPDATE SKIP
+    LOCKED and hold it under a lease; a job whose lease runs out is queued
+    again, up to `max_attempts` tries. At most one job per game is queued or
+    running at a time.
+    """
+
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        Index(
+            "uq_analysis_jobs_active_game", "game_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index(
+            "ix_analysis_jobs_dequeue", text("priority DESC"), text("end_time DESC NULLS LAST"), "created_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index("ix_analysis_jobs_lease_expires_at", "lease_expires_at", postgresql_where=text("status = 'running'")),
+        Index("ix_analysis_jobs_user_id_status", "user_id", "status"),
+    )
+
+    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    game_id = Column(UUID(as_uuid=True), ForeignKey("user_games.game_id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, nullable=False, default="queued", server_default="queued")  # queued, running, done, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0, server_default="0")  # higher first
+    end_time = Column(BigInteger, nullable=True)  # the game's, so recent games go first
+    force = Column(Boolean, nullable=False, default=False, server_default="false")  # re-analyse an analysed game
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=3, server_default="3")
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # retry backoff
+    lease_token = Column(UUID(as_uuid=True), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    worker = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
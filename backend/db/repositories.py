@@ -1,10 +1,17 @@
-from typing import Optional, List
+import io
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, List
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, nulls_last
+from sqlalchemy.orm import Session, aliased, defer
+from sqlalchemy import case, literal, or_, nulls_last, text, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 
 from db.repository import BaseRepository
-from db.models import User, UserGame, UserPuzzle
+from db.models import (
+    User, UserGame, GameMove, MistakeIndex, ExplorerMove, GamePosition, GameMaterial, UserPuzzle, ImportWatermark,
+    ImportJob, AnalysisJob, PositionEval,
+)
 
 
 class UserRepository(BaseRepository[User]):
@@ -47,6 +54,72 @@ class UserRepository(BaseRepository[User]):
         return self.exists(email=email)
 
 
+# Columns written by UserGameRepository.copy_games, in COPY order
+GAME_COPY_COLUMNS = (
+    "user_id", "pgn", "tcn", "chess_com_username", "chess_com_game_uuid", "chess_com_game_id", "end_time",
+    "time_class", "time_control", "white_username", "black_username",
+    "white_result", "black_result", "white_rating", "black_rating",
+)
+
+
+def _copy_value(value: Any) -> str:
+    """Encode a value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(session: Session, table: str, columns: tuple[str, ...], rows: Iterable[Dict[str, Any]]) -> int:
+    """COPY rows (dicts with any of `columns`) into `table` on the session's
+    connection. Returns the number of rows written."""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row.get(col)) for col in columns))
+        buffer.write("\n")
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    return count
+
+
+def _newest_first(
+    session: Session, q: Any, end_time: Any, keys: tuple, after: Optional[tuple], limit: int,
+) -> List[Any]:
+    """Up to `limit` rows of select `q` ordered by end_time DESC NULLS LAST then
+    `keys` descending, starting after the sort key `after` (end_time, *keys).
+
+    Dated and undated rows are read as two index range scans: the row
+    comparison alone would drop the NULL end_times, and OR-ing them back in
+    stops Postgres from walking the index in order.
+    """
+    order = (nulls_last(end_time.desc()), *(key.desc() for key in keys))
+    rows: List[Any] = []
+    if after is None or after[0] is not None:
+        dated = q.where(end_time.isnot(None))
+        if after is not None:
+            dated = dated.where(tuple_(end_time, *keys) < tuple_(*after))
+        rows = session.execute(dated.order_by(*order).limit(limit)).all()
+        if len(rows) == limit:
+            return rows
+    undated = q.where(end_time.is_(None))
+    if after is not None and after[0] is None:
+        undated = undated.where(tuple_(*keys) < tuple_(*after[1:]))
+    return rows + session.execute(undated.order_by(*order).limit(limit - len(rows))).all()
+
+
 class UserGameRepository(BaseRepository[UserGame]):
     """Repository for UserGame model."""
 
@@ -60,37 +133,162 @@ class UserGameRepository(BaseRepository[UserGame]):
     def get_by_game_id(self, game_id: UUID) -> Optional[UserGame]:
         """Get a single game by its primary key."""
         return self.get_by_id(game_id)
+
+    def get_by_game_ids(self, game_ids: Iterable[UUID]) -> List[UserGame]:
+        """Several games by primary key in one query, in no particular order."""
+        return self.session.query(UserGame).filter(UserGame.game_id.in_(list(game_ids))).all()
     
+    def _list_query(self, q: Any, user_id: UUID, min_end_time: Optional[int], time_class: Optional[str]) -> Any:
+        q = q.where(UserGame.user_id == user_id)
+        if min_end_time is not None:
+            q = q.where(UserGame.end_time >= min_end_time)
+        if time_class is not None:
+            q = q.where(UserGame.time_class == time_class)
+        return q
+
     def get_by_user_id(
-        self, user_id: UUID, limit: int = 500, offset: int = 0,
+        self, user_id: UUID, limit: int = 500, after: Optional[tuple] = None,
         min_end_time: Optional[int] = None, time_class: Optional[str] = None,
     ) -> List[UserGame]:
-        """Get games for a user, newest first. Optionally filter by min end_time and time_class."""
-        q = self.session.query(UserGame).filter(UserGame.user_id == user_id)
-        if min_end_time is not None:
-            q = q.filter(UserGame.end_time >= min_end_time)
-        if time_class is not None:
-            q = q.filter(UserGame.time_class == time_class)
-        return q.order_by(nulls_last(UserGame.end_time.desc())).offset(offset).limit(limit).all()
+        """Get games for a user, newest first (ties by game_id), after the
+        (end_time, game_id) key `after`. Optionally filter by min end_time and time_class."""
+        q = self._list_query(select(UserGame), user_id, min_end_time, time_class)
+        return [row[0] for row in _newest_first(self.session, q, UserGame.end_time, (UserGame.game_id,), after, limit)]
+
+    def get_list_rows(
+        self, user_id: UUID, columns: Iterable[str], limit: int = 500, after: Optional[tuple] = None,
+        min_end_time: Optional[int] = None, time_class: Optional[str] = None,
+    ) -> List[Any]:
+        """get_by_user_id, but only the named columns, as plain rows (no ORM objects)."""
+        q = self._list_query(
+            select(*(getattr(UserGame, column) for column in columns)), user_id, min_end_time, time_class,
+        )
+        return _newest_first(self.session, q, UserGame.end_time, (UserGame.game_id,), after, limit)
 
     def get_analysed_by_user_id(
         self, user_id: UUID, min_end_time: Optional[int] = None, time_class: Optional[str] = None,
+        include_analysis: bool = True,
     ) -> List[UserGame]:
-        """Get all analysed games for a user, optionally filtered by min end_time and time_class."""
+        """Get all analysed games for a user, optionally filtered by min end_time and time_class.
+
+        With include_analysis=False the stored analysis (JSON or compact) is not loaded.
+        """
         q = (
             self.session.query(UserGame)
             .filter(UserGame.user_id == user_id, UserGame.is_analysed == True)
         )
+        if not include_analysis:
+            q = q.options(defer(UserGame.analysed_game), defer(UserGame.analysis_blob))
         if min_end_time is not None:
             q = q.filter(UserGame.end_time >= min_end_time)
         if time_class is not None:
             q = q.filter(UserGame.time_class == time_class)
         return q.all()
 
+    def get_for_puzzles(self, user_id: UUID, force: bool = False) -> List[UserGame]:
+        """Analysed games (without their stored analysis) whose current analysis
+        has not had puzzles generated from it yet, or all of them with force."""
+        q = (
+            self.session.query(UserGame)
+            .options(defer(UserGame.analysed_game), defer(UserGame.analysis_blob), defer(UserGame.pgn))
+            .filter(UserGame.user_id == user_id, UserGame.is_analysed == True)
+        )
+        if not force:
+            q = q.filter(
+                or_(UserGame.puzzles_analysed_at.is_(None), UserGame.puzzles_analysed_at != UserGame.analysed_at)
+            )
+        return q.all()
+
+    def stage_puzzle_stamps(self, stamps: Dict[UUID, Optional[datetime]]) -> None:
+        """Record, per game id, the analysed_at of the analysis its puzzles
+        were generated from. Flushed, not committed."""
+        if stamps:
+            self.session.execute(
+                update(UserGame),
+                [dict(game_id=game_id, puzzles_analysed_at=stamp) for game_id, stamp in stamps.items()],
+            )
+
+    def get_unanalysed_ids(self, user_id: Optional[UUID] = None, limit: Optional[int] = None) -> List[UUID]:
+        """Ids of games without an analysis, newest first, for one user or everyone."""
+        q = self.session.query(UserGame.game_id).filter(UserGame.is_analysed == False)
+        if user_id is not None:
+            q = q.filter(UserGame.user_id == user_id)
+        q = q.order_by(nulls_last(UserGame.end_time.desc()))
+        if limit is not None:
+            q = q.limit(limit)
+        return [game_id for game_id, in q]
+
+    def iter_pgns(self, user_id: UUID, batch_size: int = 1000) -> Iterable[Any]:
+        """Stream a user's games as rows of game_id, pgn, usernames and results."""
+        q = (
+            select(
+                UserGame.game_id, UserGame.pgn, UserGame.chess_com_username,
+                UserGame.white_username, UserGame.black_username,
+                UserGame.white_result, UserGame.black_result,
+            )
+            .where(UserGame.user_id == user_id)
+            .execution_options(yield_per=batch_size)
+        )
+        return self.session.execute(q)
+
+    def save_analysis(self, game: UserGame, moves: List[Dict[str, Any]], **fields) -> UserGame:
+        """Set analysis fields on a game and replace its game_moves rows in one commit."""
+        for key, value in fields.items():
+            setattr(game, key, value)
+        self.session.query(GameMove).filter(GameMove.game_id == game.game_id).delete(synchronize_session=False)
+        if moves:
+            self.session.execute(insert(GameMove.__table__), moves)
+        self.session.commit()
+        self.session.refresh(game)
+        return game
+
+    def get_stored_analyses(self, compact: bool, after: Optional[UUID] = None, limit: int = 500) -> List[Any]:
+        """Rows of game_id, pgn, analysed_game and analysis_blob for games whose
+        analysis is stored compact (or as JSON), in game_id order after `after`."""
+        column = UserGame.analysis_blob if compact else UserGame.analysed_game
+        q = self.session.query(UserGame.game_id, UserGame.pgn, UserGame.analysed_game, UserGame.analysis_blob).filter(
+            column.isnot(None)
+        )
+        if after is not None:
+            q = q.filter(UserGame.game_id > after)
+        return q.order_by(UserGame.game_id).limit(limit).all()
+
+    def update_stored_analyses(self, rows: List[Dict[str, Any]]) -> None:
+        """Set game_id-keyed analysed_game / analysis_blob columns in one bulk update, and commit."""
+        if rows:
+            self.session.execute(update(UserGame), rows)
+        self.session.commit()
+
+    def save_analyses(self, analyses: List[Dict[str, Any]], moves: List[Dict[str, Any]]) -> None:
+        """save_analysis for several games: `analyses` are dicts of game_id and
+        the fields to set, written with one bulk update; their game_moves rows
+        are replaced by `moves`. One commit, and nothing is refreshed."""
+        if not analyses:
+            return
+        self.session.execute(update(UserGame), analyses)
+        game_ids = [analysis["game_id"] for analysis in analyses]
+        self.session.query(GameMove).filter(GameMove.game_id.in_(game_ids)).delete(synchronize_session=False)
+        if moves:
+            self.session.execute(insert(GameMove.__table__), moves)
+        self.session.commit()
+
     def count_by_user_id(self, user_id: UUID) -> int:
         """Count games for a user."""
         return self.session.query(UserGame).filter(UserGame.user_id == user_id).count()
 
+    def count_analysed_by_user_id(
+        self, user_id: UUID, min_end_time: Optional[int] = None, time_class: Optional[str] = None,
+    ) -> int:
+        """Count analysed games for a user, with the same filters as get_analysed_by_user_id."""
+        q = self.session.query(func.count(UserGame.game_id)).filter(
+            UserGame.user_id == user_id, UserGame.is_analysed == True,
+        )
+        if min_end_time is not None:
+            q = q.filter(UserGame.end_time >= min_end_time)
+        if time_class is not None:
+            q = q.filter(UserGame.time_class == time_class)
+        return q.scalar()
+
     def exists_chess_com_game(self, user_id: UUID, chess_com_game_uuid: str) -> bool:
         """Check if we already have this Chess.com game for this user."""
         return (
@@ -103,17 +301,427 @@ class UserGameRepository(BaseRepository[UserGame]):
             is not None
         )
 
-    def get_existing_chess_com_uuids(self, user_id: UUID) -> set[str]:
-        """Return all Chess.com game UUIDs already stored for this user."""
+    def copy_games(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, UUID]:
+        """Bulk-load games with COPY into a staging table, then insert the unseen ones.
+
+        A game the user already has (same chess_com_game_uuid, or same
+        chess_com_game_id) is skipped by the database, as is a repeat within
+        `rows`. Rows may omit any of GAME_COPY_COLUMNS. Returns the games
+        inserted, as chess_com_game_uuid -> game_id.
+        """
+        rows = list(rows)
+        if not rows:
+            return {}
+        columns = ", ".join(GAME_COPY_COLUMNS)
+        self.session.execute(text(
+            f"CREATE TEMP TABLE user_games_staging ON COMMIT DROP AS "
+            f"SELECT {columns} FROM user_games WITH NO DATA"
+        ))
+        _copy_rows(self.session, "user_games_staging", GAME_COPY_COLUMNS, rows)
+        inserted = dict(self.session.execute(text(
+            f"INSERT INTO user_games (game_id, {columns}) "
+            f"SELECT gen_random_uuid(), {columns} FROM user_games_staging "
+            # Either unique key: (user_id, chess_com_game_uuid) or (user_id, chess_com_game_id)
+            f"ON CONFLICT DO NOTHING "
+            f"RETURNING chess_com_game_uuid, game_id"
+        )).all())
+        self.session.commit()
+        return inserted
+
+
+class GameMoveRepository(BaseRepository[GameMove]):
+    """Repository for GameMove rows (written via UserGameRepository.save_analysis)."""
+
+    def __init__(self, session: Session):
+        super().__init__(GameMove, session)
+
+    def get_by_game_id(self, game_id: UUID) -> List[GameMove]:
+        """All analysed moves of a game, in order."""
+        return (
+            self.session.query(GameMove)
+            .filter(GameMove.game_id == game_id)
+            .order_by(GameMove.half_move_index)
+            .all()
+        )
+
+    def get_by_game_ids(self, game_ids: Iterable[UUID]) -> List[GameMove]:
+        """All analysed moves of several games, by game then ply."""
+        return (
+            self.session.query(GameMove)
+            .filter(GameMove.game_id.in_(list(game_ids)))
+            .order_by(GameMove.game_id, GameMove.half_move_index)
+            .all()
+        )
+
+    def get_opening_moves(self, game_ids: Iterable[UUID], max_plies: int) -> List[GameMove]:
+        """The first `max_plies` analysed moves of several games, by game then ply."""
+        return (
+            self.session.query(GameMove)
+            .filter(GameMove.game_id.in_(list(game_ids)), GameMove.half_move_index < max_plies)
+            .order_by(GameMove.game_id, GameMove.half_move_index)
+            .all()
+        )
+
+    def get_puzzle_sources(
+        self, user_id: UUID, game_id: Optional[UUID] = None, game_ids: Optional[Iterable[UUID]] = None,
+    ) -> List[Any]:
+        """Opponent mistakes and blunders, each with the engine's reply line from the next move,
+        for all of a user's games or only `game_id` / `game_ids`.
+
+        Rows carry the GameMove columns plus `next_pv` / `next_best_move`.
+        """
+        reply = aliased(GameMove)
+        q = (
+            select(
+                GameMove,
+                reply.pv.label("next_pv"),
+                reply.best_move.label("next_best_move"),
+            )
+            .outerjoin(reply, (reply.game_id == GameMove.game_id) & (reply.half_move_index == GameMove.half_move_index + 1))
+            .where(
+                GameMove.user_id == user_id,
+                GameMove.is_user_move == False,
+                GameMove.classification.in_(("blunder", "mistake")),
+            )
+            .order_by(GameMove.game_id, GameMove.half_move_index)
+        )
+        if game_id is not None:
+            q = q.where(GameMove.game_id == game_id)
+        if game_ids is not None:
+            q = q.where(GameMove.game_id.in_(list(game_ids)))
+        return list(self.session.execute(q))
+
+
+class MistakeIndexRepository(BaseRepository[MistakeIndex]):
+    """Repository for the per-user common-mistakes index."""
+
+    KEY = ("phase", "position_key", "played_move", "time_class", "end_day")
+
+    def __init__(self, session: Session):
+        super().__init__(MistakeIndex, session)
+
+    def stage_replace(
+        self, user_id: UUID, game_ids: Iterable[UUID], previous: List[Dict[str, Any]], current: List[Dict[str, Any]],
+    ) -> None:
+        """Swap games' contributions to the index: drop `previous`, add `current`.
+
+        Entries are dicts with the KEY fields, `fen`, `wc_loss` and `ref`.
+        Changes are flushed, not committed, so they land in the same
+        transaction as the analysis they come from.
+        """
+        added: Dict[tuple, List[list]] = {}
+        fens: Dict[tuple, str] = {}
+        for entry in current:
+            key = tuple(entry[k] for k in self.KEY)
+            added.setdefault(key, []).append([*entry["ref"], entry["wc_loss"]])
+            fens.setdefault(key, entry["fen"])
+        keys = set(added) | {tuple(entry[k] for k in self.KEY) for entry in previous}
+        if not keys:
+            return
+
+        if added:
+            self.session.execute(
+                insert(MistakeIndex.__table__)
+                .on_conflict_do_nothing(index_elements=["user_id", *self.KEY]),
+                [
+                    dict(zip(self.KEY, key), user_id=user_id, fen=fens[key], count=0, wc_loss_sum=0.0, refs=[])
+                    for key in added
+                ],
+            )
         rows = (
-            self.session.query(UserGame.chess_com_game_uuid)
+            self.session.query(MistakeIndex)
+            .filter(MistakeIndex.user_id == user_id, MistakeIndex.position_key.in_({key[1] for key in keys}))
+            .with_for_update()
+            .all()
+        )
+        replaced = {str(game_id) for game_id in game_ids}
+        for row in rows:
+            key = tuple(getattr(row, k) for k in self.KEY)
+            if key not in keys:
+                continue
+            refs = [ref for ref in row.refs if ref[1] not in replaced] + added.get(key, [])
+            if not refs:
+                self.session.delete(row)
+                continue
+            row.refs = refs
+            row.count = len(refs)
+            row.wc_loss_sum = sum(ref[4] for ref in refs)
+            row.last_end_time = max((ref[0] for ref in refs if ref[0] is not None), default=None)
+        self.session.flush()
+
+    def get_common_mistakes(
+        self,
+        user_id: UUID,
+        *,
+        limit: int,
+        min_end_time: Optional[int] = None,
+        time_class: Optional[str] = None,
+    ) -> List[Any]:
+        """Rank the positions where the user most often plays the same losing move.
+
+        Positions (by position key, so move counters do not matter) seen at
+        least twice are kept with their most played move; ties go to the most
+        recent game. Returns up to `limit` rows per `phase` with position_key,
+        the most recently seen fen, played_move, count, wc_loss_sum and the
+        three most recent occurrences as `refs`. Timeframes are whole UTC days, so
+        `min_end_time` is rounded up to the next day boundary.
+        """
+        filters = ""
+        params: Dict[str, Any] = dict(user_id=user_id, limit=limit)
+        if min_end_time is not None:
+            filters += " AND {t}.end_day >= :min_end_day"
+            params["min_end_day"] = -(-min_end_time // 86400)
+        if time_class is not None:
+            filters += " AND {t}.time_class = :time_class"
+            params["time_class"] = time_class
+
+        return list(self.session.execute(text(f"""
+            WITH by_move AS (
+                SELECT
+                    phase,
+                    position_key,
+                    (array_agg(fen ORDER BY last_end_time DESC NULLS LAST, fen))[1] AS fen,
+                    played_move,
+                    sum(count) AS count,
+                    sum(wc_loss_sum) AS wc_loss_sum,
+                    sum(sum(count)) OVER per_position AS position_count,
+                    max(max(last_end_time)) OVER per_position AS position_last_end_time,
+                    row_number() OVER (
+                        PARTITION BY phase, position_key
+                        ORDER BY sum(count) DESC, max(last_end_time) DESC NULLS LAST, played_move
+                    ) AS move_rank
+                FROM mistake_index i
+                WHERE i.user_id = :user_id{filters.format(t="i")}
+                GROUP BY phase, position_key, played_move
+                WINDOW per_position AS (PARTITION BY phase, position_key)
+            ),
+            ranked AS (
+                SELECT
+                    *,
+                    row_number() OVER (
+                        PARTITION BY phase
+                        ORDER BY count DESC, position_last_end_time DESC NULLS LAST, position_key
+                    ) AS rank
+                FROM by_move
+                WHERE move_rank = 1 AND position_count >= 2
+            )
+            SELECT r.phase, r.position_key, r.fen, r.played_move, r.count, r.wc_loss_sum, samples.refs
+            FROM ranked r
+            CROSS JOIN LATERAL (
+                SELECT json_agg(ref ORDER BY (ref->>0)::bigint DESC NULLS LAST, ref->>1, (ref->>2)::int) AS refs
+                FROM (
+                    SELECT ref
+                    FROM mistake_index m, json_array_elements(m.refs) AS ref
+                    WHERE m.user_id = :user_id
+                      AND m.phase = r.phase
+                      AND m.position_key = r.position_key
+                      AND m.played_move = r.played_move{filters.format(t="m")}
+                    ORDER BY (ref->>0)::bigint DESC NULLS LAST, ref->>1, (ref->>2)::int
+                    LIMIT 3
+                ) newest
+            ) samples
+            WHERE r.rank <= :limit
+            ORDER BY r.phase, r.rank
+        """), params))
+
+
+class ExplorerRepository(BaseRepository[ExplorerMove]):
+    """Repository for users' opening trees."""
+
+    COUNTERS = ("games", "wins", "draws", "losses", "eval_sum", "eval_count", "wc_loss_sum", "wc_loss_count")
+
+    def __init__(self, session: Session):
+        super().__init__(ExplorerMove, session)
+
+    def stage_add(self, user_id: UUID, deltas: List[Dict[str, Any]]) -> None:
+        """Add counter deltas (negative to retract) to tree moves, creating them as needed.
+
+        Each delta has position_key, color, uci, san and any of COUNTERS.
+        Deltas for the same move are summed first (one statement may not
+        update a row twice). Flushed, not committed. Rows are written in key
+        order so concurrent writers for one user lock them in the same order.
+        """
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        for delta in deltas:
+            key = (delta["position_key"], delta["color"], delta["uci"])
+            row = merged.get(key)
+            if row is None:
+                row = merged[key] = dict(
+                    {c: 0 for c in self.COUNTERS},
+                    user_id=user_id, position_key=key[0], color=key[1], uci=key[2], san=delta["san"],
+                )
+            for c in self.COUNTERS:
+                row[c] += delta.get(c, 0)
+        if not merged:
+            return
+        table = ExplorerMove.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "position_key", "color", "uci"],
+            set_={c: table.c[c] + stmt.excluded[c] for c in self.COUNTERS},
+        )
+        self.session.execute(stmt, [merged[key] for key in sorted(merged)])
+        self.session.flush()
+
+    def add(self, user_id: UUID, deltas: List[Dict[str, Any]]) -> None:
+        """stage_add and commit."""
+        self.stage_add(user_id, deltas)
+        self.session.commit()
+
+    def delete_by_user_id(self, user_id: UUID) -> None:
+        """Drop a user's whole tree (before a rebuild). Not committed."""
+        self.session.query(ExplorerMove).filter(ExplorerMove.user_id == user_id).delete(synchronize_session=False)
+
+    def get_moves(self, user_id: UUID, position_key: int, color: Optional[str] = None) -> List[Any]:
+        """The moves played from a position, most played first, summed over
+        both colours unless `color` is given."""
+        q = (
+            select(
+                ExplorerMove.uci,
+                func.min(ExplorerMove.san).label("san"),
+                *(func.sum(getattr(ExplorerMove, c)).label(c) for c in self.COUNTERS),
+            )
+            .where(ExplorerMove.user_id == user_id, ExplorerMove.position_key == position_key)
+            .group_by(ExplorerMove.uci)
+            .having((func.sum(ExplorerMove.games) > 0) | (func.sum(ExplorerMove.eval_count) > 0))
+            .order_by(func.sum(ExplorerMove.games).desc(), func.sum(ExplorerMove.eval_count).desc(), ExplorerMove.uci)
+        )
+        if color is not None:
+            q = q.where(ExplorerMove.color == color)
+        return list(self.session.execute(q))
+
+
+class PositionEvalRepository(BaseRepository[PositionEval]):
+    """Repository for the engine evaluations shared across all games."""
+
+    def __init__(self, session: Session):
+        super().__init__(PositionEval, session)
+
+    def get_many(self, position_keys: Iterable[int], min_depth: int = 0, multipv: int = 1) -> Dict[int, PositionEval]:
+        """Cached evals of the given positions searched at least `min_depth`
+        deep with at least `multipv` lines, by position key."""
+        keys = list(set(position_keys))
+        if not keys:
+            return {}
+        rows = (
+            self.session.query(PositionEval)
             .filter(
-                UserGame.user_id == user_id,
-                UserGame.chess_com_game_uuid.isnot(None),
+                PositionEval.position_key.in_(keys),
+                PositionEval.depth >= min_depth,
+                PositionEval.multipv >= multipv,
             )
             .all()
         )
-        return {r[0] for r in rows}
+        return {row.position_key: row for row in rows}
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        """Store evals, keeping an existing one unless the new search went
+        deeper (or as deep with more lines), and commit. Rows are written in
+        key order so concurrent workers lock them in the same order."""
+        merged = {}
+        for row in rows:
+            kept = merged.get(row["position_key"])
+            if kept is None or (row["depth"], row["multipv"]) > (kept["depth"], kept["multipv"]):
+                merged[row["position_key"]] = row
+        if not merged:
+            return
+        table = PositionEval.__table__
+        stmt = insert(table)
+        columns = ("depth", "multipv", "eval_type", "eval_value", "best_move", "top_lines")
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["position_key"],
+            set_={**{c: stmt.excluded[c] for c in columns}, "updated_at": func.now()},
+            where=tuple_(table.c.depth, table.c.multipv) < tuple_(stmt.excluded.depth, stmt.excluded.multipv),
+        )
+        now = datetime.utcnow()
+        self.session.execute(stmt, [dict(merged[key], created_at=now, updated_at=now) for key in sorted(merged)])
+        self.session.commit()
+
+
+class GamePositionRepository(BaseRepository[GamePosition]):
+    """Repository for the position and material index of stored games
+    (game_positions and game_material)."""
+
+    POSITION_COLUMNS = ("game_id", "ply", "user_id", "position_key")
+    MATERIAL_COLUMNS = ("game_id", "material", "white_pawns", "black_pawns", "user_id", "first_ply")
+
+    def __init__(self, session: Session):
+        super().__init__(GamePosition, session)
+
+    def stage_add(self, positions: List[Dict[str, Any]], materials: List[Dict[str, Any]]) -> None:
+        """COPY index rows for games not indexed yet. Not committed."""
+        _copy_rows(self.session, "game_positions", self.POSITION_COLUMNS, positions)
+        _copy_rows(self.session, "game_material", self.MATERIAL_COLUMNS, materials)
+
+    def has_game(self, game_id: UUID) -> bool:
+        """Whether a game's positions are indexed."""
+        return self.session.query(
+            select(GamePosition.ply).where(GamePosition.game_id == game_id).exists()
+        ).scalar()
+
+    def indexed_game_ids(self, game_ids: Iterable[UUID]) -> set:
+        """Which of the given games have their positions indexed."""
+        return {
+            game_id for game_id, in
+            self.session.query(GamePosition.game_id.distinct()).filter(GamePosition.game_id.in_(list(game_ids)))
+        }
+
+    def delete_by_user_id(self, user_id: UUID) -> None:
+        """Drop a user's whole index (before a rebuild). Not committed."""
+        for model in (GamePosition, GameMaterial):
+            self.session.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+
+    def search_games(
+        self,
+        user_id: UUID,
+        position_key: Optional[int] = None,
+        material: Optional[str] = None,
+        white_pawns: Optional[int] = None,
+        black_pawns: Optional[int] = None,
+        before: Optional[tuple[int, UUID]] = None,
+        limit: int = 50,
+    ) -> List[Any]:
+        """Games that reached a position and/or material signature, newest first.
+
+        Pawn counts are matched only when given. Each row has the game's
+        summary columns and `ply`, the first half-move at which it matched
+        (the position's, when both filters are given). `before` is the
+        (end_time, game_id) of the last game of the previous page; games
+        without an end time sort as 0.
+        """
+        matches = []
+        if position_key is not None:
+            matches.append(
+                select(GamePosition.game_id, func.min(GamePosition.ply).label("ply"))
+                .where(GamePosition.user_id == user_id, GamePosition.position_key == position_key)
+                .group_by(GamePosition.game_id)
+                .subquery()
+            )
+        if material is not None:
+            q = select(GameMaterial.game_id, func.min(GameMaterial.first_ply).label("ply")).where(
+                GameMaterial.user_id == user_id, GameMaterial.material == material,
+            )
+            if white_pawns is not None:
+                q = q.where(GameMaterial.white_pawns == white_pawns)
+            if black_pawns is not None:
+                q = q.where(GameMaterial.black_pawns == black_pawns)
+            matches.append(q.group_by(GameMaterial.game_id).subquery())
+        if not matches:
+            return []
+
+        first, *rest = matches
+        end_time = func.coalesce(UserGame.end_time, 0)
+        q = select(
+            UserGame.game_id, UserGame.end_time, UserGame.time_class, UserGame.time_control,
+            UserGame.white_username, UserGame.black_username, UserGame.white_result, UserGame.black_result,
+            UserGame.white_rating, UserGame.black_rating, UserGame.is_analysed, first.c.ply,
+        ).join(first, first.c.game_id == UserGame.game_id)
+        for match in rest:
+            q = q.join(match, match.c.game_id == UserGame.game_id)
+        if before is not None:
+            q = q.where(tuple_(end_time, UserGame.game_id) < tuple_(*before))
+        q = q.order_by(end_time.desc(), UserGame.game_id.desc()).limit(limit)
+        return list(self.session.execute(q))
 
 
 class UserPuzzleRepository(BaseRepository[UserPuzzle]):
@@ -131,25 +739,15 @@ class UserPuzzleRepository(BaseRepository[UserPuzzle]):
         return self.get_by_id(puzzle_id)
 
     def get_by_user_id(
-        self, user_id: UUID, limit: int = 100, offset: int = 0, status: Optional[str] = None,
+        self, user_id: UUID, limit: int = 100, after: Optional[tuple] = None, status: Optional[str] = None,
     ) -> List[UserPuzzle]:
-        """Get puzzles for a user, optionally filtered by status."""
-        q = (
-            self.session.query(UserPuzzle)
-            .join(UserGame, UserGame.game_id == UserPuzzle.game_id)
-            .filter(UserPuzzle.user_id == user_id)
-        )
+        """Get puzzles for a user, newest game first, after the (end_time,
+        game_id, source_half_move_index) key `after`. Optionally filtered by status."""
+        q = select(UserPuzzle).where(UserPuzzle.user_id == user_id)
         if status is not None:
-            q = q.filter(UserPuzzle.status == status)
-        return (
-            q.order_by(
-                nulls_last(UserGame.end_time.desc()),
-                nulls_last(UserPuzzle.source_half_move_index.desc()),
-            )
-            .offset(offset)
-            .limit(limit)
-            .all()
-        )
+            q = q.where(UserPuzzle.status == status)
+        keys = (UserPuzzle.game_id, UserPuzzle.source_half_move_index)
+        return [row[0] for row in _newest_first(self.session, q, UserPuzzle.end_time, keys, after, limit)]
 
     def get_by_game_id(self, game_id: UUID) -> List[UserPuzzle]:
         """Get all stored puzzle candidates for a game."""
@@ -160,6 +758,18 @@ class UserPuzzleRepository(BaseRepository[UserPuzzle]):
             .all()
         )
 
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert puzzles, or replace the stored one for the same game and
+        source move, in one statement; commits."""
+        if rows:
+            stmt = insert(UserPuzzle.__table__)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_user_puzzles_candidate_key",
+                set_={column: stmt.excluded[column] for column in rows[0] if column != "puzzle_id"},
+            )
+            self.session.execute(stmt, rows)
+        self.session.commit()
+
     def get_existing_candidate(
         self, user_id: UUID, game_id: UUID, source_half_move_index: int,
     ) -> Optional[UserPuzzle]:
@@ -173,3 +783,331 @@ class UserPuzzleRepository(BaseRepository[UserPuzzle]):
             )
             .first()
         )
+
+
+class ImportWatermarkRepository(BaseRepository[ImportWatermark]):
+    """Repository for per-time-class Chess.com import coverage."""
+
+    def __init__(self, session: Session):
+        super().__init__(ImportWatermark, session)
+
+    def get_for_time_classes(
+        self, user_id: UUID, chess_com_username: str, time_classes: Iterable[str],
+    ) -> dict[str, ImportWatermark]:
+        """Return the watermark for each requested time class that has one, keyed by time class."""
+        rows = (
+            self.session.query(ImportWatermark)
+            .filter(
+                ImportWatermark.user_id == user_id,
+                ImportWatermark.chess_com_username == chess_com_username,
+                ImportWatermark.time_class.in_(list(time_classes)),
+            )
+            .all()
+        )
+        return {w.time_class: w for w in rows}
+
+    def upsert_many(self, user_id: UUID, chess_com_username: str, ranges: dict[str, tuple[int, int]]) -> None:
+        """Set covered (from, through) months for each time class."""
+        if not ranges:
+            return
+        stmt = insert(ImportWatermark).values([
+            dict(
+                user_id=user_id,
+                chess_com_username=chess_com_username,
+                time_class=time_class,
+                covered_from_month=covered_from,
+                covered_through_month=covered_through,
+                updated_at=datetime.utcnow(),
+            )
+            for time_class, (covered_from, covered_through) in ranges.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ImportWatermark.user_id, ImportWatermark.chess_com_username, ImportWatermark.time_class],
+            set_=dict(
+                covered_from_month=stmt.excluded.covered_from_month,
+                covered_through_month=stmt.excluded.covered_through_month,
+                updated_at=stmt.excluded.updated_at,
+            ),
+        )
+        self.session.execute(stmt)
+        self.session.commit()
+
+
+class ImportJobRepository(BaseRepository[ImportJob]):
+    """Repository for background Chess.com import jobs."""
+
+    ACTIVE_STATUSES = ("queued", "running")
+
+    def __init__(self, session: Session):
+        super().__init__(ImportJob, session)
+
+    def get_by_id(self, id: UUID) -> Optional[ImportJob]:
+        """Get a single job by its primary key."""
+        return self.session.query(ImportJob).filter(ImportJob.job_id == id).first()
+
+    def get_active(self, user_id: UUID, timeframe: str, game_types: str) -> Optional[ImportJob]:
+        """Get the queued or running job for the same user and request, if any."""
+        return (
+            self.session.query(ImportJob)
+            .filter(
+                ImportJob.user_id == user_id,
+                ImportJob.timeframe == timeframe,
+                ImportJob.game_types == game_types,
+                ImportJob.status.in_(self.ACTIVE_STATUSES),
+            )
+            .first()
+        )
+
+    def create_or_get_active(self, **kwargs) -> tuple[ImportJob, bool]:
+        """Create a job unless an identical one is already active. Returns (job, created)."""
+        existing = self.get_active(kwargs["user_id"], kwargs["timeframe"], kwargs["game_types"])
+        if existing:
+            return existing, False
+        try:
+            return self.create(**kwargs), True
+        except IntegrityError:
+            # A concurrent request created the same job between our check and insert.
+            self.session.rollback()
+            return self.get_active(kwargs["user_id"], kwargs["timeframe"], kwargs["game_types"]), False
+
+    def claim(self, job_id: UUID) -> bool:
+        """Atomically move a queued job to running. False if another worker got it first."""
+        claimed = (
+            self.session.query(ImportJob)
+            .filter(ImportJob.job_id == job_id, ImportJob.status == "queued")
+            .update({"status": "running", "updated_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        self.session.commit()
+        return claimed == 1
+
+    def requeue_stale(self, stale_before: datetime) -> List[UUID]:
+        """Requeue running jobs with no progress since `stale_before`; return all queued job ids."""
+        (
+            self.session.query(ImportJob)
+            .filter(ImportJob.status == "running", ImportJob.updated_at < stale_before)
+            .update({"status": "queued"}, synchronize_session=False)
+        )
+        self.session.commit()
+        rows = (
+            self.session.query(ImportJob.job_id)
+            .filter(ImportJob.status == "queued")
+            .order_by(ImportJob.created_at)
+            .all()
+        )
+        return [r[0] for r in rows]
+
+
+class AnalysisJobRepository(BaseRepository[AnalysisJob]):
+    """Repository for the durable queue of server-side analysis jobs.
+
+    Times that decide leases and backoff come from the database clock, so
+    workers on different hosts agree on when a lease has run out.
+    """
+
+    ACTIVE_STATUSES = ("queued", "running")
+    STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+    def __init__(self, session: Session):
+        super().__init__(AnalysisJob, session)
+
+    @staticmethod
+    def _now():
+        return func.timezone("utc", func.now())
+
+    def enqueue(
+        self,
+        user_id: UUID,
+        game_ids: Optional[List[UUID]] = None,
+        priority: int = 0,
+        force: bool = False,
+    ) -> int:
+        """Queue analysis of a user's games: the given ones, or all unanalysed.
+
+        Analysed games are only queued with `force`. A game that already has an
+        active job keeps it, raised to `priority` if that is higher. Returns the
+        number of jobs queued or raised.
+        """
+        games = select(
+            func.gen_random_uuid(), UserGame.game_id, UserGame.user_id, UserGame.end_time,
+            literal(priority), literal(force),
+        ).where(UserGame.user_id == user_id)
+        if game_ids is not None:
+            games = games.where(UserGame.game_id.in_(game_ids))
+        if not force:
+            games = games.where(UserGame.is_analysed == False)
+        stmt = insert(AnalysisJob).from_select(
+            ["job_id", "game_id", "user_id", "end_time", "priority", "force"], games,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["game_id"],
+            index_where=AnalysisJob.status.in_(self.ACTIVE_STATUSES),
+            set_={"priority": stmt.excluded.priority, "updated_at": self._now()},
+            where=AnalysisJob.priority < stmt.excluded.priority,
+        )
+        result = self.session.execute(stmt)
+        self.session.commit()
+        return result.rowcount
+
+    def prioritise(self, user_id: UUID, game_id: UUID, priority: int) -> bool:
+        """Raise a game's queued job to at least `priority`. False if it has
+        no queued job (or it is already that high)."""
+        raised = (
+            self.session.query(AnalysisJob)
+            .filter(
+                AnalysisJob.user_id == user_id, AnalysisJob.game_id == game_id,
+                AnalysisJob.status == "queued", AnalysisJob.priority < priority,
+            )
+            .update({"priority": priority, "updated_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        self.session.commit()
+        return raised == 1
+
+    def requeue_expired(self) -> int:
+        """Queue again running jobs whose lease has run out (their worker died
+        or stalled), or fail them once they have used all their attempts."""
+        result = self.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.status == "running", AnalysisJob.lease_expires_at < self._now())
+            .values(
+                status=case((AnalysisJob.attempts >= AnalysisJob.max_attempts, "failed"), else_="queued"),
+                finished_at=case((AnalysisJob.attempts >= AnalysisJob.max_attempts, self._now()), else_=None),
+                last_error="Lease expired",
+                lease_token=None,
+                lease_expires_at=None,
+                updated_at=self._now(),
+            )
+        )
+        self.session.commit()
+        return result.rowcount
+
+    def dequeue(self, worker: str, lease: timedelta) -> Optional[Any]:
+        """Lease the next job, or None if nothing is due.
+
+        The candidate row is locked with FOR UPDATE SKIP LOCKED, so concurrent
+        workers each take a different job instead of queueing behind one lock.
+        Returns a row with job_id, game_id, lease_token, force and attempts.
+        """
+        candidate = (
+            select(AnalysisJob.job_id)
+            .where(AnalysisJob.status == "queued", AnalysisJob.available_at <= self._now())
+            .order_by(AnalysisJob.priority.desc(), nulls_last(AnalysisJob.end_time.desc()), AnalysisJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        row = self.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.job_id == candidate)
+            .values(
+                status="running",
+                attempts=AnalysisJob.attempts + 1,
+                lease_token=func.gen_random_uuid(),
+                lease_expires_at=self._now() + lease,
+                worker=worker,
+                updated_at=self._now(),
+            )
+            .returning(
+                AnalysisJob.job_id, AnalysisJob.game_id, AnalysisJob.lease_token, AnalysisJob.force,
+                AnalysisJob.attempts,
+            )
+        ).first()
+        self.session.commit()
+        return row
+
+    def _leased(self, job_id: UUID, lease_token: UUID):
+        return update(AnalysisJob).where(
+            AnalysisJob.job_id == job_id, AnalysisJob.lease_token == lease_token, AnalysisJob.status == "running",
+        )
+
+    def stage_complete(self, job_id: UUID, lease_token: UUID) -> bool:
+        """Mark a leased job done. Not committed, so it commits with the saved
+        analysis. False if the lease was lost (expired and taken over, or the
+        job was cancelled)."""
+        result = self.session.execute(
+            self._leased(job_id, lease_token).values(
+                status="done", lease_token=None, lease_expires_at=None,
+                finished_at=self._now(), updated_at=self._now(),
+            )
+        )
+        return result.rowcount == 1
+
+    def fail(self, job_id: UUID, lease_token: UUID, error: str, retry_after: Optional[timedelta] = None) -> bool:
+        """Record a failed attempt: queue the job again after `retry_after` if
+        it has attempts left, otherwise (or without `retry_after`) fail it."""
+        if retry_after is None:
+            status, finished_at = "failed", self._now()
+        else:
+            exhausted = AnalysisJob.attempts >= AnalysisJob.max_attempts
+            status = case((exhausted, "failed"), else_="queued")
+            finished_at = case((exhausted, self._now()), else_=None)
+        result = self.session.execute(
+            self._leased(job_id, lease_token).values(
+                status=status,
+                finished_at=finished_at,
+                available_at=self._now() + (retry_after or timedelta(0)),
+                last_error=error,
+                lease_token=None,
+                lease_expires_at=None,
+                updated_at=self._now(),
+            )
+        )
+        self.session.commit()
+        return result.rowcount == 1
+
+    def cancel(self, user_id: UUID, game_id: Optional[UUID] = None) -> int:
+        """Cancel a user's active jobs (one game's, or all). A running job's
+        worker loses its lease and discards its result."""
+        q = self.session.query(AnalysisJob).filter(
+            AnalysisJob.user_id == user_id, AnalysisJob.status.in_(self.ACTIVE_STATUSES),
+        )
+        if game_id is not None:
+            q = q.filter(AnalysisJob.game_id == game_id)
+        cancelled = q.update(
+            {
+                "status": "cancelled", "lease_token": None, "lease_expires_at": None,
+                "finished_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        self.session.commit()
+        return cancelled
+
+    def counts(self, user_id: Optional[UUID] = None) -> Dict[str, int]:
+        """Number of jobs in each status, for one user or the whole queue."""
+        q = self.session.query(AnalysisJob.status, func.count()).group_by(AnalysisJob.status)
+        if user_id is not None:
+            q = q.filter(AnalysisJob.user_id == user_id)
+        counts = dict.fromkeys(self.STATUSES, 0)
+        counts.update(q.all())
+        return counts
+
+    def queued_ahead(self, user_id: UUID) -> Optional[int]:
+        """How many queued jobs (anyone's) will be taken before the user's
+        next one, or None if the user has nothing queued."""
+        mine = (
+            self.session.query(AnalysisJob.priority, AnalysisJob.end_time, AnalysisJob.created_at)
+            .filter(AnalysisJob.user_id == user_id, AnalysisJob.status == "queued")
+            .order_by(AnalysisJob.priority.desc(), nulls_last(AnalysisJob.end_time.desc()), AnalysisJob.created_at)
+            .first()
+        )
+        if mine is None:
+            return None
+        priority, end_time, created_at = mine
+        # Dequeue order: priority desc, end_time desc nulls last, created_at
+        ends_later = (
+            AnalysisJob.end_time.isnot(None) if end_time is None else AnalysisJob.end_time > end_time
+        )
+        same_end = AnalysisJob.end_time.is_(None) if end_time is None else AnalysisJob.end_time == end_time
+        return (
+            self.session.query(func.count())
+            .select_from(AnalysisJob)
+            .filter(
+                AnalysisJob.status == "queued",
+                or_(
+                    AnalysisJob.priority > priority,
+                    (AnalysisJob.priority == priority) & ends_later,
+                    (AnalysisJob.priority == priority) & same_end & (AnalysisJob.created_at < created_at),
+                ),
+            )
+            .scalar()
+        )
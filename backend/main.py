@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,11 +9,24 @@ import db
 from api.user import router as user_router
 from api.chess import router as games_router
 from api.puzzles import router as puzzles_router
+from api.evals import router as evals_router
+from services.import_jobs import resume_import_jobs
+from services.puzzle_generation import shutdown_pools
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up imports queued before the last shutdown
+    resume_import_jobs()
+    yield
+    shutdown_pools()
+
 
 app = FastAPI(
     title="Chess API",
     version="1.0.0",
-    description="API for chess game analysis and user management"
+    description="API for chess game analysis and user management",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -27,6 +42,7 @@ app.add_middleware(
 app.include_router(user_router)
 app.include_router(games_router)
 app.include_router(puzzles_router)
+app.include_router(evals_router)
 
 
 @app.get("/health")
@@ -10,7 +10,10 @@ from db.base import Base  # <-- your Base
 from core.config import settings  # <-- loads .env
 
 # Import all models so Alembic can detect them
-from db.models import User, UserGame, UserPuzzle  # noqa: F401
+from db.models import (  # noqa: F401
+    User, UserGame, GameMove, MistakeIndex, ExplorerMove, GamePosition, GameMaterial, UserPuzzle, ImportWatermark,
+    ImportJob, AnalysisJob, PositionEval,
+)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,56 @@
+"""add import_watermarks table
+
+Revision ID: 5a7c2e9d1b34
+Revises: 4fd3b91e8a12
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7c2e9d1b34"
+down_revision: Union[str, Sequence[str], None] = "4fd3b91e8a12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "import_watermarks",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("chess_com_username", sa.String(), primary_key=True),
+        sa.Column("time_class", sa.String(), primary_key=True),
+        sa.Column("covered_from_month", sa.Integer(), nullable=False),
+        sa.Column("covered_through_month", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+    )
+    # Seed from games already stored, but only with the month of the newest
+    # game: earlier imports fetched just their timeframe's window, so months
+    # between the oldest and newest stored games may never have been crawled.
+    # A one-month range skips nothing; the next import widens it from there.
+    op.execute(
+        """
+        INSERT INTO import_watermarks
+            (user_id, chess_com_username, time_class, covered_from_month, covered_through_month)
+        SELECT
+            user_id,
+            lower(chess_com_username),
+            time_class,
+            to_char(to_timestamp(max(end_time)) AT TIME ZONE 'UTC', 'YYYYMM')::int,
+            to_char(to_timestamp(max(end_time)) AT TIME ZONE 'UTC', 'YYYYMM')::int
+        FROM user_games
+        WHERE end_time IS NOT NULL AND time_class IS NOT NULL
+        GROUP BY user_id, lower(chess_com_username), time_class
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("import_watermarks")
@@ -0,0 +1,56 @@
+"""add import_jobs table
+
+Revision ID: 6b8d3f0e2c45
+Revises: 5a7c2e9d1b34
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6b8d3f0e2c45"
+down_revision: Union[str, Sequence[str], None] = "5a7c2e9d1b34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "import_jobs",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chess_com_username", sa.String(), nullable=False),
+        sa.Column("timeframe", sa.String(), nullable=False),
+        sa.Column("game_types", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="queued"),
+        sa.Column("months_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("months_done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("games_fetched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("games_added", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("errors", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_import_jobs_user_id", "import_jobs", ["user_id"], unique=False)
+    # At most one queued/running job per user and request; duplicates merge into it.
+    op.create_index(
+        "uq_import_jobs_active",
+        "import_jobs",
+        ["user_id", "timeframe", "game_types"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_import_jobs_active", table_name="import_jobs")
+    op.drop_index("ix_import_jobs_user_id", table_name="import_jobs")
+    op.drop_table("import_jobs")
@@ -0,0 +1,90 @@
+"""add game_moves table
+
+Revision ID: 7c9e4a1f3d56
+Revises: 6b8d3f0e2c45
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c9e4a1f3d56"
+down_revision: Union[str, Sequence[str], None] = "6b8d3f0e2c45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "game_moves",
+        sa.Column("game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("user_games.game_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("half_move_index", sa.Integer(), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("move_number", sa.Integer(), nullable=False),
+        sa.Column("side", sa.String(), nullable=False),
+        sa.Column("is_user_move", sa.Boolean(), nullable=False, server_default="false"),
+        sa.Column("san", sa.String(), nullable=True),
+        sa.Column("uci", sa.String(), nullable=True),
+        sa.Column("fen_before", sa.Text(), nullable=True),
+        sa.Column("eval_before_type", sa.String(), nullable=True),
+        sa.Column("eval_before_value", sa.Integer(), nullable=True),
+        sa.Column("eval_after_type", sa.String(), nullable=True),
+        sa.Column("eval_after_value", sa.Integer(), nullable=True),
+        sa.Column("best_move", sa.String(), nullable=True),
+        sa.Column("pv", sa.Text(), nullable=True),
+        sa.Column("cp_loss", sa.Float(), nullable=True),
+        sa.Column("classification", sa.String(), nullable=True),
+    )
+    # Common mistakes scan the user's own moves; puzzles scan the opponent's mistakes.
+    op.create_index("ix_game_moves_user_id_is_user_move", "game_moves", ["user_id", "is_user_move"], unique=False)
+    op.create_index("ix_game_moves_user_id_classification", "game_moves", ["user_id", "classification"], unique=False)
+
+    # Backfill from the analysed_game JSON of already analysed games
+    op.execute("""
+        INSERT INTO game_moves (
+            game_id, half_move_index, user_id, move_number, side, is_user_move, san, uci, fen_before,
+            eval_before_type, eval_before_value, eval_after_type, eval_after_value,
+            best_move, pv, cp_loss, classification
+        )
+        SELECT
+            g.game_id,
+            m.ord - 1,
+            g.user_id,
+            COALESCE((m.move->>'move_number')::int, (m.ord - 1) / 2 + 1),
+            COALESCE(m.move->>'side', CASE WHEN m.ord % 2 = 1 THEN 'white' ELSE 'black' END),
+            COALESCE(m.move->>'side', CASE WHEN m.ord % 2 = 1 THEN 'white' ELSE 'black' END) =
+                CASE
+                    WHEN lower(g.white_username) = lower(g.chess_com_username) THEN 'white'
+                    WHEN lower(g.black_username) = lower(g.chess_com_username) THEN 'black'
+                    ELSE ''
+                END,
+            m.move->>'san',
+            m.move->>'uci',
+            m.move->>'fen_before',
+            m.move->'eval_before'->>'type',
+            round((m.move->'eval_before'->>'value')::numeric)::int,
+            m.move->'eval_after'->>'type',
+            round((m.move->'eval_after'->>'value')::numeric)::int,
+            m.move->>'best_move',
+            NULLIF(m.move->'top_lines'->0->>'Line', ''),
+            (m.move->>'cp_loss')::float,
+            lower(m.move->>'classification')
+        FROM user_games g
+        CROSS JOIN LATERAL json_array_elements(
+            CASE WHEN json_typeof(g.analysed_game->'moves') = 'array' THEN g.analysed_game->'moves' ELSE '[]'::json END
+        ) WITH ORDINALITY AS m(move, ord)
+        WHERE g.analysed_game IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_game_moves_user_id_classification", table_name="game_moves")
+    op.drop_index("ix_game_moves_user_id_is_user_move", table_name="game_moves")
+    op.drop_table("game_moves")
@@ -0,0 +1,59 @@
+"""add wc_loss and plies_from_end to game_moves
+
+Revision ID: 8d1f5b2a4e67
+Revises: 7c9e4a1f3d56
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d1f5b2a4e67"
+down_revision: Union[str, Sequence[str], None] = "7c9e4a1f3d56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Winning chances (Lichess sigmoid) of a stored eval, from White's point of view
+WC_BEFORE = """CASE WHEN eval_before_type = 'mate' THEN sign(eval_before_value - 0.5)
+    ELSE 2.0 / (1.0 + exp(-0.00368208 * eval_before_value)) - 1.0 END"""
+WC_AFTER = """CASE WHEN eval_after_type = 'mate' THEN sign(eval_after_value - 0.5)
+    ELSE 2.0 / (1.0 + exp(-0.00368208 * eval_after_value)) - 1.0 END"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("game_moves", sa.Column("wc_loss", sa.Float(), nullable=True))
+    op.add_column("game_moves", sa.Column("plies_from_end", sa.Integer(), nullable=True))
+    op.execute(f"""
+        UPDATE game_moves AS m SET
+            wc_loss = CASE
+                WHEN m.eval_before_type IS NULL OR m.eval_after_type IS NULL THEN NULL
+                WHEN m.side = 'white' THEN greatest(0, ({WC_BEFORE}) - ({WC_AFTER}))
+                ELSE greatest(0, ({WC_AFTER}) - ({WC_BEFORE}))
+            END,
+            plies_from_end = t.total - m.half_move_index
+        FROM (SELECT game_id, count(*) AS total FROM game_moves GROUP BY game_id) AS t
+        WHERE t.game_id = m.game_id
+    """)
+    op.alter_column("game_moves", "plies_from_end", nullable=False)
+    # Common mistakes only ever look at the user's moves above a wc_loss threshold
+    op.drop_index("ix_game_moves_user_id_is_user_move", table_name="game_moves")
+    op.create_index(
+        "ix_game_moves_user_id_wc_loss",
+        "game_moves",
+        ["user_id", "wc_loss"],
+        unique=False,
+        postgresql_where=sa.text("is_user_move"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_game_moves_user_id_wc_loss", table_name="game_moves")
+    op.create_index("ix_game_moves_user_id_is_user_move", "game_moves", ["user_id", "is_user_move"], unique=False)
+    op.drop_column("game_moves", "plies_from_end")
+    op.drop_column("game_moves", "wc_loss")
@@ -0,0 +1,85 @@
+"""add mistake_index table
+
+Revision ID: 9e2a6c3b5f78
+Revises: 8d1f5b2a4e67
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e2a6c3b5f78"
+down_revision: Union[str, Sequence[str], None] = "8d1f5b2a4e67"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Thresholds as of this revision (services.game_analysis)
+OPENING_WC_THRESHOLD = 0.2
+ENDGAME_WC_THRESHOLD = 0.2
+OPENING_MAX_MOVE = 12
+ENDGAME_LAST_HALF_MOVES = 40
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "mistake_index",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("phase", sa.String(), nullable=False),
+        sa.Column("fen", sa.Text(), nullable=False),
+        sa.Column("played_move", sa.String(), nullable=False),
+        sa.Column("time_class", sa.String(), nullable=True),
+        sa.Column("end_day", sa.Integer(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("wc_loss_sum", sa.Float(), nullable=False),
+        sa.Column("last_end_time", sa.BigInteger(), nullable=True),
+        sa.Column("refs", sa.JSON(), nullable=False),
+    )
+    op.create_index(
+        "uq_mistake_index_key",
+        "mistake_index",
+        ["user_id", "phase", "fen", "played_move", "time_class", "end_day"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+
+    # Backfill from the game_moves of already analysed games
+    op.execute(f"""
+        INSERT INTO mistake_index (
+            id, user_id, phase, fen, played_move, time_class, end_day, count, wc_loss_sum, last_end_time, refs
+        )
+        SELECT
+            gen_random_uuid(),
+            m.user_id,
+            p.phase,
+            m.fen_before,
+            COALESCE(m.san, ''),
+            g.time_class,
+            g.end_time / 86400,
+            count(*),
+            sum(round(m.wc_loss::numeric, 3))::float,
+            max(g.end_time),
+            json_agg(json_build_array(
+                g.end_time, m.game_id, m.half_move_index, m.best_move, round(m.wc_loss::numeric, 3)::float
+            ))
+        FROM game_moves m
+        JOIN user_games g ON g.game_id = m.game_id
+        CROSS JOIN LATERAL (VALUES
+            ('opening', m.move_number <= {OPENING_MAX_MOVE} AND m.wc_loss >= {OPENING_WC_THRESHOLD}),
+            ('endgame', m.plies_from_end <= {ENDGAME_LAST_HALF_MOVES} AND m.wc_loss >= {ENDGAME_WC_THRESHOLD})
+        ) AS p(phase, hit)
+        WHERE m.is_user_move AND g.is_analysed AND m.fen_before IS NOT NULL AND p.hit
+        GROUP BY m.user_id, p.phase, m.fen_before, COALESCE(m.san, ''), g.time_class, g.end_time / 86400
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_mistake_index_key", table_name="mistake_index")
+    op.drop_table("mistake_index")
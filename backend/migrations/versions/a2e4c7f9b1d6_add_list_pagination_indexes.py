@@ -0,0 +1,55 @@
+"""add keyset pagination indexes and user_puzzles.end_time
+
+Revision ID: a2e4c7f9b1d6
+Revises: f1d3b6c8e0a5
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a2e4c7f9b1d6"
+down_revision: Union[str, Sequence[str], None] = "f1d3b6c8e0a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Pages of GET /games walk these in order from the cursor's key
+    op.create_index(
+        "ix_user_games_user_id_end_time",
+        "user_games",
+        ["user_id", sa.text("end_time DESC NULLS LAST"), sa.text("game_id DESC")],
+    )
+    op.create_index(
+        "ix_user_games_user_id_time_class_end_time",
+        "user_games",
+        ["user_id", "time_class", sa.text("end_time DESC NULLS LAST"), sa.text("game_id DESC")],
+    )
+    op.create_index("ix_user_games_user_id_is_analysed", "user_games", ["user_id", "is_analysed"])
+
+    # Puzzles are listed by their game's end_time; a copy saves joining user_games to sort
+    op.add_column("user_puzzles", sa.Column("end_time", sa.BigInteger(), nullable=True))
+    op.execute(
+        "UPDATE user_puzzles SET end_time = user_games.end_time "
+        "FROM user_games WHERE user_games.game_id = user_puzzles.game_id"
+    )
+    op.create_index(
+        "ix_user_puzzles_user_id_end_time",
+        "user_puzzles",
+        ["user_id", sa.text("end_time DESC NULLS LAST"), sa.text("game_id DESC"), sa.text("source_half_move_index DESC")],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_user_puzzles_user_id_end_time", table_name="user_puzzles")
+    op.drop_column("user_puzzles", "end_time")
+    op.drop_index("ix_user_games_user_id_is_analysed", table_name="user_games")
+    op.drop_index("ix_user_games_user_id_time_class_end_time", table_name="user_games")
+    op.drop_index("ix_user_games_user_id_end_time", table_name="user_games")
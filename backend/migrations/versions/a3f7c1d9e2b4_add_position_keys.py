@@ -0,0 +1,121 @@
+"""add position keys to game_moves and mistake_index
+
+Revision ID: a3f7c1d9e2b4
+Revises: 9e2a6c3b5f78
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import chess
+import chess.polyglot
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f7c1d9e2b4"
+down_revision: Union[str, Sequence[str], None] = "9e2a6c3b5f78"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Thresholds as of this revision (services.move_scoring)
+OPENING_WC_THRESHOLD = 0.2
+ENDGAME_WC_THRESHOLD = 0.2
+OPENING_MAX_MOVE = 12
+ENDGAME_LAST_HALF_MOVES = 40
+
+
+def _position_key(fen: str):
+    try:
+        key = chess.polyglot.zobrist_hash(chess.Board(fen))
+    except ValueError:
+        return None
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def _rebuild_mistake_index(key_column: str) -> None:
+    """Refill mistake_index from game_moves, keyed on `key_column` of game_moves."""
+    op.execute("DELETE FROM mistake_index")
+    fen = "m.fen_before" if key_column == "fen_before" else "(array_agg(m.fen_before ORDER BY g.end_time DESC NULLS LAST))[1]"
+    key_insert = ", position_key" if key_column == "position_key" else ""
+    key_select = ", m.position_key" if key_column == "position_key" else ""
+    op.execute(f"""
+        INSERT INTO mistake_index (
+            id, user_id, phase{key_insert}, fen, played_move, time_class, end_day,
+            count, wc_loss_sum, last_end_time, refs
+        )
+        SELECT
+            gen_random_uuid(),
+            m.user_id,
+            p.phase{key_select},
+            {fen},
+            COALESCE(m.san, ''),
+            g.time_class,
+            g.end_time / 86400,
+            count(*),
+            sum(round(m.wc_loss::numeric, 3))::float,
+            max(g.end_time),
+            json_agg(json_build_array(
+                g.end_time, m.game_id, m.half_move_index, m.best_move, round(m.wc_loss::numeric, 3)::float
+            ))
+        FROM game_moves m
+        JOIN user_games g ON g.game_id = m.game_id
+        CROSS JOIN LATERAL (VALUES
+            ('opening', m.move_number <= {OPENING_MAX_MOVE} AND m.wc_loss >= {OPENING_WC_THRESHOLD}),
+            ('endgame', m.plies_from_end <= {ENDGAME_LAST_HALF_MOVES} AND m.wc_loss >= {ENDGAME_WC_THRESHOLD})
+        ) AS p(phase, hit)
+        WHERE m.is_user_move AND g.is_analysed AND m.{key_column} IS NOT NULL AND p.hit
+        GROUP BY m.user_id, p.phase, m.{key_column}, COALESCE(m.san, ''), g.time_class, g.end_time / 86400
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("game_moves", sa.Column("position_key", sa.BigInteger(), nullable=True))
+
+    # Hash each distinct FEN once in Python, then update game_moves in one statement
+    bind = op.get_bind()
+    op.execute("CREATE TEMP TABLE fen_position_keys (fen text PRIMARY KEY, position_key bigint) ON COMMIT DROP")
+    fens = bind.execute(sa.text("SELECT DISTINCT fen_before FROM game_moves WHERE fen_before IS NOT NULL"))
+    insert_keys = sa.text("INSERT INTO fen_position_keys (fen, position_key) VALUES (:fen, :position_key)")
+    while batch := fens.fetchmany(BACKFILL_BATCH_SIZE):
+        bind.execute(insert_keys, [{"fen": fen, "position_key": _position_key(fen)} for (fen,) in batch])
+    op.execute("""
+        UPDATE game_moves m SET position_key = k.position_key
+        FROM fen_position_keys k
+        WHERE m.fen_before = k.fen
+    """)
+    op.create_index("ix_game_moves_user_id_position_key", "game_moves", ["user_id", "position_key"], unique=False)
+
+    # Regroup the mistake index by position key
+    op.drop_index("uq_mistake_index_key", table_name="mistake_index")
+    op.execute("DELETE FROM mistake_index")
+    op.add_column("mistake_index", sa.Column("position_key", sa.BigInteger(), nullable=False))
+    op.create_index(
+        "uq_mistake_index_key",
+        "mistake_index",
+        ["user_id", "phase", "position_key", "played_move", "time_class", "end_day"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    _rebuild_mistake_index("position_key")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_mistake_index_key", table_name="mistake_index")
+    op.execute("DELETE FROM mistake_index")
+    op.drop_column("mistake_index", "position_key")
+    op.create_index(
+        "uq_mistake_index_key",
+        "mistake_index",
+        ["user_id", "phase", "fen", "played_move", "time_class", "end_day"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    _rebuild_mistake_index("fen_before")
+    op.drop_index("ix_game_moves_user_id_position_key", table_name="game_moves")
+    op.drop_column("game_moves", "position_key")
@@ -0,0 +1,47 @@
+"""add explorer_moves table
+
+Revision ID: b5e8d2f4a6c1
+Revises: a3f7c1d9e2b4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e8d2f4a6c1"
+down_revision: Union[str, Sequence[str], None] = "a3f7c1d9e2b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled in by imports and analysis saves; existing games are added with
+    # `python -m scripts.rebuild_explorer --all` (replaying PGNs is too slow
+    # for a migration).
+    op.create_table(
+        "explorer_moves",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("position_key", sa.BigInteger(), primary_key=True),
+        sa.Column("color", sa.String(), primary_key=True),
+        sa.Column("uci", sa.String(), primary_key=True),
+        sa.Column("san", sa.String(), nullable=False),
+        sa.Column("games", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("wins", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("draws", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("losses", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("eval_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("eval_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("wc_loss_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("wc_loss_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("explorer_moves")
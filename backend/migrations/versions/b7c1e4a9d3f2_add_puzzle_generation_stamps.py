@@ -0,0 +1,37 @@
+"""add user_games analysed_at and puzzles_analysed_at
+
+Revision ID: b7c1e4a9d3f2
+Revises: a2e4c7f9b1d6
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7c1e4a9d3f2"
+down_revision: Union[str, Sequence[str], None] = "a2e4c7f9b1d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("user_games", sa.Column("analysed_at", sa.DateTime(), nullable=True))
+    op.add_column("user_games", sa.Column("puzzles_analysed_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE user_games SET analysed_at = now() AT TIME ZONE 'utc' WHERE is_analysed")
+    # Games that already have a puzzle count as done; games that had no
+    # candidate are looked at once more by the next generation
+    op.execute(
+        "UPDATE user_games SET puzzles_analysed_at = analysed_at "
+        "WHERE is_analysed AND EXISTS (SELECT 1 FROM user_puzzles WHERE user_puzzles.game_id = user_games.game_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("user_games", "puzzles_analysed_at")
+    op.drop_column("user_games", "analysed_at")
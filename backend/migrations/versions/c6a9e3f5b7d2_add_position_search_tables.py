@@ -0,0 +1,62 @@
+"""add game_positions and game_material tables
+
+Revision ID: c6a9e3f5b7d2
+Revises: b5e8d2f4a6c1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c6a9e3f5b7d2"
+down_revision: Union[str, Sequence[str], None] = "b5e8d2f4a6c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled in by imports and analysis saves; existing games are added with
+    # `python -m scripts.rebuild_position_index --all`.
+    op.create_table(
+        "game_positions",
+        sa.Column(
+            "game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("user_games.game_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("ply", sa.Integer(), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("position_key", sa.BigInteger(), nullable=False),
+    )
+    op.create_index(
+        "ix_game_positions_user_id_position_key", "game_positions", ["user_id", "position_key", "game_id"],
+    )
+    op.create_table(
+        "game_material",
+        sa.Column(
+            "game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("user_games.game_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("material", sa.String(), primary_key=True),
+        sa.Column("white_pawns", sa.Integer(), primary_key=True),
+        sa.Column("black_pawns", sa.Integer(), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("first_ply", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_game_material_user_id_material", "game_material",
+        ["user_id", "material", "white_pawns", "black_pawns", "game_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_game_material_user_id_material", table_name="game_material")
+    op.drop_table("game_material")
+    op.drop_index("ix_game_positions_user_id_position_key", table_name="game_positions")
+    op.drop_table("game_positions")
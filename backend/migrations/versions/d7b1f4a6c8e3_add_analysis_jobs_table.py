@@ -0,0 +1,78 @@
+"""add analysis_jobs table
+
+Revision ID: d7b1f4a6c8e3
+Revises: c6a9e3f5b7d2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d7b1f4a6c8e3"
+down_revision: Union[str, Sequence[str], None] = "c6a9e3f5b7d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "analysis_jobs",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("user_games.game_id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="queued"),
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("end_time", sa.BigInteger(), nullable=True),
+        sa.Column("force", sa.Boolean(), nullable=False, server_default="false"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("available_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.Column("lease_token", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("worker", sa.String(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    # At most one queued/running job per game; enqueueing again reprioritises it.
+    op.create_index(
+        "uq_analysis_jobs_active_game",
+        "analysis_jobs",
+        ["game_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    # Dequeue order, over queued jobs only
+    op.create_index(
+        "ix_analysis_jobs_dequeue",
+        "analysis_jobs",
+        [sa.text("priority DESC"), sa.text("end_time DESC NULLS LAST"), "created_at"],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    # Expired leases, over running jobs only
+    op.create_index(
+        "ix_analysis_jobs_lease_expires_at",
+        "analysis_jobs",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("status = 'running'"),
+    )
+    op.create_index("ix_analysis_jobs_user_id_status", "analysis_jobs", ["user_id", "status"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_analysis_jobs_user_id_status", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_lease_expires_at", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_dequeue", table_name="analysis_jobs")
+    op.drop_index("uq_analysis_jobs_active_game", table_name="analysis_jobs")
+    op.drop_table("analysis_jobs")
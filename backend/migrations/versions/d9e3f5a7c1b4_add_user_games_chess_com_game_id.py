@@ -0,0 +1,54 @@
+"""add user_games.chess_com_game_id
+
+Revision ID: d9e3f5a7c1b4
+Revises: b7c1e4a9d3f2
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9e3f5a7c1b4"
+down_revision: Union[str, Sequence[str], None] = "b7c1e4a9d3f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("user_games", sa.Column("chess_com_game_id", sa.String(), nullable=True))
+    # Games from the API and from PGN exports both carry a Link header. Where a
+    # game is already stored twice, only one copy (the analysed one if any) gets
+    # the id, so the unique index can be built without deleting games.
+    op.execute(r"""
+        UPDATE user_games SET chess_com_game_id = linked.chess_com_game_id
+        FROM (
+            SELECT DISTINCT ON (user_id, chess_com_game_id) game_id, chess_com_game_id
+            FROM (
+                SELECT game_id, user_id, is_analysed,
+                       substring(pgn FROM '\[Link "https?://[a-z.]*chess\.com/game/((live|daily)/[0-9]+)')
+                           AS chess_com_game_id
+                FROM user_games
+            ) links
+            WHERE chess_com_game_id IS NOT NULL
+            ORDER BY user_id, chess_com_game_id, is_analysed DESC, game_id
+        ) linked
+        WHERE user_games.game_id = linked.game_id
+    """)
+    op.create_index(
+        "uq_user_games_user_chess_com_game_id",
+        "user_games",
+        ["user_id", "chess_com_game_id"],
+        unique=True,
+        postgresql_where=sa.text("chess_com_game_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_user_games_user_chess_com_game_id", table_name="user_games")
+    op.drop_column("user_games", "chess_com_game_id")
@@ -0,0 +1,39 @@
+"""add position_evals table
+
+Revision ID: e8c2a5b7d9f4
+Revises: d7b1f4a6c8e3
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8c2a5b7d9f4"
+down_revision: Union[str, Sequence[str], None] = "d7b1f4a6c8e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "position_evals",
+        sa.Column("position_key", sa.BigInteger(), primary_key=True),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.Column("multipv", sa.Integer(), nullable=False),
+        sa.Column("eval_type", sa.String(), nullable=False),
+        sa.Column("eval_value", sa.Integer(), nullable=False),
+        sa.Column("best_move", sa.String(), nullable=False),
+        sa.Column("top_lines", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("position_evals")
@@ -0,0 +1,32 @@
+"""add user_games.analysis_blob
+
+Revision ID: f1d3b6c8e0a5
+Revises: e8c2a5b7d9f4
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f1d3b6c8e0a5"
+down_revision: Union[str, Sequence[str], None] = "e8c2a5b7d9f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # New analyses are stored compact; existing JSON ones are converted with
+    # `python -m scripts.compact_analyses` (it replays every PGN).
+    op.add_column("user_games", sa.Column("analysis_blob", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Expand compact analyses back to JSON first, or they are lost:
+    # `python -m scripts.compact_analyses --expand`
+    op.drop_column("user_games", "analysis_blob")
@@ -1,7 +1,16 @@
 from .user_request import SignUpRequest, SignInRequest, UpdateChessComUsername
 from .user_response import UserResponse, TokenResponse
-from .chess_request import FetchGamesRequest, Timeframe, GameType, AnalysedGame
-from .chess_response import ChessComGame, GameResponse, ListGamesResponse, CommonMistake, CommonMistakesResponse
+from .chess_request import (
+    FetchGamesRequest, Timeframe, GameType, AnalysedGame, EnqueueAnalysisRequest, EvalLookupRequest,
+    BatchAnalysedGame, AnalysedGamesBatch,
+)
+from .chess_response import (
+    ChessComGame, GameResponse, ListGamesResponse, CommonMistake, CommonMistakesResponse, ImportJobResponse,
+    PgnImportResponse, ExplorerMoveStats, ExplorerResponse, GameSearchHit, GameSearchResponse,
+    AnalysisQueueResponse, AnalysisEnqueueResponse, AnalysisCancelResponse,
+    PositionEvalResult, EvalLookupResponse,
+    BatchAnalysisStatus, BatchAnalysisResponse,
+)
 from .puzzle_response import (
     PuzzleCandidateResponse,
     UserPuzzleResponse,
@@ -23,8 +32,25 @@ __all__ = [
     "GameResponse",
     "ListGamesResponse",
     "AnalysedGame",
+    "EnqueueAnalysisRequest",
+    "EvalLookupRequest",
+    "BatchAnalysedGame",
+    "AnalysedGamesBatch",
     "CommonMistake",
     "CommonMistakesResponse",
+    "ImportJobResponse",
+    "PgnImportResponse",
+    "ExplorerMoveStats",
+    "ExplorerResponse",
+    "GameSearchHit",
+    "GameSearchResponse",
+    "AnalysisQueueResponse",
+    "AnalysisEnqueueResponse",
+    "AnalysisCancelResponse",
+    "PositionEvalResult",
+    "EvalLookupResponse",
+    "BatchAnalysisStatus",
+    "BatchAnalysisResponse",
     "PuzzleCandidateResponse",
     "UserPuzzleResponse",
     "ListPuzzlesResponse",
@@ -1,5 +1,6 @@
 from enum import Enum
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
 from typing import Any
 from pydantic import BaseModel, Field
@@ -34,3 +35,26 @@ class AnalysedGame(BaseModel):
     white_accuracy: float = Field(description="White's overall accuracy percentage")
     black_accuracy: float = Field(description="Black's overall accuracy percentage")
     user_blunder_count: float = Field(description="Number of blunders made by the user")
+
+
+class BatchAnalysedGame(AnalysedGame):
+    game_id: UUID
+
+
+class AnalysedGamesBatch(BaseModel):
+    games: List[BatchAnalysedGame] = Field(min_length=1, max_length=100, description="Analyses to save, up to 100")
+
+
+class EnqueueAnalysisRequest(BaseModel):
+    game_ids: Optional[List[UUID]] = Field(
+        default=None,
+        description="Games to analyse; defaults to all of your unanalysed games",
+    )
+    open: bool = Field(default=False, description="The games are open in the app, so analyse them first")
+    force: bool = Field(default=False, description="Analyse games again even if they already have an analysis")
+
+
+class EvalLookupRequest(BaseModel):
+    fens: List[str] = Field(description="Positions to look up, in the order results are returned")
+    depth: Optional[int] = Field(default=None, ge=1, description="Minimum search depth; defaults to the server's")
+    multipv: int = Field(default=1, ge=1, description="Minimum number of lines searched")
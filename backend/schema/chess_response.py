@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 from pydantic import BaseModel, Field
@@ -35,7 +36,7 @@ class GameResponse(BaseModel):
     model_config = {"from_attributes": True}
 
     game_id: UUID
-    pgn: str
+    pgn: Optional[str] = None  # left out of GET /games unless include_pgn
     tcn: Optional[str] = None
     chess_com_username: str
     chess_com_game_uuid: Optional[str] = None
@@ -56,7 +57,8 @@ class GameResponse(BaseModel):
 
 class ListGamesResponse(BaseModel):
     games: List[GameResponse]
-    total: int
+    total: int  # games on this page
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next page; null on the last page")
 
 
 class MistakeOccurrence(BaseModel):
@@ -92,3 +94,113 @@ class CommonMistakesResponse(BaseModel):
     opening_mistakes: List[CommonMistake]
     endgame_mistakes: List[CommonMistake]
     total_analysed: int
+
+
+class ExplorerMoveStats(BaseModel):
+    uci: str
+    san: str
+    games: int
+    wins: int
+    draws: int
+    losses: int
+    avg_eval: Optional[float] = Field(None, description="Average eval after the move in centipawns, from your side")
+    avg_wc_loss: Optional[float] = Field(None, description="Average winning chances lost by the side moving")
+    analysed: int = Field(description="Occurrences with an engine eval")
+
+
+class ExplorerResponse(BaseModel):
+    fen: str
+    games: int
+    moves: List[ExplorerMoveStats]
+
+
+class GameSearchHit(BaseModel):
+    model_config = {"from_attributes": True}
+
+    game_id: UUID
+    ply: int = Field(description="First half-move at which the game matched; 0 is the starting position")
+    end_time: Optional[int] = None
+    time_class: Optional[str] = None
+    time_control: Optional[str] = None
+    white_username: Optional[str] = None
+    black_username: Optional[str] = None
+    white_result: Optional[str] = None
+    black_result: Optional[str] = None
+    white_rating: Optional[int] = None
+    black_rating: Optional[int] = None
+    is_analysed: bool = False
+
+
+class GameSearchResponse(BaseModel):
+    games: List[GameSearchHit]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next page; null on the last page")
+
+
+class ImportJobResponse(BaseModel):
+    model_config = {"from_attributes": True}
+
+    job_id: UUID
+    status: str
+    timeframe: str
+    game_types: str
+    months_total: int = 0
+    months_done: int = 0
+    games_fetched: int = 0
+    games_added: int = 0
+    errors: List[str] = Field(default_factory=list)
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class PgnImportResponse(BaseModel):
+    games_read: int
+    games_added: int
+    games_skipped: int
+    seconds: float
+    games_per_second: float
+
+
+class AnalysisQueueResponse(BaseModel):
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    queued_ahead: Optional[int] = Field(
+        default=None, description="Jobs (anyone's) that will run before your next queued one",
+    )
+    total_queued: int = Field(default=0, description="Queued jobs across all users")
+
+
+class AnalysisEnqueueResponse(BaseModel):
+    enqueued: int = Field(description="Jobs queued, or raised to a higher priority")
+    queue: AnalysisQueueResponse
+
+
+class AnalysisCancelResponse(BaseModel):
+    cancelled: int
+    queue: AnalysisQueueResponse
+
+
+class PositionEvalResult(BaseModel):
+    evaluation: Dict[str, Any]
+    best_move: str
+    top_lines: List[Dict[str, Any]]
+    depth: int
+
+
+class EvalLookupResponse(BaseModel):
+    results: List[Optional[PositionEvalResult]] = Field(description="One per requested FEN; null if not cached")
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class BatchAnalysisStatus(BaseModel):
+    game_id: UUID
+    status: str = Field(description='"saved", "not_found", "forbidden", or "duplicate" (a later entry has the same game)')
+
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[BatchAnalysisStatus] = Field(description="One per submitted analysis, in request order")
+    saved: int
@@ -29,7 +29,8 @@ class UserPuzzleResponse(BaseModel):
 
 class ListPuzzlesResponse(BaseModel):
     puzzles: List[UserPuzzleResponse]
-    total: int
+    total: int  # puzzles on this page
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next page; null on the last page")
 
 
 class ClassifyPuzzleResponse(BaseModel):
@@ -46,4 +47,5 @@ class GeneratePuzzlesResponse(BaseModel):
     generated: int
     skipped: int
     failed: int
+    up_to_date: int = 0
     errors: List[str] = Field(default_factory=list)
@@ -0,0 +1,66 @@
+"""Analyse stored games with a pool of local Stockfish processes and save the results.
+
+Picks games without an analysis, newest first, and writes the same analysis the
+browser would. Depth, node limit, engine and pool size default to the
+ANALYSIS_* / STOCKFISH_PATH settings.
+
+Usage (from backend/):
+    python -m scripts.analyse_games --user alice --limit 200
+    python -m scripts.analyse_games --all --workers 8 --depth 16
+    python -m scripts.analyse_games --user alice --engine "python -m scripts.fake_uci_engine"
+"""
+import argparse
+import logging
+import sys
+
+from db.repositories import UserGameRepository, UserRepository
+from db.sessions import SessionLocal
+from services.engine_analysis import analyse_games, engine_limit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user", help="Username or email of one account")
+    target.add_argument("--all", action="store_true", help="Every account")
+    parser.add_argument("--limit", type=int, help="Analyse at most this many games")
+    parser.add_argument("--workers", type=int, help="Engine processes (default: one per core)")
+    parser.add_argument("--depth", type=int, help="Search depth per position")
+    parser.add_argument("--nodes", type=int, help="Node limit per position")
+    parser.add_argument("--engine", help="Engine command line (default: STOCKFISH_PATH)")
+    parser.add_argument("--verbose", action="store_true", help="Log every game")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+
+    session = SessionLocal()
+    try:
+        user_id = None
+        if not args.all:
+            user_repo = UserRepository(session)
+            user = user_repo.get_by_username(args.user) or user_repo.get_by_email(args.user.lower())
+            if not user:
+                sys.exit(f"No user with username or email {args.user!r}")
+            user_id = user.id
+        game_ids = UserGameRepository(session).get_unanalysed_ids(user_id, limit=args.limit)
+    finally:
+        session.close()
+
+    print(f"{len(game_ids)} games to analyse", file=sys.stderr)
+    stats = analyse_games(
+        game_ids,
+        workers=args.workers,
+        engine_path=args.engine,
+        limit=engine_limit(args.depth, args.nodes),
+    )
+    print(f"{stats.games} analysed, {stats.skipped} skipped, {stats.failed} failed on {stats.workers} engines "
+          f"in {stats.seconds:.1f}s")
+    if stats.games:
+        print(f"{stats.positions} positions, {stats.positions_per_second:.1f} positions/s, "
+              f"{stats.seconds / stats.games * stats.workers:.2f}s per game per engine, "
+              f"cache hit rate {stats.cache_hit_rate:.1%} in memory, {stats.eval_cache_hit_rate:.1%} shared")
+    for error in stats.errors[:10]:
+        print(error, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
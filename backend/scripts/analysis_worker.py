@@ -0,0 +1,50 @@
+"""Run analysis queue workers: lease queued analysis jobs and analyse them with local Stockfish.
+
+Each worker thread drives one engine process. Run one of these per machine
+(or several); jobs are shared out through the analysis_jobs table, so no game
+is analysed twice. Stops on Ctrl-C / SIGTERM after the games in hand, or with
+--drain once nothing is due.
+
+Usage (from backend/):
+    python -m scripts.analysis_worker --workers 8
+    python -m scripts.analysis_worker --drain --engine "python -m scripts.fake_uci_engine"
+"""
+import argparse
+import logging
+import signal
+import threading
+from datetime import timedelta
+
+from services.analysis_jobs import LEASE, run_workers
+from services.engine_analysis import engine_limit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, help="Engine processes (default: one per core)")
+    parser.add_argument("--depth", type=int, help="Search depth per position")
+    parser.add_argument("--nodes", type=int, help="Node limit per position")
+    parser.add_argument("--engine", help="Engine command line (default: STOCKFISH_PATH)")
+    parser.add_argument("--lease", type=int, default=int(LEASE.total_seconds()), help="Lease per job, in seconds")
+    parser.add_argument("--drain", action="store_true", help="Exit once no job is due")
+    parser.add_argument("--verbose", action="store_true", help="Log every game")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    stats = run_workers(
+        workers=args.workers,
+        engine_path=args.engine,
+        limit=engine_limit(args.depth, args.nodes),
+        lease=timedelta(seconds=args.lease),
+        drain=args.drain,
+        stop=stop,
+    )
+    outcomes = ", ".join(f"{count} {outcome}" for outcome, count in sorted(stats.outcomes.items())) or "no jobs"
+    print(f"{outcomes} on {stats.workers} engines in {stats.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark compact analysis storage (services.analysis_codec) against the JSON documents.
+
+Builds browser-shaped analyses of random legal games (one top line per ply
+with a PV of depth-13-like length, evals drifting like a real game), checks
+every one round-trips exactly, and reports the stored size and decode time
+both ways. With --db the documents are also written to two scratch tables
+(json and bytea) in the configured database, so the sizes include Postgres'
+own TOAST compression; the tables are dropped afterwards.
+
+Usage (from backend/):
+    python -m scripts.bench_analysis_codec --games 2000
+    python -m scripts.bench_analysis_codec --games 2000 --db
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any
+
+import chess
+from sqlalchemy import text
+
+from services.analysis_codec import decode_analysis, encode_analysis
+from services.engine_analysis import analysed_game_document
+
+OPENINGS = (
+    ("e4", "e5", "Nf3", "Nc6", "Bb5", "a6"),
+    ("e4", "c5", "Nf3", "d6", "d4", "cxd4"),
+    ("d4", "d5", "c4", "e6", "Nc3", "Nf6"),
+    ("d4", "Nf6", "c4", "g6", "Nc3", "Bg7"),
+    ("c4", "e5", "Nc3", "Nf6", "g3", "d5"),
+)
+
+
+def _pv(rng: random.Random, board: chess.Board) -> list[chess.Move]:
+    pv, board = [], board.copy(stack=False)
+    for _ in range(rng.randint(6, 16)):
+        legal = list(board.legal_moves)
+        if not legal:
+            break
+        pv.append(rng.choice(legal))
+        board.push(pv[-1])
+    return pv
+
+
+def random_game(rng: random.Random) -> tuple[str, dict[str, Any]]:
+    """(PGN, analysed_game document) for a random legal game."""
+    board = chess.Board()
+    sans, ucis, fens, results = [], [], [board.fen()], []
+    cp = 20
+    opening = rng.choice(OPENINGS)
+    for ply in range(rng.randint(30, 160)):
+        legal = list(board.legal_moves)
+        if not legal:
+            break
+        move = board.parse_san(opening[ply]) if ply < len(opening) else rng.choice(legal)
+        pv = _pv(rng, board)
+        cp = max(-2500, min(2500, cp + rng.choice((-1, 1)) * rng.choice((5, 10, 30, 150, 400))))
+        score = {"Mate": rng.choice((-3, 2))} if rng.random() < 0.02 else {"Centipawn": cp}
+        results.append({
+            "evaluation": {"type": "mate" if "Mate" in score else "cp", "value": next(iter(score.values()))},
+            "best_move": pv[0].uci() if pv else "",
+            "top_lines": [{**score, "Line": " ".join(m.uci() for m in pv)}],
+        })
+        sans.append(board.san(move))
+        ucis.append(move.uci())
+        board.push(move)
+        fens.append(board.fen())
+    results.append({"evaluation": {"type": "cp", "value": cp}, "best_move": "", "top_lines": []})
+    pgn = " ".join(f"{i // 2 + 1}. {san}" if i % 2 == 0 else san for i, san in enumerate(sans)) + " *"
+    return pgn, analysed_game_document(sans, ucis, fens, results)
+
+
+def _timed(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def db_sizes(texts: list[str], blobs: list[bytes]) -> tuple[int, int]:
+    from db.sessions import SessionLocal
+
+    session = SessionLocal()
+    try:
+        session.execute(text("CREATE TABLE bench_analysis_json (id serial PRIMARY KEY, doc json)"))
+        session.execute(text("CREATE TABLE bench_analysis_blob (id serial PRIMARY KEY, blob bytea)"))
+        session.execute(text("INSERT INTO bench_analysis_json (doc) VALUES (CAST(:doc AS json))"), [{"doc": t} for t in texts])
+        session.execute(text("INSERT INTO bench_analysis_blob (blob) VALUES (:blob)"), [{"blob": b} for b in blobs])
+        session.commit()
+        return tuple(
+            session.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+            for table in ("bench_analysis_json", "bench_analysis_blob")
+        )
+    finally:
+        session.rollback()
+        session.execute(text("DROP TABLE IF EXISTS bench_analysis_json, bench_analysis_blob"))
+        session.commit()
+        session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", action="store_true", help="Also measure table sizes in the database")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    games = [random_game(rng) for _ in range(args.games)]
+    texts = [json.dumps(document) for _, document in games]
+    start = time.perf_counter()
+    blobs = [encode_analysis(pgn, document) for pgn, document in games]
+    encode_us = (time.perf_counter() - start) / len(games) * 1e6
+    assert all(blob is not None for blob in blobs), "a document did not round-trip"
+    pgns = [pgn for pgn, _ in games]
+    plies = statistics.mean(len(document["moves"]) for _, document in games)
+
+    json_bytes, blob_bytes = sum(map(len, texts)), sum(map(len, blobs))
+    print(f"{len(games)} games, {plies:.0f} plies on average")
+    print(f"size      JSON {json_bytes / len(games) / 1024:6.1f} KB/game   compact {blob_bytes / len(games) / 1024:6.2f} KB/game"
+          f"   ({json_bytes / blob_bytes:.1f}x smaller)")
+    print(f"encode    {encode_us:8.0f} us/game (including the round-trip check)")
+
+    pairs = list(zip(pgns, blobs))
+    rows = [
+        ("full document", _timed(json.loads, texts), _timed(lambda p: decode_analysis(*p).to_dict(), pairs)),
+        ("summary only", _timed(lambda t: json.loads(t)["summary"], texts),
+         _timed(lambda p: decode_analysis(*p)["summary"], pairs)),
+        ("one move", _timed(lambda t: json.loads(t)["moves"][10], texts),
+         _timed(lambda p: decode_analysis(*p)["moves"][10], pairs)),
+        ("evals only", _timed(lambda t: [m["eval_after"] for m in json.loads(t)["moves"]], texts),
+         _timed(lambda p: decode_analysis(*p)["moves"].arrays["eval_values"].tolist(), pairs)),
+    ]
+    print(f"{'decode':14} {'JSON us/game':>13} {'compact us/game':>16}")
+    for name, json_us, compact_us in rows:
+        print(f"{name:14} {json_us:13.0f} {compact_us:16.0f}   ({json_us / compact_us:.1f}x)")
+
+    if args.db:
+        json_table, blob_table = db_sizes(texts, blobs)
+        print(f"table     json {json_table / 2**20:7.1f} MB   bytea {blob_table / 2**20:7.1f} MB"
+              f"   ({json_table / blob_table:.1f}x smaller, after TOAST compression)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the serial and async Chess.com archive fetchers against a local fake server.
+
+The serial fetcher is the original blocking one, kept here as the baseline;
+the async one buffers what iter_chess_com_months (the importer's fetcher)
+streams, newest month first like the serial one.
+
+Usage (from backend/):
+    python -m scripts.bench_chess_com_fetch --timeframe 10_years --latency 0.15
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Any
+
+import httpx
+
+from schema import Timeframe
+from scripts.fake_chess_com import FakeArchiveServer
+from services.archive_cache import ArchiveCache
+from services.chess_com import (
+    ALLOWED_TIME_CLASSES, _archive_rows, archive_months_to_fetch, iter_chess_com_months,
+)
+
+
+def fetch_chess_com_games(username: str, timeframe: Timeframe, base_url: str) -> list[dict[str, Any]]:
+    """One month after another on a blocking client, skipping failed months."""
+    games: list[dict[str, Any]] = []
+    with httpx.Client(timeout=30.0) as client:
+        for year, month in archive_months_to_fetch(timeframe):
+            try:
+                resp = client.get(f"{base_url}/{username}/games/{year}/{month:02d}")
+            except httpx.HTTPError:
+                continue
+            if resp.status_code == 200:
+                games.extend(_archive_rows(resp.json(), username, ALLOWED_TIME_CLASSES))
+    return games
+
+
+async def fetch_chess_com_games_async(
+    username: str, timeframe: Timeframe, base_url: str, cache: ArchiveCache | None = None,
+) -> list[dict[str, Any]]:
+    """iter_chess_com_months over the timeframe, buffered and put in newest-first order."""
+    months = archive_months_to_fetch(timeframe)
+    by_month: dict[tuple[int, int], list[dict[str, Any]]] = {}
+    async for archive in iter_chess_com_months(username, months, base_url=base_url, cache=cache):
+        by_month[(archive.year, archive.month)] = archive.rows or []
+    return [game for year_month in months for game in by_month[year_month]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeframe", default=Timeframe.TEN_YEARS.value, choices=[t.value for t in Timeframe])
+    parser.add_argument("--latency", type=float, default=0.15, help="Per-request server latency in seconds")
+    parser.add_argument("--games-per-month", type=int, default=30)
+    args = parser.parse_args()
+
+    timeframe = Timeframe(args.timeframe)
+    with FakeArchiveServer(latency=args.latency, games_per_month=args.games_per_month) as server:
+        start = time.perf_counter()
+        serial = fetch_chess_com_games("bench", timeframe=timeframe, base_url=server.base_url)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = asyncio.run(fetch_chess_com_games_async("bench", timeframe=timeframe, base_url=server.base_url))
+        async_s = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ArchiveCache(cache_dir)
+            cached_runs = []
+            for _ in range(2):
+                start = time.perf_counter()
+                asyncio.run(fetch_chess_com_games_async(
+                    "bench", timeframe=timeframe, base_url=server.base_url, cache=cache,
+                ))
+                cached_runs.append(time.perf_counter() - start)
+
+    assert [g["chess_com_game_uuid"] for g in serial] == [g["chess_com_game_uuid"] for g in concurrent]
+    print(f"months: {len(serial) // args.games_per_month}, games: {len(serial)}")
+    print(f"serial: {serial_s:.2f}s")
+    print(f"async:  {async_s:.2f}s ({serial_s / async_s:.1f}x)")
+    print(f"async, cold cache: {cached_runs[0]:.2f}s; warm cache: {cached_runs[1]:.2f}s ({dict(cache.stats)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Benchmark GET /games/common-mistakes on a synthetic user against the configured database.
+
+Compares reading the incrementally maintained mistake index (what the
+endpoint does) with aggregating all of the user's game_moves in SQL (the
+query the endpoint ran before the index, kept here), and with the original
+approach of decoding every analysed_game JSON blob and grouping
+in Python. The throwaway user and their games are deleted afterwards.
+
+Usage (from backend/):
+    python -m scripts.bench_common_mistakes --games 10000
+"""
+import argparse
+import math
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from api.chess import COMMON_MISTAKES_LIMIT, get_common_mistakes
+from db.models import User
+from db.repositories import MistakeIndexRepository, UserGameRepository
+from db.sessions import SessionLocal
+from scripts.synthetic_analysis import seed_analysed_games
+from services.analysis_codec import game_analysis
+from services.move_scoring import (
+    ENDGAME_LAST_HALF_MOVES, ENDGAME_WC_THRESHOLD, OPENING_MAX_MOVE, OPENING_WC_THRESHOLD, move_columns, score_moves,
+)
+from services.position_keys import position_key
+
+
+def common_mistakes_from_json(user_game_repo: UserGameRepository, user_id) -> dict:
+    """The JSON-decoding implementation, kept here as the baseline (grouped by position key)."""
+    user_game_repo.session.expunge_all()  # decode every blob again on each run
+    games = user_game_repo.get_analysed_by_user_id(user_id)
+    games.sort(key=lambda g: (-(g.end_time or 0), str(g.game_id)))
+    opening_map, endgame_map = defaultdict(list), defaultdict(list)
+    for game in games:
+        moves = (game_analysis(game) or {}).get("moves") or []
+        username = (game.chess_com_username or "").lower()
+        user_side = "white" if (game.white_username or "").lower() == username else "black"
+        scores = score_moves(move_columns([moves]))
+        for i, move in enumerate(moves):
+            wc_loss = float(scores.wc_loss[i])
+            if move.get("side") != user_side or math.isnan(wc_loss):
+                continue
+            entry = {"played_move": move.get("san", ""), "wc_loss": round(wc_loss, 3)}
+            key = position_key(move["fen_before"])
+            if scores.opening_mistake[i]:
+                opening_map[key].append(entry)
+            if scores.endgame_mistake[i]:
+                endgame_map[key].append(entry)
+
+    def top(mistake_map):
+        results = []
+        for key, occurrences in mistake_map.items():
+            if len(occurrences) < 2:
+                continue
+            played = Counter(o["played_move"] for o in occurrences).most_common(1)[0][0]
+            results.append((key, played, sum(o["played_move"] == played for o in occurrences)))
+        results.sort(key=lambda r: r[2], reverse=True)
+        return results[:20]
+
+    return {"opening": top(opening_map), "endgame": top(endgame_map)}
+
+
+def common_mistakes_from_game_moves(session: Session, user_id) -> list:
+    """Rank the positions where the user most often plays the same losing move
+    by aggregating all of their game_moves in SQL, as the endpoint did before
+    the mistake index.
+
+    Positions (by position key) seen at least twice are kept with their most
+    played move; ties go to the newest game. Returns up to
+    COMMON_MISTAKES_LIMIT rows per kind ("opening", "endgame").
+    """
+    params = dict(
+        user_id=user_id,
+        opening_max_move=OPENING_MAX_MOVE,
+        opening_min_wc_loss=OPENING_WC_THRESHOLD,
+        endgame_max_plies_from_end=ENDGAME_LAST_HALF_MOVES,
+        endgame_min_wc_loss=ENDGAME_WC_THRESHOLD,
+        limit=COMMON_MISTAKES_LIMIT,
+    )
+    return list(session.execute(text("""
+        WITH candidates AS (
+            SELECT
+                m.game_id,
+                m.half_move_index,
+                m.position_key,
+                m.fen_before AS fen,
+                COALESCE(m.san, '') AS played_move,
+                m.best_move,
+                round(m.wc_loss::numeric, 3) AS wc_loss,
+                m.move_number <= :opening_max_move AND m.wc_loss >= :opening_min_wc_loss AS is_opening,
+                m.plies_from_end <= :endgame_max_plies_from_end AND m.wc_loss >= :endgame_min_wc_loss AS is_endgame,
+                row_number() OVER (ORDER BY g.end_time DESC NULLS LAST, m.game_id, m.half_move_index) AS seq
+            FROM game_moves m
+            JOIN user_games g ON g.game_id = m.game_id
+            WHERE m.user_id = :user_id
+              AND m.is_user_move
+              AND m.wc_loss >= LEAST(:opening_min_wc_loss, :endgame_min_wc_loss)
+              AND m.position_key IS NOT NULL
+              AND g.is_analysed
+        ),
+        occurrences AS (
+            SELECT 'opening' AS kind, * FROM candidates WHERE is_opening
+            UNION ALL
+            SELECT 'endgame' AS kind, * FROM candidates WHERE is_endgame
+        ),
+        by_move AS (
+            SELECT
+                kind,
+                position_key,
+                (array_agg(fen ORDER BY seq))[1] AS fen,
+                played_move,
+                count(*) AS count,
+                array_agg(wc_loss::float ORDER BY seq) AS wc_losses,
+                (array_agg(best_move ORDER BY seq))[1] AS best_move,
+                (array_agg(game_id ORDER BY seq))[1:3] AS game_ids,
+                (array_agg(half_move_index ORDER BY seq))[1:3] AS half_move_indexes,
+                sum(count(*)) OVER (PARTITION BY kind, position_key) AS position_count,
+                min(min(seq)) OVER (PARTITION BY kind, position_key) AS position_first_seq,
+                row_number() OVER (PARTITION BY kind, position_key ORDER BY count(*) DESC, min(seq)) AS move_rank
+            FROM occurrences
+            GROUP BY kind, position_key, played_move
+        ),
+        ranked AS (
+            SELECT *, row_number() OVER (PARTITION BY kind ORDER BY count DESC, position_first_seq) AS rank
+            FROM by_move
+            WHERE move_rank = 1 AND position_count >= 2
+        )
+        SELECT kind, position_key, fen, played_move, best_move, wc_losses, count, game_ids, half_move_indexes
+        FROM ranked
+        WHERE rank <= :limit
+        ORDER BY kind, rank
+    """), params))
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    handle = f"bench-mistakes-{uuid.uuid4().hex[:12]}"
+    user = User(username=handle, email=f"{handle}@example.com", password_hash="-", password_salt="-")
+    session.add(user)
+    session.commit()
+    try:
+        start = time.perf_counter()
+        seed_analysed_games(session, user.id, handle, args.games)
+        print(f"seeded {args.games} analysed games in {time.perf_counter() - start:.1f}s")
+
+        user_game_repo = UserGameRepository(session)
+        mistake_index_repo = MistakeIndexRepository(session)
+        json_s, baseline = timed(lambda: common_mistakes_from_json(user_game_repo, user.id), args.repeat)
+        scan_s, scan_rows = timed(lambda: common_mistakes_from_game_moves(session, user.id), args.repeat)
+        index_s, response = timed(lambda: get_common_mistakes(
+            timeframe=None, time_class=None, current_user=user,
+            user_game_repo=user_game_repo, mistake_index_repo=mistake_index_repo,
+        ), args.repeat)
+
+        scanned = {
+            kind: [(r.position_key, r.played_move, r.count) for r in scan_rows if r.kind == kind]
+            for kind in ("opening", "endgame")
+        }
+        indexed = {
+            "opening": [(position_key(m.fen), m.played_move, m.count) for m in response.opening_mistakes],
+            "endgame": [(position_key(m.fen), m.played_move, m.count) for m in response.endgame_mistakes],
+        }
+        assert scanned == baseline, "game_moves aggregation disagrees with the JSON baseline"
+        assert indexed == baseline, "mistake index disagrees with the JSON baseline"
+        print(f"JSON + Python:      {json_s * 1000:8.1f} ms (median of {args.repeat})")
+        print(f"SQL over game_moves: {scan_s * 1000:7.1f} ms ({json_s / scan_s:.0f}x)")
+        print(f"mistake index:       {index_s * 1000:7.1f} ms ({json_s / index_s:.0f}x)")
+    finally:
+        session.rollback()
+        session.query(User).filter(User.id == user.id).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare game ingestion paths (rows/sec) against the configured database.
+
+Each path inserts the same synthetic games for a throwaway user, then inserts
+them again to measure the all-duplicates case. The user and their games are
+deleted afterwards.
+
+Usage (from backend/):
+    python -m scripts.bench_game_ingest --games 20000 --batch-size 500
+"""
+import argparse
+import time
+import uuid
+
+from sqlalchemy.dialects.postgresql import insert
+
+from db.models import User, UserGame
+from db.repositories import UserGameRepository
+from db.sessions import SessionLocal
+from scripts.fake_chess_com import fake_month_archive
+from services.chess_com import ALLOWED_TIME_CLASSES, _archive_rows
+
+
+def synthetic_rows(games: int) -> list[dict]:
+    rows = []
+    year, month = 2015, 1
+    while len(rows) < games:
+        archive = fake_month_archive("bench", year, month, min(1000, games - len(rows)))
+        rows.extend(_archive_rows(archive, "bench", ALLOWED_TIME_CLASSES))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return rows
+
+
+def legacy_ingest(repo: UserGameRepository, user_id, rows: list[dict]) -> int:
+    """The previous path: preload every stored UUID, filter in Python, bulk_save_objects."""
+    existing = {
+        r[0] for r in repo.session.query(UserGame.chess_com_game_uuid)
+        .filter(UserGame.user_id == user_id, UserGame.chess_com_game_uuid.isnot(None))
+    }
+    new_rows = [r for r in rows if r["chess_com_game_uuid"] not in existing]
+    if new_rows:
+        repo.bulk_create(new_rows)
+    return len(new_rows)
+
+
+def insert_on_conflict(repo: UserGameRepository, user_id, rows: list[dict]) -> int:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING, letting the unique indexes drop duplicates."""
+    stmt = insert(UserGame.__table__).on_conflict_do_nothing().returning(UserGame.__table__.c.game_id)
+    # Executed with a parameter list so SQLAlchemy batches it as multi-row VALUES
+    added = len(list(repo.session.execute(stmt, rows).scalars()))
+    repo.session.commit()
+    return added
+
+
+PATHS = {
+    "bulk_create": legacy_ingest,
+    "insert_on_conflict": insert_on_conflict,
+    "copy": lambda repo, user_id, rows: len(repo.copy_games(rows)),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.games)
+    session = SessionLocal()
+    repo = UserGameRepository(session)
+    handle = f"bench-ingest-{uuid.uuid4().hex[:12]}"
+    user = User(username=handle, email=f"{handle}@example.com", password_hash="-", password_salt="-")
+    session.add(user)
+    session.commit()
+    try:
+        for name, ingest in PATHS.items():
+            for label in ("fresh", "duplicates"):
+                batches = [
+                    [dict(row, user_id=user.id) for row in rows[start:start + args.batch_size]]
+                    for start in range(0, len(rows), args.batch_size)
+                ]
+                start = time.perf_counter()
+                added = sum(ingest(repo, user.id, batch) for batch in batches)
+                elapsed = time.perf_counter() - start
+                print(f"{name:>18} {label:>10}: {len(rows) / elapsed:10.0f} rows/s ({added} added, {elapsed:.2f}s)")
+            session.query(UserGame).filter(UserGame.user_id == user.id).delete()
+            session.commit()
+    finally:
+        session.query(User).filter(User.id == user.id).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark GET /games on a synthetic user against the configured database.
+
+Compares the endpoint (only GameResponse's columns, serialised straight from
+the rows) with the original handler, kept here as the baseline, which loaded
+full UserGame objects, stored analysis included, and validated each into a
+GameResponse. Reports the bytes of column data each reads and the time per
+request. The throwaway user and their games are deleted afterwards.
+
+Usage (from backend/):
+    python -m scripts.bench_game_list --games 1000
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from api.chess import router
+from core.auth import get_current_user
+from db.dependencies import get_user_game_repository
+from db.models import User, UserGame
+from db.repositories import UserGameRepository
+from db.sessions import SessionLocal
+from schema import GameResponse, ListGamesResponse
+from scripts.synthetic_analysis import seed_analysed_games
+
+
+def chess_com_pgn(game: UserGame) -> str:
+    """A PGN the size of a Chess.com export (headers and a clock comment per move)."""
+    headers = {
+        "Event": "Live Chess", "Site": "Chess.com", "Date": "2024.01.01", "Round": "-",
+        "White": game.white_username, "Black": game.black_username, "Result": "*", "CurrentPosition": "-",
+        "Timezone": "UTC", "ECO": "C20", "ECOUrl": "https://www.chess.com/openings/Kings-Pawn-Opening",
+        "UTCDate": "2024.01.01", "UTCTime": "12:00:00", "WhiteElo": "1500", "BlackElo": "1500",
+        "TimeControl": "600", "Termination": "-", "StartTime": "12:00:00", "EndDate": "2024.01.01",
+        "EndTime": "12:20:00", "Link": f"https://www.chess.com/game/live/{game.chess_com_game_uuid}",
+    }
+    moves = " ".join(
+        f"{i // 2 + 1}{'.' if i % 2 == 0 else '...'} {move['san']} {{[%clk 0:09:{59 - i % 60:02d}.9]}}"
+        for i, move in enumerate(game.analysed_game["moves"])
+    )
+    return "".join(f'[{k} "{v}"]\n' for k, v in headers.items()) + f"\n{moves} *\n"
+
+
+def baseline_app(user: User) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/games", response_model=ListGamesResponse)
+    def list_games(user_game_repo: UserGameRepository = Depends(get_user_game_repository)):
+        games = user_game_repo.get_by_user_id(user.id, limit=1000)
+        return ListGamesResponse(games=[GameResponse.model_validate(g) for g in games], total=len(games))
+
+    return app
+
+
+def current_app(user: User) -> FastAPI:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: user
+    return app
+
+
+def column_bytes(session, user_id, columns) -> int:
+    """Bytes of stored column data (after compression) a query of `columns` reads."""
+    size = sum(func.coalesce(func.pg_column_size(getattr(UserGame, c)), 0) for c in columns)
+    return session.execute(select(func.sum(size)).where(UserGame.user_id == user_id)).scalar() or 0
+
+
+def timed(client: TestClient, url: str, repeat: int) -> tuple[float, dict]:
+    timings, body = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body = response.json()
+    return statistics.median(timings), body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    handle = f"bench-list-{uuid.uuid4().hex[:12]}"
+    user = User(username=handle, email=f"{handle}@example.com", password_hash="-", password_salt="-")
+    session.add(user)
+    session.commit()
+    try:
+        seed_analysed_games(session, user.id, handle, args.games)
+        games = session.query(UserGame).filter(UserGame.user_id == user.id).all()
+        session.execute(update(UserGame), [dict(game_id=g.game_id, pgn=chess_com_pgn(g)) for g in games])
+        session.commit()
+        session.refresh(user)
+        session.expunge(user)  # used by the endpoints' own sessions
+
+        baseline_s, baseline = timed(TestClient(baseline_app(user)), "/games", args.repeat)
+        client = TestClient(current_app(user))
+        lean_s, lean = timed(client, "/games?limit=1000", args.repeat)
+        pgn_s, with_pgn = timed(client, "/games?limit=1000&include_pgn=true", args.repeat)
+        assert with_pgn["games"] == baseline["games"], "GET /games?include_pgn=true disagrees with the baseline"
+        assert lean["games"] == [dict(game, pgn=None) for game in baseline["games"]]
+
+        fields = list(GameResponse.model_fields)
+        all_bytes = column_bytes(session, user.id, [c.key for c in UserGame.__table__.columns])
+        pgn_bytes = column_bytes(session, user.id, fields)
+        lean_bytes = column_bytes(session, user.id, [f for f in fields if f != "pgn"])
+        print(f"{args.games} analysed games")
+        print(f"{'':22} {'column data':>12} {'ms/request':>11}")
+        print(f"{'full rows (baseline)':22} {all_bytes / 2**20:9.2f} MB {baseline_s * 1000:11.1f}")
+        print(f"{'include_pgn=true':22} {pgn_bytes / 2**20:9.2f} MB {pgn_s * 1000:11.1f}"
+              f"   ({all_bytes / pgn_bytes:.0f}x less data, {baseline_s / pgn_s:.1f}x faster)")
+        print(f"{'default':22} {lean_bytes / 2**20:9.2f} MB {lean_s * 1000:11.1f}"
+              f"   ({all_bytes / lean_bytes:.0f}x less data, {baseline_s / lean_s:.1f}x faster)")
+    finally:
+        session.rollback()
+        session.query(User).filter(User.username == handle).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Micro-benchmark services.move_scoring against scoring moves one at a time in Python.
+
+Scores synthetic analysed games both ways (winning-chances loss, common-mistake
+masks, classification and per-side accuracy summaries), checks they agree and
+prints the timings. No database needed.
+
+Usage (from backend/):
+    python -m scripts.bench_move_scoring --games 10000
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from scripts.synthetic_analysis import line_pool, synthetic_analysis
+from services.move_scoring import (
+    ENDGAME_LAST_HALF_MOVES, ENDGAME_WC_THRESHOLD, OPENING_MAX_MOVE, OPENING_WC_THRESHOLD, MATE_CP, WC_SLOPE,
+    classify, move_columns, score_moves, side_summaries,
+)
+
+
+PLURALS = {"blunder": "blunders", "mistake": "mistakes", "inaccuracy": "inaccuracies"}
+
+
+def _classify(loss: float) -> str:
+    if loss >= 0.3:
+        return "blunder"
+    if loss >= 0.2:
+        return "mistake"
+    if loss >= 0.1:
+        return "inaccuracy"
+    return "best" if loss <= 0 else "good"
+
+
+def _wc(evaluation: dict) -> float:
+    if evaluation["type"] == "mate":
+        return 1.0 if evaluation["value"] > 0 else -1.0
+    return 2.0 / (1.0 + math.exp(-WC_SLOPE * evaluation["value"])) - 1.0
+
+
+def _cp(evaluation: dict) -> float:
+    if evaluation["type"] == "mate":
+        return MATE_CP if evaluation["value"] > 0 else -MATE_CP
+    return evaluation["value"]
+
+
+def score_scalar(games_moves: list[list[dict]]) -> tuple[list, list, list, list]:
+    """The per-move Python loop: losses, masks, classifications and summaries."""
+    losses, masks, labels, summaries = [], [], [], []
+    for moves in games_moves:
+        accuracies = {"white": [], "black": []}
+        counts = {f"{side}_{kind}": 0 for side in ("white", "black") for kind in PLURALS.values()}
+        for i, move in enumerate(moves):
+            side = move["side"]
+            sign = 1 if side == "white" else -1
+            loss = max(0.0, sign * (_wc(move["eval_before"]) - _wc(move["eval_after"])))
+            losses.append(loss)
+            masks.append((
+                move["move_number"] <= OPENING_MAX_MOVE and loss >= OPENING_WC_THRESHOLD,
+                len(moves) - i <= ENDGAME_LAST_HALF_MOVES and loss >= ENDGAME_WC_THRESHOLD,
+            ))
+            label = _classify(loss)
+            labels.append(label)
+            if label in PLURALS:
+                counts[f"{side}_{PLURALS[label]}"] += 1
+            cp_loss = max(0, sign * (_cp(move["eval_before"]) - _cp(move["eval_after"])))
+            accuracies[side].append(max(0.0, 103.1668 * math.exp(-0.04354 * abs(cp_loss)) - 3.1668))
+        summary = {
+            f"{side}_accuracy": math.floor(sum(values) / len(values) * 10 + 0.5) / 10 if values else 0.0
+            for side, values in accuracies.items()
+        }
+        summaries.append({**summary, **counts})
+    return losses, masks, labels, summaries
+
+
+def score_vectorised(games_moves: list[list[dict]]) -> tuple[list, list, list, list]:
+    columns = move_columns(games_moves)
+    scores = score_moves(columns)
+    masks = list(zip(scores.opening_mistake.tolist(), scores.endgame_mistake.tolist()))
+    return scores.wc_loss.tolist(), masks, classify(scores.wc_loss).tolist(), side_summaries(columns, scores)
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = line_pool(rng)
+    games_moves = [synthetic_analysis(rng, rng.choice(pool))["moves"] for _ in range(args.games)]
+    total_moves = sum(len(moves) for moves in games_moves)
+
+    scalar_s, scalar = timed(lambda: score_scalar(games_moves), args.repeat)
+    vector_s, vector = timed(lambda: score_vectorised(games_moves), args.repeat)
+    columns = move_columns(games_moves)
+    kernel_s, _ = timed(lambda: side_summaries(columns, score_moves(columns)), args.repeat)
+
+    assert np.allclose(scalar[0], vector[0], rtol=0, atol=1e-12), "winning-chances losses differ"
+    assert scalar[1] == vector[1], "common-mistake masks differ"
+    assert scalar[2] == vector[2], "classifications differ"
+    assert scalar[3] == vector[3], "summaries differ"
+
+    print(f"{args.games} games, {total_moves} moves (median of {args.repeat})")
+    print(f"scalar Python:           {scalar_s * 1000:8.1f} ms")
+    print(f"NumPy incl. columns:     {vector_s * 1000:8.1f} ms ({scalar_s / vector_s:.1f}x)")
+    print(f"NumPy on built columns:  {kernel_s * 1000:8.1f} ms ({scalar_s / kernel_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Micro-benchmark the puzzle tagger (puzzle_classifier's cook) per puzzle.
+
+Tags synthetic puzzles (a position from a synthetic game and the next 2 to 8
+moves played in it) with the mainline worked out once per puzzle, and with
+the baseline kept here, which reads the same detectors off python-chess game
+nodes: every board, moved piece, capture and check replayed from the start
+of the line on each access, as the tagger used to. Checks both give the same
+tags and prints the time per puzzle. No database needed.
+
+Usage (from backend/):
+    python -m scripts.bench_puzzle_classifier --puzzles 5000
+"""
+import argparse
+import random
+import time
+
+from chess import Board, Move
+from chess.pgn import ChildNode, Game
+
+from scripts.synthetic_analysis import line_pool
+from services.puzzle_classifier import classify_puzzle_candidate
+from services.puzzle_classifier.cook import cook
+from services.puzzle_classifier.model import Puzzle
+
+
+class ReplayedPly:
+    """A Ply whose every field is recomputed from its game node on each access."""
+
+    def __init__(self, node: ChildNode) -> None:
+        self.node = node
+        self.move = node.move
+
+    @property
+    def board(self) -> Board:
+        return self.node.board()
+
+    @property
+    def board_before(self) -> Board:
+        return self.node.parent.board()
+
+    @property
+    def piece_type(self):
+        return self.node.board().piece_type_at(self.node.move.to_square)
+
+    @property
+    def is_capture(self) -> bool:
+        return self.node.parent.board().is_capture(self.node.move)
+
+    @property
+    def is_check(self) -> bool:
+        return self.node.board().is_check()
+
+
+def classify_replayed(puzzle_id: str, start_fen: str, solution_uci: list[str], cp: int) -> list[str]:
+    """classify_puzzle_candidate as it was, kept here as the baseline."""
+    node = Game.from_board(Board(start_fen))
+    for uci in solution_uci:
+        move = Move.from_uci(uci)
+        if move not in node.board().legal_moves:
+            raise ValueError(f"Illegal puzzle line move: {uci}")
+        node = node.add_main_variation(move)
+    puzzle = Puzzle(id=puzzle_id, game=node.game(), cp=cp)
+    puzzle.mainline = [ReplayedPly(n) for n in puzzle.game.mainline()]
+    return list(dict.fromkeys(cook(puzzle)))
+
+
+def synthetic_puzzles(rng: random.Random, count: int) -> list[tuple[str, str, list[str], int]]:
+    pool = [line for line in line_pool(rng) if len(line) > 20]
+    puzzles = []
+    while len(puzzles) < count:
+        line = rng.choice(pool)
+        length = rng.choice((2, 4, 4, 6, 6, 8))
+        start = rng.randrange(10, len(line) - length + 1)
+        puzzles.append((
+            f"p{len(puzzles)}", line[start][0], [uci for _, _, uci in line[start:start + length]],
+            rng.choice((100, 300, 800)),
+        ))
+    return puzzles
+
+
+def timed(classify, puzzles) -> tuple[float, list]:
+    tags = []
+    start = time.perf_counter()
+    for puzzle_id, fen, solution, cp in puzzles:
+        try:
+            tags.append(classify(puzzle_id, fen, solution, cp))
+        except Exception as exc:
+            tags.append(type(exc).__name__)
+    return (time.perf_counter() - start) / len(puzzles), tags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--puzzles", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    puzzles = synthetic_puzzles(random.Random(args.seed), args.puzzles)
+    baseline_s, baseline = timed(classify_replayed, puzzles)
+    current_s, current = timed(
+        lambda puzzle_id, fen, solution, cp: classify_puzzle_candidate(
+            puzzle_id=puzzle_id, start_fen=fen, solution_uci=solution, cp=cp,
+        ),
+        puzzles,
+    )
+    assert current == baseline, "tags differ from the baseline"
+    tagged = [tags for tags in current if isinstance(tags, list)]
+    print(f"{args.puzzles} puzzles ({len(tagged)} legal), {len({tag for tags in tagged for tag in tags})} distinct tags")
+    print(f"replayed per access (baseline): {baseline_s * 1e3:6.2f} ms/puzzle")
+    print(f"mainline worked out once:       {current_s * 1e3:6.2f} ms/puzzle  ({baseline_s / current_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark POST /puzzles/generate on a synthetic user against the configured database.
+
+Compares generate_all_puzzles (candidates tagged on a process pool, one
+upsert) at several pool sizes with the original loop, kept here as the
+baseline, which extracted, tagged and committed one game at a time, and
+checks they store the same puzzles. Then times the incremental calls that
+follow: with nothing new, and after a few games are re-analysed. The
+throwaway user and their games are deleted afterwards.
+
+Usage (from backend/):
+    python -m scripts.bench_puzzle_generation --games 2000 --workers 1 2 4 8 --reanalysed 20
+"""
+import argparse
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from api.puzzles import _classify_and_store_puzzle
+from db.models import User, UserGame, UserPuzzle
+from db.repositories import GameMoveRepository, UserGameRepository, UserPuzzleRepository
+from db.sessions import SessionLocal
+from scripts.synthetic_analysis import seed_analysed_games
+from services.puzzle_generation import generate_all_puzzles
+
+
+def generate_sequentially(session, user: User) -> int:
+    """The per-game implementation, kept here as the baseline."""
+    user_game_repo, user_puzzle_repo = UserGameRepository(session), UserPuzzleRepository(session)
+    games = user_game_repo.get_analysed_by_user_id(user.id, include_analysis=False)
+    sources_by_game = defaultdict(list)
+    for row in GameMoveRepository(session).get_puzzle_sources(user.id):
+        sources_by_game[row.GameMove.game_id].append(row)
+    generated = 0
+    for game in games:
+        try:
+            _classify_and_store_puzzle(
+                game, sources_by_game[game.game_id], current_user=user, user_puzzle_repo=user_puzzle_repo,
+            )
+            generated += 1
+        except Exception:
+            pass
+    return generated
+
+
+def stored_puzzles(session, user_id) -> set:
+    return {
+        (p.game_id, p.source_half_move_index, p.start_fen, tuple(p.solution_uci), p.cp, tuple(p.raw_tags), p.end_time)
+        for p in session.query(UserPuzzle).filter(UserPuzzle.user_id == user_id)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--reanalysed", type=int, default=20)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    handle = f"bench-puzzles-{uuid.uuid4().hex[:12]}"
+    user = User(username=handle, email=f"{handle}@example.com", password_hash="-", password_salt="-")
+    session.add(user)
+    session.commit()
+    try:
+        seed_analysed_games(session, user.id, handle, args.games)
+        user_id = user.id
+
+        start = time.perf_counter()
+        generated = generate_sequentially(session, user)
+        baseline_s = time.perf_counter() - start
+        baseline = stored_puzzles(session, user_id)
+        print(f"{args.games} analysed games, {generated} puzzles")
+        print(f"one game at a time:  {baseline_s:7.2f} s")
+
+        repos = UserGameRepository(session), GameMoveRepository(session), UserPuzzleRepository(session)
+        for workers in args.workers:
+            session.query(UserPuzzle).filter(UserPuzzle.user_id == user_id).delete()
+            session.commit()
+            # The first batch pays for starting the pool; time a second one
+            generate_all_puzzles(user_id, *repos, workers=workers, force=True)
+            start = time.perf_counter()
+            result = generate_all_puzzles(user_id, *repos, workers=workers, force=True)
+            seconds = time.perf_counter() - start
+            assert result.generated == generated and stored_puzzles(session, user_id) == baseline, workers
+            print(f"pool of {workers:2}:          {seconds:7.2f} s  ({baseline_s / seconds:.1f}x)")
+
+        start = time.perf_counter()
+        result = generate_all_puzzles(user_id, *repos)
+        seconds = time.perf_counter() - start
+        assert result.total == 0 and result.up_to_date == args.games
+        print(f"nothing new:         {seconds:7.2f} s  ({baseline_s / seconds:.0f}x)")
+
+        reanalysed = [
+            game_id for game_id, in
+            session.query(UserGame.game_id).filter(UserGame.user_id == user_id).limit(args.reanalysed)
+        ]
+        session.query(UserGame).filter(UserGame.game_id.in_(reanalysed)).update(
+            {UserGame.analysed_at: datetime.utcnow()}, synchronize_session=False,
+        )
+        session.commit()
+        start = time.perf_counter()
+        result = generate_all_puzzles(user_id, *repos)
+        seconds = time.perf_counter() - start
+        assert result.total == len(reanalysed) and stored_puzzles(session, user_id) == baseline
+        print(f"{len(reanalysed):<3} re-analysed:     {seconds:7.2f} s  ({baseline_s / seconds:.0f}x)")
+    finally:
+        session.rollback()
+        session.query(User).filter(User.username == handle).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
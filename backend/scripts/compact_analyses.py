@@ -0,0 +1,72 @@
+"""Convert stored analyses between JSON and the compact format (services.analysis_codec).
+
+New analyses are stored compact when saved; this converts the ones saved as
+JSON before, or with --expand turns compact ones back into JSON (before
+downgrading past the migration that added analysis_blob). Analyses the
+compact format cannot hold exactly stay JSON.
+
+Usage (from backend/):
+    python -m scripts.compact_analyses
+    python -m scripts.compact_analyses --expand
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from db.repositories import UserGameRepository
+from db.sessions import SessionLocal
+from services.analysis_codec import decode_analysis, encode_analysis
+
+BATCH_SIZE = 500
+
+
+def table_size(session) -> int:
+    return session.execute(text("SELECT pg_total_relation_size('user_games')")).scalar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expand", action="store_true", help="Turn compact analyses back into JSON")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        repo = UserGameRepository(session)
+        size_before = table_size(session)
+        start = time.perf_counter()
+        converted = kept = 0
+        after = None
+        while True:
+            batch = repo.get_stored_analyses(compact=args.expand, after=after, limit=args.batch_size)
+            if not batch:
+                break
+            after = batch[-1].game_id
+            updates = []
+            for row in batch:
+                if args.expand:
+                    document = decode_analysis(row.pgn, row.analysis_blob).to_dict()
+                    updates.append(dict(game_id=row.game_id, analysed_game=document, analysis_blob=None))
+                    continue
+                if row.analysis_blob is not None:
+                    continue
+                blob = encode_analysis(row.pgn, row.analysed_game)
+                if blob is None:
+                    kept += 1
+                    continue
+                updates.append(dict(game_id=row.game_id, analysed_game=None, analysis_blob=blob))
+            repo.update_stored_analyses(updates)
+            converted += len(updates)
+        seconds = time.perf_counter() - start
+        print(f"{converted} analyses {'expanded' if args.expand else 'compacted'} in {seconds:.1f}s"
+              + ("" if args.expand else f", {kept} kept as JSON"))
+        # Space freed by the old row versions is only returned to the OS by VACUUM FULL
+        print(f"user_games: {size_before / 2**20:.1f} MB before, {table_size(session) / 2**20:.1f} MB now"
+              + ("" if args.expand else " (run VACUUM FULL user_games to reclaim the old row versions)"))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
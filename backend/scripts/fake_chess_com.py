@@ -0,0 +1,93 @@
+"""Local stand-in for the Chess.com monthly archive API.
+
+Serves `/{username}/games/{year}/{month}` with synthetic games after an
+artificial latency, so the importer can be exercised and benchmarked offline:
+
+    server = FakeArchiveServer(latency=0.2, games_per_month=50)
+    with server:
+        async for archive in iter_chess_com_months("someone", months, base_url=server.base_url):
+            ...
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ARCHIVE_PATH = re.compile(r"^/(?P<username>[^/]+)/games/(?P<year>\d{4})/(?P<month>\d{2})$")
+TIME_CLASSES = ("rapid", "blitz", "bullet")
+
+
+def fake_month_archive(username: str, year: int, month: int, games_per_month: int) -> dict:
+    games = []
+    for i in range(games_per_month):
+        white, black = (username, f"opponent{i}") if i % 2 == 0 else (f"opponent{i}", username)
+        uuid = f"{username}-{year}-{month:02d}-{i}"
+        url = f"https://www.chess.com/game/live/{int(hashlib.md5(uuid.encode()).hexdigest()[:12], 16)}"
+        games.append({
+            "uuid": uuid,
+            "url": url,
+            "pgn": f'[Event "Live Chess"]\n[White "{white}"]\n[Black "{black}"]\n[Link "{url}"]\n\n1. e4 e5 2. Nf3 Nc6 1-0',
+            "tcn": "mC0Kgv5Q",
+            "end_time": int(time.mktime((year, month, 1 + i % 28, 12, 0, 0, 0, 0, 0))),
+            "time_class": TIME_CLASSES[i % len(TIME_CLASSES)],
+            "time_control": "600",
+            "white": {"username": white, "rating": 1500, "result": "win"},
+            "black": {"username": black, "rating": 1500, "result": "resigned"},
+        })
+    return {"games": games}
+
+
+class FakeArchiveServer:
+    """Threaded HTTP server that answers month-archive requests on localhost."""
+
+    def __init__(self, latency: float = 0.1, games_per_month: int = 20, port: int = 0):
+        self.latency = latency
+        self.games_per_month = games_per_month
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                match = ARCHIVE_PATH.match(self.path)
+                time.sleep(server.latency)
+                if not match:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps(fake_month_archive(
+                    match["username"], int(match["year"]), int(match["month"]), server.games_per_month,
+                )).encode()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeArchiveServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,96 @@
+"""A tiny UCI engine for exercising engine analysis without Stockfish.
+
+Speaks enough UCI for chess.engine: evaluates by material, finds mates in one
+and plays the capture of the most valuable piece (else the first legal move in
+UCI order). Deterministic, so repeated analyses agree. Use it as the engine
+command:
+
+    STOCKFISH_PATH="python -m scripts.fake_uci_engine --delay 0.005" python -m scripts.analyse_games --user alice
+"""
+import argparse
+import sys
+import time
+
+import chess
+
+PIECE_CP = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+def material(board: chess.Board) -> int:
+    """Material balance in centipawns from the side to move's point of view."""
+    return sum(
+        PIECE_CP[piece.piece_type] * (1 if piece.color == board.turn else -1)
+        for piece in board.piece_map().values()
+    )
+
+
+def search(board: chess.Board) -> tuple[str, chess.Move]:
+    """(UCI score string, best move) for a position with legal moves."""
+    moves = sorted(board.legal_moves, key=lambda move: move.uci())
+    for move in moves:
+        board.push(move)
+        mate = board.is_checkmate()
+        board.pop()
+        if mate:
+            return "mate 1", move
+    captures = [move for move in moves if board.is_capture(move)]
+    if captures:
+        best = max(captures, key=lambda move: PIECE_CP[board.piece_type_at(move.to_square) or chess.PAWN])
+    else:
+        best = moves[0]
+    board.push(best)
+    score = -material(board)
+    board.pop()
+    return f"cp {score}", best
+
+
+def set_position(tokens: list[str]) -> chess.Board:
+    if tokens[0] == "startpos":
+        board, rest = chess.Board(), tokens[1:]
+    else:
+        end = tokens.index("moves") if "moves" in tokens else len(tokens)
+        board, rest = chess.Board(" ".join(tokens[1:end])), tokens[end:]
+    for uci in rest[1:]:
+        board.push_uci(uci)
+    return board
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to 'think' per search")
+    args = parser.parse_args()
+
+    board = chess.Board()
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == "uci":
+            print("id name FakeEngine")
+            print("option name Hash type spin default 16 min 1 max 1024")
+            print("option name Threads type spin default 1 min 1 max 1")
+            print("option name MultiPV type spin default 1 min 1 max 1")
+            print("uciok")
+        elif command == "isready":
+            print("readyok")
+        elif command == "position":
+            board = set_position(tokens[1:])
+        elif command == "go":
+            depth = int(tokens[tokens.index("depth") + 1]) if "depth" in tokens else 1
+            if args.delay:
+                time.sleep(args.delay)
+            if not any(board.generate_legal_moves()):
+                print(f"info depth 0 score {'mate 0' if board.is_check() else 'cp 0'}")
+                print("bestmove (none)")
+            else:
+                score, best = search(board)
+                print(f"info depth {depth} seldepth {depth} multipv 1 score {score} nodes 1 pv {best.uci()}")
+                print(f"bestmove {best.uci()}")
+        elif command == "quit":
+            return
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Import a multi-game PGN file (Chess.com / Lichess export or database dump) for a user.
+
+Usage (from backend/):
+    python -m scripts.import_pgn games.pgn --user alice
+    python -m scripts.import_pgn lichess_db.pgn.gz --user loadtest --create-user --username loadtest
+    zstdcat lichess_db_standard_rated_2024-01.pgn.zst | python -m scripts.import_pgn - --user loadtest
+
+Plain, .gz and .bz2 files are read directly; pipe other formats through stdin.
+"""
+import argparse
+import bz2
+import gzip
+import io
+import os
+import sys
+import uuid
+
+from db.models import User
+from db.repositories import ExplorerRepository, GamePositionRepository, UserGameRepository, UserRepository
+from db.sessions import SessionLocal
+from schema import GameType
+from services.game_import import IMPORT_BATCH_SIZE
+from services.pgn_import import PgnImportResult, import_pgn_games
+
+PROGRESS_EVERY_GAMES = 10000
+
+
+def open_pgn(path: str):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    opener = {".gz": gzip.open, ".bz2": bz2.open}.get(os.path.splitext(path)[1], open)
+    return opener(path, "rt", encoding="utf-8", errors="replace")
+
+
+def find_or_create_user(user_repo: UserRepository, name: str, create: bool) -> User:
+    user = user_repo.get_by_username(name) or user_repo.get_by_email(name.lower())
+    if user:
+        return user
+    if not create:
+        sys.exit(f"No user with username or email {name!r} (pass --create-user to create one)")
+    # Login-less account for seeding: the hash never verifies against any password
+    return user_repo.create(
+        username=name,
+        email=f"{name.lower()}@example.invalid",
+        password_hash="!",
+        password_salt=uuid.uuid4().hex,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="PGN file, or - for stdin")
+    parser.add_argument("--user", required=True, help="Username or email of the account to import into")
+    parser.add_argument("--create-user", action="store_true", help="Create the account if it does not exist")
+    parser.add_argument("--username", help="Player whose games these are (defaults to the account's Chess.com username)")
+    parser.add_argument("--game-types", nargs="+", choices=[g.value for g in GameType])
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        user = find_or_create_user(UserRepository(session), args.user, args.create_user)
+        username = (args.username or user.chess_com_username or user.username).strip().lower()
+        reported = 0
+
+        def on_progress(result: PgnImportResult) -> None:
+            nonlocal reported
+            if result.games_read - reported >= PROGRESS_EVERY_GAMES:
+                reported = result.games_read
+                print(f"{result.games_read} games read, {result.added} added ({result.games_per_second:.0f} games/s)",
+                      file=sys.stderr)
+
+        with open_pgn(args.path) as lines:
+            result = import_pgn_games(
+                lines,
+                user_id=user.id,
+                username=username,
+                user_game_repo=UserGameRepository(session),
+                explorer_repo=ExplorerRepository(session),
+                position_repo=GamePositionRepository(session),
+                game_types=[GameType(g) for g in args.game_types] if args.game_types else None,
+                batch_size=args.batch_size,
+                on_progress=on_progress,
+            )
+    finally:
+        session.close()
+
+    print(f"games read: {result.games_read}, added: {result.added}, skipped: {result.skipped}")
+    print(f"{result.seconds:.2f}s, {result.games_per_second:.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Regression and speed check for the puzzle tagger against a puzzle corpus.
+
+The corpus is a CSV in the Lichess puzzle export's format (PuzzleId, FEN,
+Moves, ..., Themes, ...): FEN is the position before the opponent's move,
+Moves that move and then the solution, Themes the expected tags. An extra Cp
+column holds the eval classify_puzzle_candidate is given; files without it,
+such as a Lichess export, get one from their crushing / advantage themes, and
+themes the tagger never produces (opening, master, ...) are ignored.
+
+Tags every puzzle and reports those that differ from their Themes, then
+puzzles/sec and p50 / p99 latency over --rounds passes, and the time spent in
+each of cook's detectors. Exits non-zero on any difference, or if p99 is
+over --max-p99-ms, so it can gate tagger changes.
+
+The checked-in corpus (scripts/puzzle_corpus.csv) is synthetic: positions
+from random tactical play, expected tags from the tagger when it was
+generated. Rebuild it with --generate, or take intended tag changes with
+--update.
+
+Usage (from backend/):
+    python -m scripts.puzzle_corpus
+    python -m scripts.puzzle_corpus --corpus lichess_db_puzzle.csv --limit 5000
+    python -m scripts.puzzle_corpus --generate 2000 --seed 0
+"""
+import argparse
+import csv
+import inspect
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import get_args
+
+import chess
+
+import services.puzzle_classifier.cook as cook_module
+from services.puzzle_classifier import classify_puzzle_candidate
+from services.puzzle_classifier.model import TagKind
+
+CORPUS = Path(__file__).with_name("puzzle_corpus.csv")
+COLUMNS = [
+    "PuzzleId", "FEN", "Moves", "Rating", "RatingDeviation", "Popularity", "NbPlays", "Themes", "GameUrl",
+    "OpeningTags", "Cp",
+]
+TAGS = set(get_args(TagKind))
+MAX_REPORTED = 20
+
+
+def read_corpus(path: Path, limit: int = 0) -> list[dict]:
+    with path.open(newline="") as f:
+        rows = list(csv.DictReader(f))
+    return rows[:limit] if limit else rows
+
+
+def write_corpus(path: Path, rows: list[dict]) -> None:
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def puzzle_cp(row: dict) -> int:
+    if row.get("Cp") not in (None, ""):
+        return int(row["Cp"])
+    themes = row["Themes"].split()
+    return 700 if "crushing" in themes else 300 if "advantage" in themes else 0
+
+
+def classify(row: dict) -> list[str]:
+    return classify_puzzle_candidate(
+        puzzle_id=row["PuzzleId"], start_fen=row["FEN"], solution_uci=row["Moves"].split(), cp=puzzle_cp(row),
+    )
+
+
+def mismatches(rows: list[dict]) -> list[tuple[dict, set, set]]:
+    """(row, expected, got) for each puzzle whose tags differ from its Themes."""
+    found = []
+    for row in rows:
+        expected = set(row["Themes"].split()) & TAGS
+        try:
+            got = set(classify(row))
+        except Exception as exc:
+            got = {f"<{type(exc).__name__}: {exc}>"}
+        if got != expected:
+            found.append((row, expected, got))
+    return found
+
+
+def latencies(rows: list[dict], rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        for row in rows:
+            start = time.perf_counter()
+            classify(row)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def detector_times(rows: list[dict]) -> tuple[dict[str, float], float]:
+    """Seconds spent in each detector cook() calls, and in classification overall."""
+    detectors = {
+        name: fn for name, fn in vars(cook_module).items()
+        if inspect.isfunction(fn) and fn.__module__ == cook_module.__name__ and name in cook_module.cook.__code__.co_names
+    }
+    spent: dict[str, float] = defaultdict(float)
+
+    def timed(name, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                spent[name] += time.perf_counter() - start
+        return wrapper
+
+    for name, fn in detectors.items():
+        setattr(cook_module, name, timed(name, fn))
+    try:
+        start = time.perf_counter()
+        for row in rows:
+            classify(row)
+        total = time.perf_counter() - start
+    finally:
+        for name, fn in detectors.items():
+            setattr(cook_module, name, fn)
+    return spent, total
+
+
+def random_line(rng: random.Random) -> tuple[str, list[str]]:
+    """A position from random play leaning to captures, checks and promotions,
+    and an even number of moves from it (the opponent's and the solution)."""
+
+    def pick(board: chess.Board, bias: float) -> chess.Move:
+        moves = list(board.legal_moves)
+        tactical = [m for m in moves if board.is_capture(m) or board.gives_check(m) or m.promotion]
+        return rng.choice(tactical) if tactical and rng.random() < bias else rng.choice(moves)
+
+    board = chess.Board()
+    for _ in range(rng.randint(10, 120)):
+        if board.is_game_over():
+            break
+        board.push(pick(board, 0.5))
+    fen, moves = board.fen(), []
+    for _ in range(rng.choice((2, 2, 4, 4, 4, 6, 6, 8, 10))):
+        if board.is_game_over():
+            break
+        move = pick(board, 0.7)
+        moves.append(move.uci())
+        board.push(move)
+    return fen, moves
+
+
+def generate(count: int, seed: int) -> list[dict]:
+    """`count` synthetic puzzles tagged by the current tagger, rare tags kept first."""
+    rng = random.Random(seed)
+    candidates = []
+    while len(candidates) < count * 10:
+        fen, moves = random_line(rng)
+        cp = rng.choice((0, 150, 300, 800))
+        if len(moves) % 2 or not moves:
+            continue
+        row = {"FEN": fen, "Moves": " ".join(moves), "Cp": cp, "PuzzleId": ""}
+        try:
+            row["Themes"] = " ".join(sorted(set(classify(row))))
+        except Exception:
+            continue  # the tagger needs two moves before the end of some lines
+        candidates.append(row)
+
+    frequency = Counter(tag for row in candidates for tag in row["Themes"].split())
+    candidates.sort(key=lambda row: min(frequency[tag] for tag in row["Themes"].split()))
+    rows = candidates[:count]
+    for i, row in enumerate(rows):
+        row["PuzzleId"] = f"syn{i:05d}"
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--limit", type=int, default=0, help="only the first N puzzles")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--update", action="store_true", help="set each puzzle's Themes to its current tags")
+    parser.add_argument("--generate", type=int, default=0, metavar="N", help="write a new synthetic corpus of N puzzles")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.generate:
+        rows = generate(args.generate, args.seed)
+        write_corpus(args.corpus, rows)
+        tags = Counter(tag for row in rows for tag in row["Themes"].split())
+        print(f"wrote {len(rows)} puzzles to {args.corpus}, {len(tags)} tags, rarest: {tags.most_common()[-5:]}")
+        return
+
+    rows = read_corpus(args.corpus, args.limit)
+    if args.update:
+        for row in rows:
+            row["Themes"] = " ".join(sorted(set(classify(row))))
+            row["Cp"] = puzzle_cp(row)
+        write_corpus(args.corpus, rows)
+        print(f"updated the tags of {len(rows)} puzzles in {args.corpus}")
+        return
+
+    failed = False
+    wrong = mismatches(rows)
+    print(f"{len(rows)} puzzles, {len(wrong)} with different tags")
+    for row, expected, got in wrong[:MAX_REPORTED]:
+        print(f"  {row['PuzzleId']}: missing {sorted(expected - got)}, extra {sorted(got - expected)}")
+    failed |= bool(wrong)
+
+    timings = latencies(rows, args.rounds)
+    p50 = statistics.median(timings) * 1000
+    p99 = statistics.quantiles(timings, n=100)[98] * 1000
+    print(f"{len(timings) / sum(timings):8.0f} puzzles/s   p50 {p50:.2f} ms   p99 {p99:.2f} ms   ({args.rounds} rounds)")
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f"p99 is over --max-p99-ms {args.max_p99_ms}")
+        failed = True
+
+    spent, total = detector_times(rows)
+    print(f"{'detector':28} {'us/puzzle':>10} {'share':>6}")
+    for name, seconds in sorted(spent.items(), key=lambda item: -item[1]):
+        print(f"{name:28} {seconds / len(rows) * 1e6:10.1f} {seconds / total:6.1%}")
+    other = total - sum(spent.values())
+    print(f"{'(board setup, mainline)':28} {other / len(rows) * 1e6:10.1f} {other / total:6.1%}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
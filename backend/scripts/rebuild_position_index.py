@@ -0,0 +1,47 @@
+"""Rebuild users' position search index (game_positions, game_material) from their stored games.
+
+Needed once for games stored before the index existed; imports keep it current
+after that (and analysing an unindexed game indexes it).
+
+Usage (from backend/):
+    python -m scripts.rebuild_position_index --user alice
+    python -m scripts.rebuild_position_index --all
+"""
+import argparse
+import sys
+import time
+
+from db.models import User
+from db.repositories import GamePositionRepository, UserGameRepository, UserRepository
+from db.sessions import SessionLocal
+from services.position_index import rebuild_position_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user", help="Username or email of one account")
+    target.add_argument("--all", action="store_true", help="Every account")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        user_repo = UserRepository(session)
+        if args.all:
+            users = session.query(User).order_by(User.created_at).all()
+        else:
+            user = user_repo.get_by_username(args.user) or user_repo.get_by_email(args.user.lower())
+            if not user:
+                sys.exit(f"No user with username or email {args.user!r}")
+            users = [user]
+
+        for user in users:
+            start = time.perf_counter()
+            games = rebuild_position_index(user.id, UserGameRepository(session), GamePositionRepository(session))
+            print(f"{user.username}: {games} games in {time.perf_counter() - start:.1f}s")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
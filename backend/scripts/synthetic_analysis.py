@@ -0,0 +1,135 @@
+"""Synthetic analysed games for benchmarks: realistic move lists with made-up engine evals.
+
+Games are drawn from a small pool of random-but-legal lines that share their
+openings, so positions (and the mistakes played in them) repeat across games
+the way they do in a real player's history.
+"""
+import random
+import uuid
+from datetime import datetime
+from typing import Any, Iterator
+
+import chess
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.models import GameMove, UserGame
+from db.repositories import MistakeIndexRepository
+from services.game_analysis import games_move_rows, mistake_entries
+from services.move_scoring import classify, move_columns, score_moves, side_summaries
+
+OPENINGS = (
+    ("e2e4", "e7e5", "g1f3", "b8c6"),
+    ("e2e4", "c7c5", "g1f3"),
+    ("d2d4", "d7d5", "c2c4"),
+    ("d2d4", "g8f6", "c2c4", "e7e6"),
+    ("c2c4", "e7e5", "b1c3"),
+)
+TIME_CLASSES = ("rapid", "blitz", "bullet")
+
+
+def line_pool(rng: random.Random, size: int = 400, max_plies: int = 100) -> list[list[tuple[str, str, str]]]:
+    """Random legal games as lists of (fen_before, san, uci)."""
+    pool = []
+    for _ in range(size):
+        board = chess.Board()
+        opening = rng.choice(OPENINGS)
+        line = []
+        for ply in range(rng.randint(20, max_plies)):
+            legal = sorted(board.legal_moves, key=lambda m: m.uci())
+            if not legal:
+                break
+            if ply < len(opening):
+                move = chess.Move.from_uci(opening[ply])
+            elif ply < 10:
+                move = legal[rng.randrange(min(3, len(legal)))]
+            else:
+                move = rng.choice(legal)
+            line.append((board.fen(), board.san(move), move.uci()))
+            board.push(move)
+        pool.append(line)
+    return pool
+
+
+def synthetic_analysis(rng: random.Random, line: list[tuple[str, str, str]]) -> dict[str, Any]:
+    """An analysed_game document shaped like the frontend's, with random evals."""
+    evals, cp = [], 20
+    for _ in range(len(line) + 1):
+        if rng.random() < 0.02:
+            evals.append({"type": "mate", "value": rng.choice((-3, -1, 2, 4))})
+            continue
+        step = rng.choice((150, 300, 600)) if rng.random() < 0.12 else rng.choice((5, 10, 30))
+        cp = max(-1500, min(1500, cp + rng.choice((-1, 1)) * step))
+        evals.append({"type": "cp", "value": cp})
+
+    moves = []
+    for i, (fen, san, uci) in enumerate(line):
+        before = evals[i]
+        moves.append({
+            "move_number": i // 2 + 1,
+            "side": "white" if i % 2 == 0 else "black",
+            "san": san,
+            "uci": uci,
+            "fen_before": fen,
+            "fen_after": line[i + 1][0] if i + 1 < len(line) else None,
+            "eval_before": before,
+            "eval_after": evals[i + 1],
+            "best_move": line[i + 1][2] if i + 1 < len(line) and rng.random() < 0.3 else uci,
+            "top_lines": [{"Centipawn": before["value"], "Mate": None, "Line": " ".join(m[2] for m in line[i:i + 4])}],
+        })
+
+    columns = move_columns([moves])
+    scores = score_moves(columns)
+    for move, cp_loss, classification in zip(moves, scores.cp_loss.tolist(), classify(scores.wc_loss)):
+        move["cp_loss"] = cp_loss
+        move["classification"] = classification
+    return {"moves": moves, "summary": side_summaries(columns, scores)[0], "timings": {}}
+
+
+def synthetic_games(
+    rng: random.Random, user_id: uuid.UUID, username: str, count: int, pool_size: int = 400,
+) -> Iterator[UserGame]:
+    """Unsaved analysed UserGame objects for `user_id`."""
+    pool = line_pool(rng, pool_size)
+    for i in range(count):
+        white, black = (username, f"opponent{i % 50}") if i % 2 == 0 else (f"opponent{i % 50}", username)
+        yield UserGame(
+            game_id=uuid.uuid4(),
+            user_id=user_id,
+            pgn="",
+            chess_com_username=username,
+            chess_com_game_uuid=f"synthetic-{i}",
+            end_time=1_600_000_000 + i * 3600,
+            time_class=TIME_CLASSES[i % len(TIME_CLASSES)],
+            white_username=white,
+            black_username=black,
+            analysed_game=synthetic_analysis(rng, rng.choice(pool)),
+            is_analysed=True,
+            analysed_at=datetime.utcnow(),
+        )
+
+
+def seed_analysed_games(session: Session, user_id: uuid.UUID, username: str, count: int, seed: int = 0) -> None:
+    """Insert `count` analysed games, their game_moves rows and mistake-index entries for a user."""
+    rng = random.Random(seed)
+    games: list[UserGame] = []
+    for game in synthetic_games(rng, user_id, username, count):
+        games.append(game)
+        if len(games) == 500:
+            _insert(session, games)
+            games = []
+    if games:
+        _insert(session, games)
+
+
+def _insert(session: Session, games: list[UserGame]) -> None:
+    columns = ("game_id", "user_id", "pgn", "chess_com_username", "chess_com_game_uuid", "end_time",
+               "time_class", "white_username", "black_username", "analysed_game", "is_analysed",
+               "analysed_at")
+    session.execute(insert(UserGame.__table__), [{c: getattr(g, c) for c in columns} for g in games])
+    rows = dict(zip((g.game_id for g in games), games_move_rows([(g, g.analysed_game) for g in games])))
+    session.execute(insert(GameMove.__table__), [row for game_rows in rows.values() for row in game_rows])
+    MistakeIndexRepository(session).stage_replace(
+        games[0].user_id, rows, [], [entry for g in games for entry in mistake_entries(g, rows[g.game_id])],
+    )
+    session.commit()
@@ -1,3 +1,3 @@
-from .chess_com import fetch_chess_com_games
+from .chess_com import iter_chess_com_months
 
-__all__ = ["fetch_chess_com_games"]
+__all__ = ["iter_chess_com_months"]
@@ -0,0 +1,316 @@
+"""Compact binary storage for analysed_game documents.
+
+The browser's document repeats key names, two FENs and the top lines for
+every ply, so a game is tens of KB of JSON. Everything in it except the
+summary is either derivable from the game's PGN (FENs, SAN, move numbers) or
+a small number, so it is stored as packed little-endian arrays instead:
+
+    header       magic b"AG", version, plies (n), total top lines (L), total PV moves (P)
+    summary      length-prefixed compact JSON
+    moves        uint16[n]     from | to << 6 | promotion << 12
+    eval types   uint8[n + 1]  0 = cp, 1 = mate; the position before each move, then the final one
+    eval values  int16[n + 1]
+    best moves   uint16[n]
+    cp losses    int16[n]
+    labels       uint8[n]      index into CLASSIFICATIONS
+    line counts  uint8[n]      top lines per ply
+    line types   uint8[L], line values int16[L], PV lengths uint8[L]
+    PV moves     uint16[P]
+
+encode_analysis only returns a blob that decodes back to exactly the same
+JSON; anything else (a shape this format cannot hold) is stored as JSON as
+before. Decoding is lazy: the arrays are views over the blob, FENs and SAN
+are replayed from the PGN only as far as the moves read, and each move's
+dict is built when it is accessed.
+"""
+import json
+import re
+import struct
+from collections.abc import Mapping, Sequence
+from functools import cached_property, lru_cache
+from typing import Any, Optional
+
+import chess
+import numpy as np
+
+from db.models import UserGame
+from services.pgn_replay import FEN_HEADER
+
+MAGIC = b"AG"
+VERSION = 1
+HEADER = struct.Struct("<2sBHHI")
+SUMMARY_LENGTH = struct.Struct("<H")
+CLASSIFICATIONS = ("best", "good", "inaccuracy", "mistake", "blunder")
+EVAL_TYPES = ("cp", "mate")
+LINE_KEYS = ("Centipawn", "Mate")
+# best_move values that are not moves
+NO_MOVE = {"(none)": 0xFFFF, "": 0xFFFE}
+NO_MOVE_NAMES = {code: name for name, code in NO_MOVE.items()}
+EMPTY_RUN = re.compile("1+")
+INT16_MIN, INT16_MAX = -(1 << 15), (1 << 15) - 1
+
+
+def _move_code(uci: str) -> int:
+    if uci in NO_MOVE:
+        return NO_MOVE[uci]
+    move = chess.Move.from_uci(uci)
+    if not move:  # the null move
+        raise ValueError("Null move")
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def _move(code: int) -> chess.Move:
+    return chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+
+
+@lru_cache(maxsize=None)
+def _uci(code: int) -> str:
+    name = NO_MOVE_NAMES.get(code)
+    return name if name is not None else _move(code).uci()
+
+
+def _int16(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or not INT16_MIN <= value <= INT16_MAX:
+        raise ValueError(f"Not an int16: {value!r}")
+    return value
+
+
+def _starting_board(pgn: Optional[str]) -> chess.Board:
+    fen = FEN_HEADER.search(pgn or "")
+    return chess.Board(fen.group(1)) if fen else chess.Board()
+
+
+@lru_cache(maxsize=4096)
+def _rank_fen(rank: str) -> str:
+    """"r1b1k2r"-style rank from eight symbols with "1" for each empty square."""
+    return EMPTY_RUN.sub(lambda run: str(len(run.group())), rank)
+
+
+class _Replay:
+    """FEN and SAN of each ply, replayed from the start as far as needed.
+
+    Board.fen() reads all 64 squares one by one, which dominates a full
+    decode, so the piece placement is kept in a grid updated move by move.
+    A position this gets wrong (a variant python-chess castles differently
+    in) cannot be stored compact at all: encode_analysis compares the decoded
+    document with the original.
+    """
+
+    def __init__(self, board: chess.Board, moves: list[int]):
+        self.board = board
+        self.moves = moves
+        self.grid = ["1"] * 64  # in FEN order: a8 .. h8, a7 .. h1
+        for square, piece in board.piece_map().items():
+            self.grid[square ^ 56] = piece.symbol()
+        self.fens = [self._fen()]
+        self.sans: list[str] = []
+
+    def _fen(self) -> str:
+        board, grid = self.board, self.grid
+        placement = "/".join(_rank_fen("".join(grid[i:i + 8])) for i in range(0, 64, 8))
+        ep = board.ep_square if board.ep_square is not None and board.has_legal_en_passant() else None
+        return (
+            f"{placement} {'w' if board.turn else 'b'} {board.castling_xfen()} "
+            f"{chess.SQUARE_NAMES[ep] if ep is not None else '-'} {board.halfmove_clock} {board.fullmove_number}"
+        )
+
+    def advance(self, plies: int) -> None:
+        board, grid = self.board, self.grid
+        for code in self.moves[len(self.sans):plies]:
+            move = _move(code)
+            symbol = grid[move.from_square ^ 56]
+            if move.promotion:
+                symbol = chess.piece_symbol(move.promotion)
+                symbol = symbol.upper() if board.turn else symbol
+            if board.is_en_passant(move):
+                grid[(move.to_square - 8 if board.turn else move.to_square + 8) ^ 56] = "1"
+            elif board.is_castling(move):
+                rank = chess.square_rank(move.from_square) * 8
+                rook_from, rook_to = (rank + 7, rank + 5) if board.is_kingside_castling(move) else (rank, rank + 3)
+                grid[rook_from ^ 56], grid[rook_to ^ 56] = "1", grid[rook_from ^ 56]
+            self.sans.append(board.san_and_push(move))
+            grid[move.from_square ^ 56] = "1"
+            grid[move.to_square ^ 56] = symbol
+            self.fens.append(self._fen())
+
+
+def _pack(document: dict[str, Any]) -> bytes:
+    moves = document["moves"]
+    n = len(moves)
+    evals = [move["eval_before"] for move in moves] + [moves[-1]["eval_after"]] if moves else []
+    line_types, line_values, pv_lengths, pv_moves = [], [], [], []
+    for move in moves:
+        for line in move["top_lines"]:
+            key = next(iter(line))
+            line_types.append(LINE_KEYS.index(key))
+            line_values.append(_int16(line[key]))
+            pv = line["Line"].split()
+            pv_lengths.append(len(pv))
+            pv_moves.extend(_move_code(uci) for uci in pv)
+    summary = json.dumps(document["summary"], separators=(",", ":")).encode()
+    parts = [
+        HEADER.pack(MAGIC, VERSION, n, len(line_types), len(pv_moves)),
+        SUMMARY_LENGTH.pack(len(summary)),
+        summary,
+        np.array([_move_code(move["uci"]) for move in moves], "<u2").tobytes(),
+        np.array([EVAL_TYPES.index(e["type"]) for e in evals], "u1").tobytes(),
+        np.array([_int16(e["value"]) for e in evals], "<i2").tobytes(),
+        np.array([_move_code(move["best_move"]) for move in moves], "<u2").tobytes(),
+        np.array([_int16(move["cp_loss"]) for move in moves], "<i2").tobytes(),
+        np.array([CLASSIFICATIONS.index(move["classification"]) for move in moves], "u1").tobytes(),
+        np.array([len(move["top_lines"]) for move in moves], "u1").tobytes(),
+        np.array(line_types, "u1").tobytes(),
+        np.array(line_values, "<i2").tobytes(),
+        np.array(pv_lengths, "u1").tobytes(),
+        np.array(pv_moves, "<u2").tobytes(),
+    ]
+    return b"".join(parts)
+
+
+def encode_analysis(pgn: Optional[str], document: dict[str, Any]) -> Optional[bytes]:
+    """The compact form of a document, or None if it cannot hold it exactly."""
+    try:
+        if list(document) != ["moves", "summary"] or not document["moves"]:
+            return None
+        blob = _pack(document)
+        restored = decode_analysis(pgn, blob).to_dict()
+    except (KeyError, ValueError, TypeError, AttributeError, IndexError, OverflowError, StopIteration, struct.error):
+        return None
+    if json.dumps(restored) != json.dumps(document):
+        return None
+    return blob
+
+
+class DecodedMoves(Sequence):
+    """The `moves` list of a compact analysis, built one move at a time."""
+
+    def __init__(self, pgn: Optional[str], blob: bytes):
+        _, _, n, lines, pv_total = HEADER.unpack_from(blob)
+        (summary_length,) = SUMMARY_LENGTH.unpack_from(blob, HEADER.size)
+        self.pgn = pgn
+        offset = HEADER.size + SUMMARY_LENGTH.size + summary_length
+        arrays = {}
+        for name, dtype, count in (
+            ("moves", "<u2", n), ("eval_types", "u1", n + 1), ("eval_values", "<i2", n + 1),
+            ("best_moves", "<u2", n), ("cp_losses", "<i2", n), ("labels", "u1", n), ("line_counts", "u1", n),
+            ("line_types", "u1", lines), ("line_values", "<i2", lines), ("pv_lengths", "u1", lines),
+            ("pv_moves", "<u2", pv_total),
+        ):
+            arrays[name] = np.frombuffer(blob, dtype, count, offset)
+            offset += arrays[name].nbytes
+        self.arrays = arrays
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    @cached_property
+    def _replay(self) -> _Replay:
+        return _Replay(_starting_board(self.pgn), self.arrays["moves"].tolist())
+
+    @cached_property
+    def _line_starts(self) -> tuple[np.ndarray, np.ndarray]:
+        """First top line of each ply, and first PV move of each line."""
+        lines = np.concatenate(([0], np.cumsum(self.arrays["line_counts"], dtype=np.int64)))
+        pvs = np.concatenate(([0], np.cumsum(self.arrays["pv_lengths"], dtype=np.int64)))
+        return lines, pvs
+
+    def _eval(self, i: int) -> dict[str, Any]:
+        return {"type": EVAL_TYPES[self.arrays["eval_types"][i]], "value": int(self.arrays["eval_values"][i])}
+
+    def _top_lines(self, i: int) -> list[dict[str, Any]]:
+        lines, pvs = self._line_starts
+        top_lines = []
+        for j in range(lines[i], lines[i + 1]):
+            pv = self.arrays["pv_moves"][pvs[j]:pvs[j + 1]].tolist()
+            top_lines.append({
+                LINE_KEYS[self.arrays["line_types"][j]]: int(self.arrays["line_values"][j]),
+                "Line": " ".join(_uci(code) for code in pv),
+            })
+        return top_lines
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError(index)
+        replay = self._replay
+        replay.advance(index + 1)
+        fens, sans = replay.fens, replay.sans
+        return {
+            "move_number": index // 2 + 1,
+            "side": "white" if index % 2 == 0 else "black",
+            "san": sans[index],
+            "uci": _uci(int(self.arrays["moves"][index])),
+            "fen_before": fens[index],
+            "fen_after": fens[index + 1],
+            "eval_before": self._eval(index),
+            "eval_after": self._eval(index + 1),
+            "best_move": _uci(int(self.arrays["best_moves"][index])),
+            "top_lines": self._top_lines(index),
+            "cp_loss": int(self.arrays["cp_losses"][index]),
+            "classification": CLASSIFICATIONS[self.arrays["labels"][index]],
+        }
+
+
+class DecodedAnalysis(Mapping):
+    """A compact analysis read like the analysed_game dict it was encoded from.
+
+    Only the header is read up front; `summary` is parsed and `moves` built
+    when first accessed. to_dict() gives a plain dict (e.g. to serialise).
+    """
+
+    def __init__(self, pgn: Optional[str], blob: bytes):
+        header = HEADER.unpack_from(blob)
+        if header[0] != MAGIC or header[1] != VERSION:
+            raise ValueError("Not a compact analysis")
+        self._pgn = pgn
+        self._blob = blob
+
+    @cached_property
+    def moves(self) -> DecodedMoves:
+        return DecodedMoves(self._pgn, self._blob)
+
+    @cached_property
+    def summary(self) -> dict[str, Any]:
+        (length,) = SUMMARY_LENGTH.unpack_from(self._blob, HEADER.size)
+        start = HEADER.size + SUMMARY_LENGTH.size
+        return json.loads(bytes(self._blob[start:start + length]))
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "moves":
+            return self.moves
+        if key == "summary":
+            return self.summary
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("moves", "summary"))
+
+    def __len__(self) -> int:
+        return 2
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"moves": list(self.moves), "summary": self.summary}
+
+
+def decode_analysis(pgn: Optional[str], blob: bytes) -> DecodedAnalysis:
+    """Lazily decode a compact analysis of the game with this PGN."""
+    return DecodedAnalysis(pgn, blob)
+
+
+def stored_analysis(pgn: Optional[str], document: dict[str, Any]) -> dict[str, Any]:
+    """The user_games columns to store an analysis in: compact when possible."""
+    blob = encode_analysis(pgn, document)
+    if blob is None:
+        return dict(analysis_blob=None, analysed_game=document)
+    return dict(analysis_blob=blob, analysed_game=None)
+
+
+def game_analysis(game: UserGame) -> Optional[Mapping]:
+    """A stored game's analysed_game document, whichever way it is stored."""
+    if game.analysis_blob is not None:
+        return decode_analysis(game.pgn, game.analysis_blob)
+    return game.analysed_game
@@ -0,0 +1,170 @@
+"""Durable queue of server-side analysis jobs, kept in Postgres.
+
+The API enqueues jobs (analysis_jobs rows); worker processes started with
+scripts/analysis_worker.py lease them one at a time with FOR UPDATE SKIP
+LOCKED, analyse the game on their own engine and save the result in the same
+transaction that marks the job done. Games the user has open go first, then
+the most recent games. A worker that dies loses its lease, and the job is
+queued again once the lease runs out; failures are retried with backoff up
+to the job's max_attempts.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+import chess.engine
+
+from core.config import settings
+from db.repositories import AnalysisJobRepository, PositionEvalRepository, UserGameRepository
+from db.sessions import SessionLocal
+from services.engine_analysis import EngineAnalyser, FenCache, UnsupportedGame, engine_limit, save_analysis
+
+PRIORITY_BACKGROUND = 0
+PRIORITY_OPEN = 100  # a game open in the app jumps the queue
+# A worker must finish a game within its lease, or the job is handed to another
+LEASE = timedelta(minutes=10)
+RETRY_BACKOFF = timedelta(seconds=30)  # times the attempt number squared
+POLL_SECONDS = 2.0
+# How often each worker looks for jobs whose lease ran out
+EXPIRED_CHECK_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_analysis(
+    job_repo: AnalysisJobRepository,
+    user_id: UUID,
+    game_ids: Optional[list[UUID]] = None,
+    open: bool = False,
+    force: bool = False,
+) -> int:
+    """Queue a user's games (default: all unanalysed) for analysis. Returns
+    the number of jobs queued or moved up."""
+    return job_repo.enqueue(user_id, game_ids, PRIORITY_OPEN if open else PRIORITY_BACKGROUND, force)
+
+
+def worker_name() -> str:
+    """Identifies the worker holding a lease, for inspecting the queue."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def run_next_job(session, analyser: EngineAnalyser, lease: timedelta = LEASE) -> Optional[str]:
+    """Lease and run the next due job.
+
+    Returns what happened to it ("done", "skipped", "retry", "failed" or
+    "lost" if the lease was lost before the save), or None if nothing was due.
+    """
+    job_repo = AnalysisJobRepository(session)
+    job = job_repo.dequeue(worker_name(), lease)
+    if job is None:
+        return None
+    game = UserGameRepository(session).get_by_game_id(job.game_id)
+    if game is None:
+        job_repo.fail(job.job_id, job.lease_token, "Game not found")
+        return "failed"
+    if game.is_analysed and not job.force:
+        # Analysed in the browser since it was queued
+        job_repo.stage_complete(job.job_id, job.lease_token)
+        session.commit()
+        return "skipped"
+    try:
+        document, timings = analyser.analyse_game(game.pgn, PositionEvalRepository(session))
+        saved = save_analysis(
+            session, job.game_id, document, lambda: job_repo.stage_complete(job.job_id, job.lease_token),
+        )
+    except UnsupportedGame as exc:
+        logger.warning("Analysis job %s for game %s failed: %s", job.job_id, job.game_id, exc)
+        job_repo.fail(job.job_id, job.lease_token, str(exc))
+        return "failed"
+    except Exception as exc:
+        logger.exception("Analysis job %s for game %s failed", job.job_id, job.game_id)
+        session.rollback()
+        retried = job_repo.fail(job.job_id, job.lease_token, str(exc), RETRY_BACKOFF * job.attempts ** 2)
+        return "retry" if retried else "lost"
+    if not saved:
+        logger.warning("Analysis job %s lost its lease; result for game %s discarded", job.job_id, job.game_id)
+        return "lost"
+    logger.info(
+        "Analysed game %s: %d moves in %.0fms (engine %.0fms, %d positions cached, %d shared)",
+        job.game_id, timings["moveCount"], timings["totalMs"], timings["engineMs"], timings["cacheHits"],
+        timings["serverCacheHits"],
+    )
+    return "done"
+
+
+@dataclass
+class WorkerStats:
+    """Outcomes of the jobs a worker process ran."""
+
+    workers: int = 0
+    outcomes: Counter = field(default_factory=Counter)
+    seconds: float = 0.0
+
+
+def run_workers(
+    *,
+    workers: Optional[int] = None,
+    engine_path: Optional[str] = None,
+    limit: Optional[chess.engine.Limit] = None,
+    lease: timedelta = LEASE,
+    drain: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> WorkerStats:
+    """Run queue workers, one engine process each, until `stop` is set or,
+    with `drain`, until no job is due."""
+    count = workers or settings.ANALYSIS_WORKERS or os.cpu_count() or 1
+    stop = stop or threading.Event()
+    stats = WorkerStats(workers=count)
+    cache = FenCache()
+    lock = threading.Lock()
+    limit = limit or engine_limit()
+    # Started up front so a missing or broken engine fails the call, not a thread
+    analysers: list[EngineAnalyser] = []
+    try:
+        for _ in range(count):
+            analysers.append(EngineAnalyser(engine_path, limit, cache))
+    except Exception:
+        for analyser in analysers:
+            analyser.close()
+        raise
+    start = time.perf_counter()
+
+    def work(analyser: EngineAnalyser) -> None:
+        session = SessionLocal()
+        next_expired_check = 0.0
+        try:
+            while not stop.is_set():
+                if time.monotonic() >= next_expired_check:
+                    requeued = AnalysisJobRepository(session).requeue_expired()
+                    if requeued:
+                        logger.info("Requeued %d analysis job(s) with an expired lease", requeued)
+                    next_expired_check = time.monotonic() + EXPIRED_CHECK_SECONDS
+                outcome = run_next_job(session, analyser, lease)
+                if outcome is None:
+                    if drain:
+                        return
+                    stop.wait(POLL_SECONDS)
+                    continue
+                with lock:
+                    stats.outcomes[outcome] += 1
+        finally:
+            session.close()
+            analyser.close()
+
+    threads = [
+        threading.Thread(target=work, args=(analyser,), name=f"analysis-worker-{i}")
+        for i, analyser in enumerate(analysers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,118 @@
+"""Persistent on-disk cache of Chess.com monthly game archives."""
+import json
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import quote
+
+# Chess.com can take a while to publish the last games of a month, so an
+# archive only counts as final once it was fetched this long after month end.
+FINAL_GRACE = timedelta(days=1)
+
+# Fields kept from each archived game; everything else (accuracies, FEN,
+# rules, player URLs...) is dropped to keep cache files small and fast to load.
+GAME_FIELDS = ("uuid", "pgn", "tcn", "end_time", "time_class", "time_control")
+PLAYER_FIELDS = ("username", "rating", "result")
+
+
+@dataclass
+class CachedArchive:
+    games: list[dict[str, Any]]
+    fetched_at: datetime
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def _month_end(year: int, month: int) -> datetime:
+    return datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+
+def slim_games(games: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep only the fields the importer reads from each archived game."""
+    slim = []
+    for g in games:
+        entry = {key: g.get(key) for key in GAME_FIELDS}
+        for side in ("white", "black"):
+            player = g.get(side) or {}
+            entry[side] = {key: player.get(key) for key in PLAYER_FIELDS}
+        slim.append(entry)
+    return slim
+
+
+class ArchiveCache:
+    """One JSON file per (username, year, month), with HTTP validators for revalidation.
+
+    `stats` counts lookups across the process: `hits` (served from disk without
+    a request), `revalidated` (server answered 304), `misses` (full download).
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _path(self, username: str, year: int, month: int) -> Path:
+        return self.root / quote(username.lower(), safe="") / f"{year:04d}-{month:02d}.json"
+
+    def load(self, username: str, year: int, month: int) -> Optional[CachedArchive]:
+        try:
+            with open(self._path(username, year, month), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return CachedArchive(
+            games=data.get("games") or [],
+            fetched_at=datetime.fromisoformat(data["fetched_at"]),
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+        )
+
+    def store(
+        self, username: str, year: int, month: int, games: list[dict[str, Any]],
+        etag: Optional[str] = None, last_modified: Optional[str] = None,
+    ) -> CachedArchive:
+        entry = CachedArchive(
+            games=slim_games(games), fetched_at=datetime.utcnow(), etag=etag, last_modified=last_modified,
+        )
+        self._write(username, year, month, entry)
+        return entry
+
+    def touch(self, username: str, year: int, month: int, entry: CachedArchive) -> None:
+        """Record a successful revalidation so a now-closed month can become final."""
+        entry.fetched_at = datetime.utcnow()
+        self._write(username, year, month, entry)
+
+    def _write(self, username: str, year: int, month: int, entry: CachedArchive) -> None:
+        path = self._path(username, year, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "games": entry.games,
+                "fetched_at": entry.fetched_at.isoformat(),
+                "etag": entry.etag,
+                "last_modified": entry.last_modified,
+            }, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def is_final(entry: CachedArchive, year: int, month: int) -> bool:
+        """A month fetched after it (plus a grace period) ended can never change again."""
+        return entry.fetched_at >= _month_end(year, month) + FINAL_GRACE
+
+    @staticmethod
+    def conditional_headers(entry: CachedArchive) -> dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
@@ -1,9 +1,15 @@
 """Fetch games from the Chess.com public API."""
+import asyncio
+import logging
+import itertools
+import re
 from datetime import datetime
-from typing import List, Literal
+from typing import Any, AsyncIterator, Iterator, List, Literal, NamedTuple, Optional
 
 import httpx
 
+from services.archive_cache import ArchiveCache
+
 TIMEFRAME_MONTHS = {
     "3_months": 3,
     "1_year": 12,
@@ -14,71 +20,234 @@ TIMEFRAME_MONTHS = {
 ALLOWED_TIME_CLASSES = frozenset({"rapid", "blitz", "bullet"})
 BASE_URL = "https://api.chess.com/pub/player"
 
+# Async fetcher tuning: how many month archives are in flight at once, and how
+# many pooled connections we open to api.chess.com (all archives share one host).
+MAX_CONCURRENT_MONTHS = 8
+MAX_CONNECTIONS_PER_HOST = 6
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# A game's page, the archive's "url" and the PGN export's Link header
+GAME_URL = re.compile(r"^https?://(?:www\.)?chess\.com/game/(?P<kind>live|daily)/(?P<id>\d+)")
+
+
+from schema import Timeframe, GameType
+
+logger = logging.getLogger(__name__)
+
+
+class MonthArchive(NamedTuple):
+    """One fetched month: game rows ready for user_games, or None if the fetch failed."""
+    year: int
+    month: int
+    rows: Optional[List[dict[str, Any]]]
+
+
+def allowed_time_classes(game_types: List[GameType] | None) -> frozenset[str]:
+    if game_types is None:
+        game_types = [GameType.RAPID, GameType.BLITZ, GameType.BULLET]
+    allowed = ALLOWED_TIME_CLASSES & set([gt.value for gt in game_types])
+    return frozenset(allowed) if allowed else ALLOWED_TIME_CLASSES
+
+
+def chess_com_game_id(url: Optional[str]) -> Optional[str]:
+    """The game id in a Chess.com game URL, such as "live/123456789", or None.
+
+    The archive API and PGN exports key games differently (uuid vs Link URL);
+    both carry this URL, so it identifies a game whichever way it was imported.
+    """
+    match = GAME_URL.match(url or "")
+    return f"{match['kind']}/{match['id']}" if match else None
+
+
+def _archive_months(months_to_fetch: int, now: datetime) -> List[tuple[int, int]]:
+    """Return (year, month) pairs to fetch, newest first."""
+    months = []
+    year, month = now.year, now.month
+    for _ in range(months_to_fetch):
+        months.append((year, month))
+        month -= 1
+        if month < 1:
+            month = 12
+            year -= 1
+    return months
+
 
-from schema import ChessComGame, Timeframe, GameType
+def month_key(year: int, month: int) -> int:
+    """Encode a month as a sortable YYYYMM integer."""
+    return year * 100 + month
 
 
-def fetch_chess_com_games(
+def archive_months_to_fetch(
+    timeframe: Timeframe,
+    coverage: List[tuple[int, int]] | None = None,
+    now: datetime | None = None,
+) -> List[tuple[int, int]]:
+    """
+    Return the (year, month) archives in `timeframe` that still need fetching, newest first.
+
+    `coverage` holds one (covered_from, covered_through) YYYYMM pair per
+    requested time class (see ImportWatermark), or None if any of them has
+    never been imported. A month is skipped only when every time class has
+    already imported it; the through month is always refetched since it may
+    have gained games.
+    """
+    months = _archive_months(TIMEFRAME_MONTHS.get(timeframe.value, 3), now or datetime.utcnow())
+    if coverage is None:
+        return months
+    return [
+        (year, month) for year, month in months
+        if any(
+            not (covered_from <= month_key(year, month) < covered_through)
+            for covered_from, covered_through in coverage
+        )
+    ]
+
+
+def advance_coverage(
+    timeframe: Timeframe,
+    previous: tuple[int, int] | None,
+    now: datetime | None = None,
+) -> tuple[int, int]:
+    """Coverage of one time class after `archive_months_to_fetch(timeframe, ...)` was fully imported."""
+    months = _archive_months(TIMEFRAME_MONTHS.get(timeframe.value, 3), now or datetime.utcnow())
+    oldest, newest = month_key(*months[-1]), month_key(*months[0])
+    if previous is None or previous[1] < oldest:
+        # Earlier coverage ends before this timeframe starts: the gap was never fetched.
+        return oldest, newest
+    return min(previous[0], oldest), max(previous[1], newest)
+
+
+def _archive_rows(data: dict[str, Any], username: str, allowed: frozenset[str]) -> Iterator[dict[str, Any]]:
+    """Yield one user_games row (without user_id) per game in a month archive payload."""
+    for g in data.get("games") or []:
+        time_class = (g.get("time_class") or "").lower()
+        if time_class not in allowed:
+            continue
+        white = g.get("white") or {}
+        black = g.get("black") or {}
+        yield dict(
+            pgn=g.get("pgn") or "",
+            tcn=g.get("tcn"),
+            chess_com_username=username,
+            chess_com_game_uuid=g.get("uuid"),
+            chess_com_game_id=chess_com_game_id(g.get("url")),
+            end_time=g.get("end_time"),
+            time_class=time_class,
+            time_control=g.get("time_control"),
+            white_username=white.get("username"),
+            black_username=black.get("username"),
+            white_result=white.get("result"),
+            black_result=black.get("result"),
+            white_rating=white.get("rating"),
+            black_rating=black.get("rating"),
+        )
+
+
+def _retry_delay(resp: httpx.Response | None, attempt: int) -> float:
+    """Backoff before the next attempt, honouring Retry-After on 429/503."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return BACKOFF_BASE_SECONDS * (2 ** attempt)
+
+
+async def _get_with_retry(
+    client: httpx.AsyncClient, url: str, headers: dict[str, str] | None = None,
+) -> httpx.Response | None:
+    """GET `url`, retrying transient failures. Returns None if every attempt failed."""
+    resp: httpx.Response | None = None
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            resp = await client.get(url, headers=headers)
+        except httpx.TransportError as exc:
+            logger.warning("Chess.com request failed (%s), attempt %d: %s", url, attempt + 1, exc)
+            resp = None
+        else:
+            if resp.status_code not in RETRY_STATUS_CODES:
+                return resp
+        if attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(resp, attempt))
+    return resp
+
+
+async def _fetch_month(
+    client: httpx.AsyncClient,
+    base_url: str,
+    username: str,
+    year: int,
+    month: int,
+    allowed: frozenset[str],
+    cache: ArchiveCache | None,
+) -> MonthArchive:
+    """Fetch and parse one archive; `rows` is None if it could not be fetched."""
+    url = f"{base_url}/{username}/games/{year}/{month:02d}"
+    cached = cache.load(username, year, month) if cache else None
+    if cached and cache.is_final(cached, year, month):
+        cache.record("hits")
+        return MonthArchive(year, month, list(_archive_rows({"games": cached.games}, username, allowed)))
+
+    resp = await _get_with_retry(client, url, cache.conditional_headers(cached) if cached else None)
+    if resp is not None and resp.status_code == 304 and cached:
+        cache.record("revalidated")
+        cache.touch(username, year, month, cached)
+        return MonthArchive(year, month, list(_archive_rows({"games": cached.games}, username, allowed)))
+    if resp is not None and resp.status_code == 404:
+        return MonthArchive(year, month, [])
+    if resp is None or resp.status_code != 200:
+        logger.warning("Skipping Chess.com archive %s (%s)", url, resp.status_code if resp is not None else "no response")
+        return MonthArchive(year, month, None)
+    try:
+        data = resp.json()
+    except ValueError:
+        logger.warning("Skipping Chess.com archive %s (invalid JSON)", url)
+        return MonthArchive(year, month, None)
+    if cache:
+        cache.record("misses")
+        cache.store(
+            username, year, month, data.get("games") or [],
+            etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"),
+        )
+    return MonthArchive(year, month, list(_archive_rows(data, username, allowed)))
+
+
+async def iter_chess_com_months(
     username: str,
-    timeframe: Timeframe = Timeframe.THREE_MONTHS,
+    months: List[tuple[int, int]],
     game_types: List[GameType] | None = None,
-) -> List[ChessComGame]:
+    base_url: str = BASE_URL,
+    max_concurrency: int = MAX_CONCURRENT_MONTHS,
+    cache: ArchiveCache | None = None,
+) -> AsyncIterator[MonthArchive]:
     """
-    Fetch games from Chess.com API for the given username and timeframe.
-    Only rapid, blitz, and bullet games are included.
+    Yield each requested month archive as soon as it has been fetched.
+
+    At most `max_concurrency` months are in flight (and buffered) at once over
+    one pooled AsyncClient, so memory stays flat however many months are
+    requested. Archives arrive in completion order, not calendar order. With a
+    `cache`, closed months are served from disk and open ones are revalidated
+    with If-None-Match / If-Modified-Since.
     """
-    if game_types is None:
-        game_types = [GameType.RAPID, GameType.BLITZ, GameType.BULLET]
-    allowed = ALLOWED_TIME_CLASSES & set([gt.value for gt in game_types])
-    if not allowed:
-        allowed = ALLOWED_TIME_CLASSES
-
-    months_to_fetch = TIMEFRAME_MONTHS.get(timeframe.value, 3)
-    now = datetime.utcnow()
-    games: List[ChessComGame] = []
-
-    with httpx.Client(timeout=30.0) as client:
-        year, month = now.year, now.month
-        for _ in range(months_to_fetch):
-            url = f"{BASE_URL}/{username}/games/{year}/{month:02d}"
-            try:
-                resp = client.get(url)
-                if resp.status_code == 404:
-                    pass
-                elif resp.status_code != 200:
-                    resp.raise_for_status()
-                else:
-                    data = resp.json()
-                    for g in data.get("games") or []:
-                        time_class = (g.get("time_class") or "").lower()
-                        if time_class not in allowed:
-                            continue
-                        white = g.get("white") or {}
-                        black = g.get("black") or {}
-                        games.append(ChessComGame(
-                            pgn=g.get("pgn") or "",
-                            tcn=g.get("tcn"),
-                            chess_com_username=username,
-                            chess_com_game_uuid=g.get("uuid"),
-                            end_time=g.get("end_time"),
-                            time_class=time_class,
-                            white_username=white.get("username"),
-                            black_username=black.get("username"),
-                            white_result=white.get("result"),
-                            black_result=black.get("result"),
-                            time_control=g.get("time_control"),
-                            white=white,
-                            black=black,
-                            uuid=g.get("uuid"),
-                            white_rating=white.get('rating'),
-                            black_rating=black.get('rating')
-                        ))
-            except httpx.HTTPError:
-                pass
-
-            month -= 1
-            if month < 1:
-                month = 12
-                year -= 1
-
-    return games
+    allowed = allowed_time_classes(game_types)
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=MAX_CONNECTIONS_PER_HOST,
+    )
+    remaining = iter(months)
+    pending: set[asyncio.Task] = set()
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        try:
+            while True:
+                for year, month in itertools.islice(remaining, max_concurrency - len(pending)):
+                    pending.add(asyncio.create_task(
+                        _fetch_month(client, base_url, username, year, month, allowed, cache)
+                    ))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,393 @@
+"""Server-side game analysis with a pool of local UCI engines (Stockfish) driven through chess.engine.
+
+Produces the same `analysed_game` document as the browser's
+frontend/src/engine/analyzeFullGame.js: every position of the mainline is
+searched once (single PV, fixed depth) unless the shared position_evals cache
+(services.eval_cache) already has it, and the per-move losses,
+classifications and accuracy summary come from services.move_scoring, which
+uses the frontend's formulas. Games saved either way are interchangeable.
+
+Each worker thread owns one engine process and one database session, so a pool
+of N workers keeps N cores busy; results are saved through save_game_analysis
+like a PATCH from the browser.
+"""
+import logging
+import os
+import queue
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+from uuid import UUID
+
+import chess
+import chess.engine
+from sqlalchemy.exc import OperationalError
+
+from core.config import settings
+from db.repositories import (
+    ExplorerRepository, GameMoveRepository, GamePositionRepository, MistakeIndexRepository, PositionEvalRepository,
+    UserGameRepository,
+)
+from db.sessions import SessionLocal
+from schema import AnalysedGame
+from services.eval_cache import cached_result, eval_row
+from services.game_analysis import save_game_analysis
+from services.move_scoring import classify, move_columns, score_moves, side_summaries
+from services.pgn_replay import mainline_sans, replay
+
+# The browser analyses full games with one PV (FULL_GAME_MULTI_PV)
+FULL_GAME_MULTI_PV = 1
+# Positions kept in the shared FEN -> result cache (the browser keeps one per tab)
+FEN_CACHE_SIZE = 200_000
+# A save that loses a deadlock to a concurrent save for the same user is retried
+SAVE_ATTEMPTS = 3
+DEADLOCK_DETECTED = "40P01"
+
+# Stockfish answers a position without legal moves with "bestmove (none)" and
+# no multipv line, which the browser turns into this result
+NO_MOVES_RESULT = {"evaluation": {"type": "cp", "value": 0}, "best_move": "(none)", "top_lines": []}
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedGame(ValueError):
+    """A game that cannot be analysed (unplayable PGN or no moves)."""
+
+
+def engine_limit(depth: Optional[int] = None, nodes: Optional[int] = None) -> chess.engine.Limit:
+    """Search limit for each position, defaulting to the configured depth and nodes."""
+    return chess.engine.Limit(depth=depth or settings.ANALYSIS_DEPTH, nodes=nodes or settings.ANALYSIS_NODES)
+
+
+def position_result(infos: list[chess.engine.InfoDict]) -> dict[str, Any]:
+    """{evaluation, best_move, top_lines} from an engine search, scores from White's side."""
+    top_lines = []
+    for info in infos:
+        score = info.get("score")
+        if score is None:
+            continue
+        white = score.white()
+        line = " ".join(move.uci() for move in info.get("pv", []))
+        if white.is_mate():
+            top_lines.append({"Mate": white.mate(), "Line": line})
+        else:
+            top_lines.append({"Centipawn": white.score(), "Line": line})
+    if not top_lines:
+        evaluation = {"type": "cp", "value": 0}
+    elif "Mate" in top_lines[0]:
+        evaluation = {"type": "mate", "value": top_lines[0]["Mate"]}
+    else:
+        evaluation = {"type": "cp", "value": top_lines[0]["Centipawn"]}
+    pv = infos[0].get("pv") if infos else None
+    return {"evaluation": evaluation, "best_move": pv[0].uci() if pv else "", "top_lines": top_lines}
+
+
+def analysed_game_document(
+    sans: list[str], ucis: list[str], fens: list[str], results: list[dict[str, Any]],
+) -> dict[str, Any]:
+    """The `analysed_game` document for a game, given the FEN and engine result
+    of its starting position and of the position after every move."""
+    moves = [
+        {
+            "move_number": i // 2 + 1,
+            "side": "white" if i % 2 == 0 else "black",
+            "san": san,
+            "uci": uci,
+            "fen_before": fens[i],
+            "fen_after": fens[i + 1],
+            "eval_before": results[i]["evaluation"],
+            "eval_after": results[i + 1]["evaluation"],
+            "best_move": results[i]["best_move"],
+            "top_lines": results[i]["top_lines"],
+        }
+        for i, (san, uci) in enumerate(zip(sans, ucis))
+    ]
+    columns = move_columns([moves])
+    scores = score_moves(columns)
+    for move, cp_loss, classification in zip(moves, scores.cp_loss.tolist(), classify(scores.wc_loss)):
+        move["cp_loss"] = int(cp_loss)
+        move["classification"] = classification
+    return {"moves": moves, "summary": side_summaries(columns, scores)[0]}
+
+
+def analysis_body(document: dict[str, Any]) -> AnalysedGame:
+    """The request body the browser would PATCH for an analysed game."""
+    summary = document["summary"]
+    return AnalysedGame(
+        analysed_game=document,
+        white_accuracy=summary["white_accuracy"],
+        black_accuracy=summary["black_accuracy"],
+        user_blunder_count=summary["white_blunders"] + summary["black_blunders"],
+    )
+
+
+class FenCache:
+    """Thread-safe LRU of engine results by FEN, shared by a pool's engines."""
+
+    def __init__(self, size: int = FEN_CACHE_SIZE):
+        self.size = size
+        self._results: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fen: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            result = self._results.get(fen)
+            if result is not None:
+                self._results.move_to_end(fen)
+            return result
+
+    def put(self, fen: str, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._results[fen] = result
+            if len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class EngineAnalyser:
+    """One UCI engine process analysing whole games, one position at a time."""
+
+    def __init__(
+        self,
+        engine_path: Optional[str] = None,
+        limit: Optional[chess.engine.Limit] = None,
+        cache: Optional[FenCache] = None,
+        hash_mb: Optional[int] = None,
+    ):
+        self.limit = limit or engine_limit()
+        self.cache = cache
+        # A command line, so a wrapper or `python -m scripts.fake_uci_engine` works too
+        self.engine = chess.engine.SimpleEngine.popen_uci(shlex.split(engine_path or settings.STOCKFISH_PATH))
+        options = {"Threads": 1, "Hash": hash_mb or settings.ANALYSIS_HASH_MB}
+        self.engine.configure({name: value for name, value in options.items() if name in self.engine.options})
+
+    def _search(self, board: chess.Board) -> tuple[dict[str, Any], Optional[int]]:
+        """(result, depth reached), with no depth for a position without moves."""
+        if not any(board.generate_legal_moves()):
+            return dict(NO_MOVES_RESULT), None
+        infos = self.engine.analyse(board.copy(stack=False), self.limit, multipv=FULL_GAME_MULTI_PV)
+        return position_result(infos), infos[0].get("depth", self.limit.depth) if infos else None
+
+    def analyse_position(self, board: chess.Board) -> dict[str, Any]:
+        """Search one position (without its move history, like the browser)."""
+        return self._search(board)[0]
+
+    def analyse_game(
+        self, pgn: str, evals: Optional[PositionEvalRepository] = None,
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Analyse a game's mainline. Returns the analysed_game document and
+        timings shaped like the browser's (milliseconds).
+
+        With `evals`, positions already in the shared cache deep enough are
+        not searched again, and the ones searched are added to it.
+        """
+        total_start = time.perf_counter()
+        sans, ucis, fens, keys = [], [], [], []
+        for board, move, _, key in replay(pgn, final=True):
+            fens.append(board.fen())
+            keys.append(key)
+            if move is not None:
+                sans.append(board.san(move))
+                ucis.append(move.uci())
+        if not sans:
+            raise UnsupportedGame("No moves in PGN")
+        if len(sans) != len(mainline_sans(pgn)):
+            raise UnsupportedGame(f"Unplayable move after {len(sans)} half-moves")
+        replay_s = time.perf_counter() - total_start
+
+        engine_start = time.perf_counter()
+        stored = evals.get_many(keys, self.limit.depth or 0, FULL_GAME_MULTI_PV) if evals is not None else {}
+        results, hits, eval_hits, searched = [], 0, 0, []
+        for fen, key in zip(fens, keys):
+            result = self.cache.get(fen) if self.cache else None
+            if result is not None:
+                hits += 1
+            else:
+                row = stored.get(key)
+                if row is not None:
+                    result = cached_result(row, FULL_GAME_MULTI_PV)
+                    eval_hits += 1
+                else:
+                    result, depth = self._search(chess.Board(fen))
+                    if depth is not None:
+                        searched.append(eval_row(key, depth, FULL_GAME_MULTI_PV, result))
+                if self.cache:
+                    self.cache.put(fen, result)
+            results.append(result)
+        if evals is not None:
+            evals.upsert(searched)
+        engine_s = time.perf_counter() - engine_start
+
+        post_start = time.perf_counter()
+        document = analysed_game_document(sans, ucis, fens, results)
+        post_s = time.perf_counter() - post_start
+        total_s = time.perf_counter() - total_start
+        timings = {
+            "totalMs": _ms(total_s),
+            "buildFenMs": _ms(replay_s),
+            "engineMs": _ms(engine_s),
+            "postProcessMs": _ms(post_s),
+            "moveCount": len(sans),
+            "positionCount": len(fens),
+            "msPerMove": _ms(total_s / len(sans)),
+            "msPerPosition": _ms(total_s / len(fens)),
+            "cacheHits": hits,
+            "serverCacheHits": eval_hits,
+            "cacheMisses": len(fens) - hits - eval_hits,
+        }
+        return document, timings
+
+    def close(self) -> None:
+        self.engine.quit()
+
+
+@dataclass
+class PoolStats:
+    """Totals over the games a pool analysed."""
+
+    workers: int = 0
+    games: int = 0
+    skipped: int = 0
+    failed: int = 0
+    positions: int = 0
+    cache_hits: int = 0
+    eval_cache_hits: int = 0
+    engine_ms: float = 0.0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def positions_per_second(self) -> float:
+        return self.positions / self.seconds if self.seconds else 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cache_hits / self.positions if self.positions else 0.0
+
+    @property
+    def eval_cache_hit_rate(self) -> float:
+        return self.eval_cache_hits / self.positions if self.positions else 0.0
+
+
+def save_analysis(
+    session, game_id: UUID, document: dict[str, Any], before_save: Optional[Callable[[], bool]] = None,
+) -> bool:
+    """Save an analysed_game document like a PATCH from the browser, retrying
+    if the save loses a deadlock to a concurrent one.
+
+    `before_save` runs first in the same transaction; if it returns False
+    nothing is saved and False is returned.
+    """
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        try:
+            if before_save is not None and not before_save():
+                session.rollback()
+                return False
+            game = UserGameRepository(session).get_by_game_id(game_id)
+            save_game_analysis(
+                game, analysis_body(document), UserGameRepository(session), GameMoveRepository(session),
+                MistakeIndexRepository(session), ExplorerRepository(session), GamePositionRepository(session),
+            )
+            return True
+        except OperationalError as exc:
+            session.rollback()
+            if getattr(exc.orig, "pgcode", None) != DEADLOCK_DETECTED or attempt == SAVE_ATTEMPTS:
+                raise
+
+
+def analyse_games(
+    game_ids: Iterable[UUID],
+    *,
+    workers: Optional[int] = None,
+    engine_path: Optional[str] = None,
+    limit: Optional[chess.engine.Limit] = None,
+    force: bool = False,
+    on_game: Optional[Callable[[UUID, dict[str, Any]], None]] = None,
+) -> PoolStats:
+    """Analyse and save games on a pool of engine processes.
+
+    Games already analysed are skipped unless `force` is set. `on_game` is
+    called with each saved game's id and timings, from the worker threads.
+    """
+    pending: queue.Queue[UUID] = queue.Queue()
+    for game_id in game_ids:
+        pending.put(game_id)
+    count = min(workers or settings.ANALYSIS_WORKERS or os.cpu_count() or 1, pending.qsize())
+    stats = PoolStats(workers=count)
+    if not count:
+        return stats
+    cache = FenCache()
+    lock = threading.Lock()
+    limit = limit or engine_limit()
+    # Started up front so a missing or broken engine fails the call, not a thread
+    analysers: list[EngineAnalyser] = []
+    try:
+        for _ in range(count):
+            analysers.append(EngineAnalyser(engine_path, limit, cache))
+    except Exception:
+        for analyser in analysers:
+            analyser.close()
+        raise
+    start = time.perf_counter()
+
+    def work(analyser: EngineAnalyser) -> None:
+        session = SessionLocal()
+        try:
+            while True:
+                try:
+                    game_id = pending.get_nowait()
+                except queue.Empty:
+                    return
+                game = UserGameRepository(session).get_by_game_id(game_id)
+                if game is None or (game.is_analysed and not force):
+                    with lock:
+                        stats.skipped += 1
+                    continue
+                try:
+                    document, timings = analyser.analyse_game(game.pgn, PositionEvalRepository(session))
+                    save_analysis(session, game_id, document)
+                except UnsupportedGame as exc:
+                    logger.warning("Skipped game %s: %s", game_id, exc)
+                    with lock:
+                        stats.skipped += 1
+                    continue
+                except Exception as exc:
+                    logger.exception("Analysis of game %s failed", game_id)
+                    session.rollback()
+                    with lock:
+                        stats.failed += 1
+                        stats.errors.append(f"{game_id}: {exc}")
+                    continue
+                logger.info(
+                    "Analysed game %s: %d moves in %.0fms (engine %.0fms, %d positions cached, %d shared)",
+                    game_id, timings["moveCount"], timings["totalMs"], timings["engineMs"], timings["cacheHits"],
+                    timings["serverCacheHits"],
+                )
+                with lock:
+                    stats.games += 1
+                    stats.positions += timings["positionCount"]
+                    stats.cache_hits += timings["cacheHits"]
+                    stats.eval_cache_hits += timings["serverCacheHits"]
+                    stats.engine_ms += timings["engineMs"]
+                if on_game:
+                    on_game(game_id, timings)
+        finally:
+            session.close()
+            analyser.close()
+
+    threads = [
+        threading.Thread(target=work, args=(analyser,), name=f"engine-analysis-{i}")
+        for i, analyser in enumerate(analysers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,50 @@
+"""Engine evaluations shared across games and users (position_evals).
+
+Openings repeat across nearly every game, so the first plies of a new game
+have usually been searched before, by anyone. Server-side analysis looks
+positions up here before searching them and stores what it searched; the
+browser asks POST /evals/lookup before running its own engine. A cached eval
+is only used if it was searched at least as deep, with at least as many
+lines, as the caller wants. Results sent by browsers are not stored, so one
+user cannot feed bad evals into everyone's analyses.
+"""
+from typing import Any, Iterable, Optional
+
+from db.models import PositionEval
+from db.repositories import PositionEvalRepository
+from services.position_keys import position_key
+
+# Most FENs one lookup request may ask for (a long game has a few hundred)
+LOOKUP_MAX_FENS = 1000
+
+
+def eval_row(key: int, depth: int, multipv: int, result: dict[str, Any]) -> dict[str, Any]:
+    """A position_evals row from an engine result ({evaluation, best_move, top_lines})."""
+    return dict(
+        position_key=key,
+        depth=depth,
+        multipv=multipv,
+        eval_type=result["evaluation"]["type"],
+        eval_value=result["evaluation"]["value"],
+        best_move=result["best_move"],
+        top_lines=result["top_lines"],
+    )
+
+
+def cached_result(row: PositionEval, multipv: int = 1) -> dict[str, Any]:
+    """The engine result a position_evals row stands for, with `multipv` lines."""
+    return {
+        "evaluation": {"type": row.eval_type, "value": row.eval_value},
+        "best_move": row.best_move,
+        "top_lines": row.top_lines[:multipv],
+    }
+
+
+def lookup_fens(
+    eval_repo: PositionEvalRepository, fens: Iterable[str], depth: int, multipv: int = 1,
+) -> list[Optional[PositionEval]]:
+    """The cached eval of each FEN searched at least `depth` deep, or None
+    (also for an invalid FEN), in one query."""
+    keys = [position_key(fen) for fen in fens]
+    rows = eval_repo.get_many((key for key in keys if key is not None), depth, multipv)
+    return [rows.get(key) if key is not None else None for key in keys]
@@ -0,0 +1,233 @@
+"""Persist a game's engine analysis: the document (compact when possible), one typed row per move, and the mistake index."""
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from db.models import GameMove, UserGame
+from db.repositories import (
+    ExplorerRepository, GameMoveRepository, GamePositionRepository, MistakeIndexRepository, UserGameRepository,
+)
+from schema import AnalysedGame
+from services.analysis_codec import stored_analysis
+from services.move_scoring import (
+    ENDGAME_LAST_HALF_MOVES, ENDGAME_WC_THRESHOLD, OPENING_MAX_MOVE, OPENING_WC_THRESHOLD,
+    classify, move_columns, score_moves,
+)
+from services.opening_explorer import analysis_deltas, player_color
+from services.position_index import index_rows, replay_game, stage_index_game
+from services.position_keys import position_key
+
+
+def user_side(game: UserGame) -> Optional[str]:
+    """Which colour the game's Chess.com user played, if either."""
+    return player_color(game.white_username, game.black_username, game.chess_com_username)
+
+
+def _split_eval(evaluation: Optional[dict]) -> tuple[Optional[str], Optional[int]]:
+    if not evaluation:
+        return None, None
+    value = evaluation.get("value")
+    return evaluation.get("type"), int(round(value)) if value is not None else None
+
+
+def move_rows(game: UserGame, analysis: dict[str, Any]) -> list[dict[str, Any]]:
+    """Flatten `analysis["moves"]` into game_moves rows for `game`."""
+    return games_move_rows([(game, analysis)])[0]
+
+
+def games_move_rows(analysed: list[tuple[UserGame, dict[str, Any]]]) -> list[list[dict[str, Any]]]:
+    """game_moves rows for several (game, analysis) pairs, scored in one vectorised pass.
+
+    Moves the analysis left unclassified get the classification their
+    winning-chances loss implies.
+    """
+    games_moves = [analysis.get("moves") or [] for _, analysis in analysed]
+    columns = move_columns(games_moves)
+    losses = score_moves(columns).wc_loss
+    labels = classify(losses)
+    losses = [None if math.isnan(loss) else loss for loss in losses.tolist()]
+
+    result, offset = [], 0
+    for (game, _), moves in zip(analysed, games_moves):
+        side_of_user = user_side(game)
+        rows = []
+        for i, move in enumerate(moves):
+            side = move.get("side") or ("white" if i % 2 == 0 else "black")
+            eval_before_type, eval_before_value = _split_eval(move.get("eval_before"))
+            eval_after_type, eval_after_value = _split_eval(move.get("eval_after"))
+            top_line = ((move.get("top_lines") or [None])[0] or {}).get("Line") or None
+            cp_loss = move.get("cp_loss")
+            classification = move.get("classification")
+            rows.append(dict(
+                game_id=game.game_id,
+                half_move_index=i,
+                user_id=game.user_id,
+                move_number=move.get("move_number") or i // 2 + 1,
+                side=side,
+                is_user_move=side == side_of_user,
+                san=move.get("san"),
+                uci=move.get("uci"),
+                fen_before=move.get("fen_before"),
+                position_key=position_key(move.get("fen_before")),
+                eval_before_type=eval_before_type,
+                eval_before_value=eval_before_value,
+                eval_after_type=eval_after_type,
+                eval_after_value=eval_after_value,
+                best_move=move.get("best_move"),
+                pv=top_line,
+                cp_loss=float(cp_loss) if cp_loss is not None else None,
+                wc_loss=losses[offset + i],
+                plies_from_end=len(moves) - i,
+                classification=classification.lower() if classification else labels[offset + i],
+            ))
+        result.append(rows)
+        offset += len(moves)
+    return result
+
+
+def mistake_entries(game: UserGame, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """The mistake-index contributions of a game's move rows (see MistakeIndex)."""
+    end_day = game.end_time // 86400 if game.end_time is not None else None
+    entries = []
+    for row in rows:
+        loss = row["wc_loss"]
+        if not row["is_user_move"] or loss is None or row["position_key"] is None:
+            continue
+        phases = []
+        if row["move_number"] <= OPENING_MAX_MOVE and loss >= OPENING_WC_THRESHOLD:
+            phases.append("opening")
+        if row["plies_from_end"] <= ENDGAME_LAST_HALF_MOVES and loss >= ENDGAME_WC_THRESHOLD:
+            phases.append("endgame")
+        for phase in phases:
+            entries.append(dict(
+                phase=phase,
+                position_key=row["position_key"],
+                fen=row["fen_before"],
+                played_move=row["san"] or "",
+                time_class=game.time_class,
+                end_day=end_day,
+                wc_loss=round(loss, 3),
+                ref=[game.end_time, str(game.game_id), row["half_move_index"], row["best_move"]],
+            ))
+    return entries
+
+
+def _stored_rows(moves: list[GameMove]) -> list[dict[str, Any]]:
+    columns = ("half_move_index", "move_number", "is_user_move", "san", "uci", "fen_before", "position_key",
+               "eval_after_type", "eval_after_value", "best_move", "wc_loss", "plies_from_end")
+    return [{column: getattr(move, column) for column in columns} for move in moves]
+
+
+def _stage_contributions(
+    analysed: list[tuple[UserGame, list[dict[str, Any]], list[dict[str, Any]]]],
+    mistake_index_repo: MistakeIndexRepository,
+    explorer_repo: ExplorerRepository,
+) -> None:
+    """Swap the mistake-index and opening-tree contributions of one user's
+    games, given (game, previous move rows, new move rows) for each."""
+    if not analysed:
+        return
+    user_id = analysed[0][0].user_id
+    previous_entries, current_entries, deltas = [], [], []
+    for game, previous, rows in analysed:
+        previous_entries.extend(mistake_entries(game, previous))
+        current_entries.extend(mistake_entries(game, rows))
+        color = user_side(game)
+        if color is not None:
+            deltas.extend(analysis_deltas(color, previous, -1) + analysis_deltas(color, rows))
+    mistake_index_repo.stage_replace(user_id, [game.game_id for game, _, _ in analysed], previous_entries, current_entries)
+    explorer_repo.stage_add(user_id, deltas)
+
+
+def save_game_analysis(
+    game: UserGame,
+    body: AnalysedGame,
+    user_game_repo: UserGameRepository,
+    game_move_repo: GameMoveRepository,
+    mistake_index_repo: MistakeIndexRepository,
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+) -> UserGame:
+    """Store an analysis on `game`, replacing its game_moves rows and its
+    mistake-index and opening-tree contributions, in one transaction. A game
+    stored before the position index existed is indexed too."""
+    rows = move_rows(game, body.analysed_game)
+    previous = _stored_rows(game_move_repo.get_by_game_id(game.game_id))
+    _stage_contributions([(game, previous, rows)], mistake_index_repo, explorer_repo)
+    stage_index_game(position_repo, game)
+    return user_game_repo.save_analysis(
+        game,
+        rows,
+        **stored_analysis(game.pgn, body.analysed_game),
+        white_accuracy=body.white_accuracy,
+        black_accuracy=body.black_accuracy,
+        user_blunder_count=body.user_blunder_count,
+        is_analysed=True,
+        analysed_at=datetime.utcnow(),
+    )
+
+
+def save_games_analysis(
+    user_id: UUID,
+    bodies: dict[UUID, AnalysedGame],
+    user_game_repo: UserGameRepository,
+    game_move_repo: GameMoveRepository,
+    mistake_index_repo: MistakeIndexRepository,
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+) -> dict[UUID, str]:
+    """save_game_analysis for many of a user's games in one transaction.
+
+    Games are loaded and checked with one query, their previous move rows
+    read with another, and the analyses written with one bulk update. Returns
+    each game's status: "saved", "not_found" or "forbidden" (not the user's).
+    """
+    statuses: dict[UUID, str] = {}
+    games = []
+    for game in user_game_repo.get_by_game_ids(bodies):
+        if game.user_id == user_id:
+            games.append(game)
+            statuses[game.game_id] = "saved"
+        else:
+            statuses[game.game_id] = "forbidden"
+    for game_id in bodies:
+        statuses.setdefault(game_id, "not_found")
+    if not games:
+        return statuses
+
+    all_rows = games_move_rows([(game, bodies[game.game_id].analysed_game) for game in games])
+    stored = defaultdict(list)
+    for move in game_move_repo.get_by_game_ids(game.game_id for game in games):
+        stored[move.game_id].append(move)
+    _stage_contributions(
+        [(game, _stored_rows(stored[game.game_id]), rows) for game, rows in zip(games, all_rows)],
+        mistake_index_repo, explorer_repo,
+    )
+    indexed = position_repo.indexed_game_ids(game.game_id for game in games)
+    positions, materials = [], []
+    for game in games:
+        if game.game_id not in indexed:
+            game_positions, game_materials = index_rows(game.user_id, game.game_id, replay_game(game.pgn))
+            positions.extend(game_positions)
+            materials.extend(game_materials)
+    position_repo.stage_add(positions, materials)
+
+    analysed_at = datetime.utcnow()
+    user_game_repo.save_analyses(
+        [
+            dict(
+                game_id=game.game_id,
+                **stored_analysis(game.pgn, bodies[game.game_id].analysed_game),
+                white_accuracy=bodies[game.game_id].white_accuracy,
+                black_accuracy=bodies[game.game_id].black_accuracy,
+                user_blunder_count=bodies[game.game_id].user_blunder_count,
+                is_analysed=True,
+                analysed_at=analysed_at,
+            )
+            for game in games
+        ],
+        [row for rows in all_rows for row in rows],
+    )
+    return statuses
@@ -0,0 +1,112 @@
+"""Streaming Chess.com import: fetch month archives and store their games as they arrive."""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+from uuid import UUID
+
+from db.repositories import ExplorerRepository, GamePositionRepository, ImportWatermarkRepository, UserGameRepository
+from schema import GameType, Timeframe
+from services.archive_cache import ArchiveCache
+from services.chess_com import (
+    BASE_URL,
+    advance_coverage,
+    allowed_time_classes,
+    archive_months_to_fetch,
+    iter_chess_com_months,
+)
+from services.position_index import index_imported_games
+
+# Rows inserted (and committed) per statement batch; a month with more games
+# is written in several batches so no single transaction grows unbounded.
+IMPORT_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportResult:
+    months_total: int
+    months_done: int = 0
+    fetched: int = 0
+    added: int = 0
+    failed_months: List[tuple[int, int]] = field(default_factory=list)
+
+
+async def import_chess_com_games(
+    *,
+    user_id: UUID,
+    username: str,
+    timeframe: Timeframe,
+    game_types: List[GameType] | None,
+    user_game_repo: UserGameRepository,
+    watermark_repo: ImportWatermarkRepository,
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+    cache: ArchiveCache | None = None,
+    base_url: str = BASE_URL,
+    on_progress: Optional[Callable[[ImportResult], None]] = None,
+) -> ImportResult:
+    """
+    Import a user's Chess.com games month by month.
+
+    Only months not yet imported for every requested time class are fetched
+    (see ImportWatermark). Each month's games are written and committed as soon
+    as the archive arrives, so memory stays bounded by a few months and a
+    failure part-way keeps everything stored before it. The watermark only
+    advances once every requested month has been fetched.
+    """
+    time_classes = allowed_time_classes(game_types)
+    watermarks = watermark_repo.get_for_time_classes(user_id, username, time_classes)
+    coverage = (
+        [(w.covered_from_month, w.covered_through_month) for w in watermarks.values()]
+        if len(watermarks) == len(time_classes)
+        else None
+    )
+    months = archive_months_to_fetch(timeframe, coverage)
+    result = ImportResult(months_total=len(months))
+    if on_progress:
+        on_progress(result)
+
+    async for archive in iter_chess_com_months(
+        username, months, game_types=game_types, base_url=base_url, cache=cache,
+    ):
+        if archive.rows is None:
+            result.failed_months.append((archive.year, archive.month))
+        else:
+            result.fetched += len(archive.rows)
+            result.added += _store_month(user_game_repo, explorer_repo, position_repo, user_id, archive.rows)
+        result.months_done += 1
+        if on_progress:
+            on_progress(result)
+
+    if not result.failed_months:
+        ranges = {}
+        for time_class in time_classes:
+            w = watermarks.get(time_class)
+            previous = (w.covered_from_month, w.covered_through_month) if w else None
+            ranges[time_class] = advance_coverage(timeframe, previous)
+        watermark_repo.upsert_many(user_id, username, ranges)
+
+    return result
+
+
+def _store_month(
+    user_game_repo: UserGameRepository,
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+    user_id: UUID,
+    rows: List[dict[str, Any]],
+) -> int:
+    """Insert one month's games in committed batches and add the new ones to
+    the position index and opening tree. Returns the number added.
+
+    Games already stored for the user are skipped by the database's unique
+    index on (user_id, chess_com_game_uuid), so nothing is preloaded here.
+    """
+    added = 0
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = [dict(row, user_id=user_id) for row in rows[start:start + IMPORT_BATCH_SIZE]]
+        inserted = user_game_repo.copy_games(batch)
+        index_imported_games(explorer_repo, position_repo, user_id, batch, inserted)
+        added += len(inserted)
+    return added
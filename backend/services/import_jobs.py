@@ -0,0 +1,98 @@
+"""Run Chess.com imports as background jobs on a pool of worker threads."""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from core.config import settings
+from db.repositories import (
+    ExplorerRepository, GamePositionRepository, ImportJobRepository, ImportWatermarkRepository, UserGameRepository,
+)
+from db.sessions import SessionLocal
+from schema import GameType, Timeframe
+from services.archive_cache import ArchiveCache
+from services.chess_com import allowed_time_classes
+from services.game_import import ImportResult, import_chess_com_games
+
+IMPORT_WORKERS = 4
+# A running job that has not reported progress for this long is assumed to
+# belong to a dead process and is picked up again on startup.
+STALE_JOB_AFTER = timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="chess-com-import")
+# Month archives persisted across jobs and restarts
+archive_cache = ArchiveCache(settings.CHESS_COM_CACHE_DIR)
+
+
+def game_types_key(game_types: list[GameType] | None) -> str:
+    """Canonical form of the requested game types, used to merge duplicate jobs."""
+    return ",".join(sorted(allowed_time_classes(game_types)))
+
+
+def submit_import_job(job_id: UUID) -> None:
+    """Hand a queued job to the worker pool."""
+    _executor.submit(_run_import_job, job_id)
+
+
+def resume_import_jobs() -> None:
+    """Resubmit queued jobs, and running ones abandoned by a dead process."""
+    session = SessionLocal()
+    try:
+        job_ids = ImportJobRepository(session).requeue_stale(datetime.utcnow() - STALE_JOB_AFTER)
+    finally:
+        session.close()
+    for job_id in job_ids:
+        submit_import_job(job_id)
+    if job_ids:
+        logger.info("Resumed %d Chess.com import job(s)", len(job_ids))
+
+
+def _run_import_job(job_id: UUID) -> None:
+    session = SessionLocal()
+    job_repo = ImportJobRepository(session)
+    try:
+        if not job_repo.claim(job_id):
+            return
+        job = job_repo.get_by_id(job_id)
+
+        def on_progress(result: ImportResult) -> None:
+            job_repo.update(
+                job_id,
+                months_total=result.months_total,
+                months_done=result.months_done,
+                games_fetched=result.fetched,
+                games_added=result.added,
+            )
+
+        result = asyncio.run(import_chess_com_games(
+            user_id=job.user_id,
+            username=job.chess_com_username,
+            timeframe=Timeframe(job.timeframe),
+            game_types=[GameType(gt) for gt in job.game_types.split(",")],
+            user_game_repo=UserGameRepository(session),
+            watermark_repo=ImportWatermarkRepository(session),
+            explorer_repo=ExplorerRepository(session),
+            position_repo=GamePositionRepository(session),
+            cache=archive_cache,
+            on_progress=on_progress,
+        ))
+        job_repo.update(
+            job_id,
+            status="completed",
+            months_total=result.months_total,
+            months_done=result.months_done,
+            games_fetched=result.fetched,
+            games_added=result.added,
+            errors=[f"Could not fetch {year}-{month:02d}" for year, month in result.failed_months],
+            finished_at=datetime.utcnow(),
+        )
+        logger.info("Chess.com archive cache after job %s: %s", job_id, dict(archive_cache.stats))
+    except Exception as exc:
+        logger.exception("Chess.com import job %s failed", job_id)
+        session.rollback()
+        job_repo.update(job_id, status="failed", errors=[str(exc)], finished_at=datetime.utcnow())
+    finally:
+        session.close()
@@ -0,0 +1,176 @@
+"""Vectorised move scoring: winning chances, losses, classifications and accuracy for many moves at once.
+
+Moves from any number of analysed games are laid out as NumPy columns (one
+entry per half-move, `game` saying which game it came from), so scoring a
+user's whole history costs a handful of array operations instead of a Python
+loop with a `math.exp` per move. The formulas are the frontend's
+(frontend/src/engine/analyzeFullGame.js), which follow Lichess.
+"""
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import numpy as np
+
+# Lichess winning-chances sigmoid slope
+WC_SLOPE = 0.00368208
+# Centipawn stand-in for a forced mate, as in the frontend's cp_loss
+MATE_CP = 10000
+
+# Classification thresholds on winning-chances loss (Lichess Advice.scala)
+BLUNDER_WC_LOSS = 0.3
+MISTAKE_WC_LOSS = 0.2
+INACCURACY_WC_LOSS = 0.1
+
+# What counts as a common-mistake occurrence: a user move losing at least this
+# share of winning chances, within the opening or near the end of the game.
+OPENING_WC_THRESHOLD = 0.2
+ENDGAME_WC_THRESHOLD = 0.2
+OPENING_MAX_MOVE = 12
+ENDGAME_LAST_HALF_MOVES = 40  # 20 full moves
+
+
+@dataclass
+class MoveColumns:
+    """Analysed moves as parallel arrays. Missing evals are NaN values."""
+
+    game: np.ndarray  # int32, index of the move's game in the input
+    white: np.ndarray  # bool, move played by White
+    move_number: np.ndarray  # int32
+    plies_from_end: np.ndarray  # int32, 1 for the last move of a game
+    before_is_mate: np.ndarray  # bool
+    before_value: np.ndarray  # float64, cp or moves to mate
+    after_is_mate: np.ndarray
+    after_value: np.ndarray
+    games: int = 0
+
+    def __len__(self) -> int:
+        return len(self.game)
+
+
+@dataclass
+class MoveScores:
+    """Per-move scores from the moving side's point of view. NaN where an eval is missing."""
+
+    wc_before: np.ndarray
+    wc_after: np.ndarray
+    wc_loss: np.ndarray
+    cp_loss: np.ndarray
+    opening_mistake: np.ndarray  # bool
+    endgame_mistake: np.ndarray  # bool
+
+
+NO_EVAL: dict[str, Any] = {}
+
+
+def move_columns(games_moves: Iterable[list[dict[str, Any]]]) -> MoveColumns:
+    """Columns for the `analysed_game["moves"]` lists of several games."""
+    games_moves = list(games_moves)
+    lengths = np.fromiter((len(moves) for moves in games_moves), dtype=np.int32, count=len(games_moves))
+    flat = [move for moves in games_moves for move in moves]
+    game = np.repeat(np.arange(len(games_moves), dtype=np.int32), lengths)
+    ply = np.arange(len(flat), dtype=np.int32) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    side = np.array([move.get("side") or "" for move in flat], dtype="U5")
+    move_number = np.array([move.get("move_number") or 0 for move in flat], dtype=np.int32)
+    before = [move.get("eval_before") or NO_EVAL for move in flat]
+    after = [move.get("eval_after") or NO_EVAL for move in flat]
+    return MoveColumns(
+        game=game,
+        white=np.where(side == "", ply % 2 == 0, side == "white"),
+        move_number=np.where(move_number == 0, ply // 2 + 1, move_number),
+        plies_from_end=lengths[game] - ply,
+        # A missing eval (or value) becomes NaN
+        before_is_mate=np.array([e.get("type") == "mate" for e in before], dtype=bool),
+        before_value=np.array([e.get("value") for e in before], dtype=np.float64),
+        after_is_mate=np.array([e.get("type") == "mate" for e in after], dtype=bool),
+        after_value=np.array([e.get("value") for e in after], dtype=np.float64),
+        games=len(games_moves),
+    )
+
+
+def cp_to_wc(cp: np.ndarray) -> np.ndarray:
+    """Centipawns (White's view) to winning chances in [-1, 1]."""
+    return 2.0 / (1.0 + np.exp(-WC_SLOPE * cp)) - 1.0
+
+
+def winning_chances(is_mate: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """Winning chances of evals; a forced mate counts as a certain result."""
+    mate = np.where(value > 0, 1.0, -1.0)
+    return np.where(is_mate, mate, cp_to_wc(np.where(is_mate, 0.0, value)))
+
+
+def _as_cp(is_mate: np.ndarray, value: np.ndarray) -> np.ndarray:
+    return np.where(is_mate, np.where(value > 0, MATE_CP, -MATE_CP), value)
+
+
+def score_moves(columns: MoveColumns) -> MoveScores:
+    """Winning chances and losses of every move, plus the common-mistake masks."""
+    sign = np.where(columns.white, 1.0, -1.0)
+    wc_before = winning_chances(columns.before_is_mate, columns.before_value)
+    wc_after = winning_chances(columns.after_is_mate, columns.after_value)
+    wc_loss = np.maximum(0.0, sign * (wc_before - wc_after))
+    cp_loss = np.maximum(
+        0.0,
+        sign * (_as_cp(columns.before_is_mate, columns.before_value) - _as_cp(columns.after_is_mate, columns.after_value)),
+    )
+    with np.errstate(invalid="ignore"):  # NaN losses compare False
+        opening = (columns.move_number <= OPENING_MAX_MOVE) & (wc_loss >= OPENING_WC_THRESHOLD)
+        endgame = (columns.plies_from_end <= ENDGAME_LAST_HALF_MOVES) & (wc_loss >= ENDGAME_WC_THRESHOLD)
+    return MoveScores(wc_before, wc_after, wc_loss, cp_loss, opening, endgame)
+
+
+# Classification codes index into LABELS; -1 (no loss) picks the trailing None
+LABELS = np.array(["best", "good", "inaccuracy", "mistake", "blunder", None], dtype=object)
+BEST, GOOD, INACCURACY, MISTAKE, BLUNDER = range(5)
+
+
+def classification_codes(wc_loss: np.ndarray) -> np.ndarray:
+    """Classification codes (see LABELS) for winning-chances losses."""
+    return np.select(
+        [wc_loss >= BLUNDER_WC_LOSS, wc_loss >= MISTAKE_WC_LOSS, wc_loss >= INACCURACY_WC_LOSS, wc_loss <= 0,
+         np.isnan(wc_loss)],
+        [BLUNDER, MISTAKE, INACCURACY, BEST, -1],
+        GOOD,
+    ).astype(np.int8)
+
+
+def classify(wc_loss: np.ndarray) -> np.ndarray:
+    """Move classifications for winning-chances losses (None where the loss is NaN)."""
+    return LABELS[classification_codes(wc_loss)]
+
+
+def move_accuracy(cp_loss: np.ndarray) -> np.ndarray:
+    """Per-move accuracy percentage from centipawn loss."""
+    return np.maximum(0.0, 103.1668 * np.exp(-0.04354 * np.abs(cp_loss)) - 3.1668)
+
+
+def side_summaries(columns: MoveColumns, scores: MoveScores) -> list[dict[str, Any]]:
+    """Per-game accuracy and mistake counts for both sides, shaped like the
+    frontend's `analysed_game["summary"]`. Moves without evals are skipped."""
+    scored = ~np.isnan(scores.wc_loss)
+    # One bucket per (game, side): 2 * game for White, 2 * game + 1 for Black
+    bucket = (2 * columns.game + ~columns.white)[scored]
+    size = 2 * columns.games
+    moves = np.bincount(bucket, minlength=size)
+    accuracy_sum = np.bincount(bucket, weights=move_accuracy(scores.cp_loss[scored]), minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Rounded half up to one decimal, like the frontend's Math.round
+        accuracy = np.where(moves > 0, np.floor(accuracy_sum / moves * 10 + 0.5) / 10, 0.0)
+    # Moves per (bucket, classification code)
+    counts = np.bincount(
+        bucket * len(LABELS) + classification_codes(scores.wc_loss[scored]), minlength=size * len(LABELS),
+    ).reshape(size, len(LABELS))
+    blunders, mistakes, inaccuracies = counts[:, BLUNDER], counts[:, MISTAKE], counts[:, INACCURACY]
+    return [
+        {
+            "white_accuracy": float(accuracy[2 * g]),
+            "black_accuracy": float(accuracy[2 * g + 1]),
+            "white_blunders": int(blunders[2 * g]),
+            "black_blunders": int(blunders[2 * g + 1]),
+            "white_mistakes": int(mistakes[2 * g]),
+            "black_mistakes": int(mistakes[2 * g + 1]),
+            "white_inaccuracies": int(inaccuracies[2 * g]),
+            "black_inaccuracies": int(inaccuracies[2 * g + 1]),
+        }
+        for g in range(columns.games)
+    ]
@@ -0,0 +1,143 @@
+"""Per-user opening trees: how the user scores after each move from each position.
+
+Imported games add their results (from the replay that also indexes their
+positions, see services.position_index; first EXPLORER_MAX_PLIES half-moves
+only); saving an analysis adds the engine eval
+after each move and the winning chances it lost, replacing what an earlier
+analysis of the game added. Everything is kept as running sums in
+explorer_moves, so reading a position is a single indexed lookup. Games
+replay cannot play through their opening (a variant it does not play, an
+illegal move) add no results rather than those of the moves before it.
+"""
+import logging
+from itertools import islice
+from typing import Any, Iterable, Optional
+from uuid import UUID
+
+from db.repositories import ExplorerRepository, GameMoveRepository, UserGameRepository
+from services.pgn_replay import replay
+
+EXPLORER_MAX_PLIES = 24  # 12 moves each
+# Evals are averaged in centipawns from the user's side, capped so one mate
+# or crushing line does not swamp the average
+EVAL_CLAMP_CP = 1000
+REBUILD_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def player_color(white_username: Optional[str], black_username: Optional[str], username: Optional[str]) -> Optional[str]:
+    """Which colour `username` played, if either."""
+    username = (username or "").lower()
+    if (white_username or "").lower() == username:
+        return "white"
+    if (black_username or "").lower() == username:
+        return "black"
+    return None
+
+
+def user_outcome(color: str, white_result: Optional[str], black_result: Optional[str]) -> Optional[str]:
+    """"win", "draw" or "loss" for the side `color` from Chess.com result codes."""
+    own, other = (white_result, black_result) if color == "white" else (black_result, white_result)
+    if own == "win":
+        return "win"
+    if other == "win":
+        return "loss"
+    return "draw" if own else None
+
+
+def opening_plies(pgn: Optional[str]) -> list[tuple[int, str, str]]:
+    """(position key, uci, san) of a PGN's opening moves, or none if one of
+    them cannot be played."""
+    try:
+        return [(key, move.uci(), san) for _, move, san, key in replay(pgn, EXPLORER_MAX_PLIES, strict=True)]
+    except ValueError as exc:
+        logger.warning("Not adding a game to the opening explorer: %s", exc)
+        return []
+
+
+def game_deltas(plies: Iterable[tuple[int, str, str]], color: str, outcome: Optional[str]) -> list[dict[str, Any]]:
+    """Result counters for each opening move of a game, given its (position
+    key, uci, san) plies (once per move, even if repeated)."""
+    deltas, seen = [], set()
+    for position_key, uci, san in islice(plies, EXPLORER_MAX_PLIES):
+        key = (position_key, uci)
+        if key in seen:
+            continue
+        seen.add(key)
+        deltas.append(dict(
+            position_key=key[0],
+            color=color,
+            uci=key[1],
+            san=san,
+            games=1,
+            wins=int(outcome == "win"),
+            draws=int(outcome == "draw"),
+            losses=int(outcome == "loss"),
+        ))
+    return deltas
+
+
+def _user_cp(eval_type: Optional[str], eval_value: Optional[int], color: str) -> Optional[float]:
+    if eval_type is None or eval_value is None:
+        return None
+    if eval_type == "mate":
+        cp = EVAL_CLAMP_CP if eval_value > 0 else -EVAL_CLAMP_CP
+    else:
+        cp = max(-EVAL_CLAMP_CP, min(EVAL_CLAMP_CP, eval_value))
+    return cp if color == "white" else -cp
+
+
+def analysis_deltas(color: str, rows: Iterable[dict[str, Any]], sign: int = 1) -> list[dict[str, Any]]:
+    """Eval and winning-chances counters from game_moves rows; sign=-1 retracts them."""
+    deltas = []
+    for row in rows:
+        if row["half_move_index"] >= EXPLORER_MAX_PLIES or row["position_key"] is None or not row["uci"]:
+            continue
+        delta = dict(position_key=row["position_key"], color=color, uci=row["uci"], san=row["san"] or row["uci"])
+        cp = _user_cp(row["eval_after_type"], row["eval_after_value"], color)
+        if cp is not None:
+            delta.update(eval_sum=sign * cp, eval_count=sign)
+        if row["wc_loss"] is not None:
+            delta.update(wc_loss_sum=sign * row["wc_loss"], wc_loss_count=sign)
+        deltas.append(delta)
+    return deltas
+
+
+def rebuild_explorer(
+    user_id: UUID,
+    user_game_repo: UserGameRepository,
+    game_move_repo: GameMoveRepository,
+    explorer_repo: ExplorerRepository,
+) -> int:
+    """Recompute a user's tree from their stored games and analyses in one
+    transaction. Returns the number of games replayed."""
+    explorer_repo.delete_by_user_id(user_id)
+    games = 0
+    batch: list[Any] = []
+
+    def flush() -> None:
+        colors = {}
+        deltas = []
+        for game in batch:
+            color = player_color(game.white_username, game.black_username, game.chess_com_username)
+            if color is None:
+                continue
+            colors[game.game_id] = color
+            deltas.extend(game_deltas(opening_plies(game.pgn), color, user_outcome(color, game.white_result, game.black_result)))
+        columns = ("half_move_index", "position_key", "uci", "san", "eval_after_type", "eval_after_value", "wc_loss")
+        for move in game_move_repo.get_opening_moves(colors, EXPLORER_MAX_PLIES):
+            row = {column: getattr(move, column) for column in columns}
+            deltas.extend(analysis_deltas(colors[move.game_id], [row]))
+        explorer_repo.stage_add(user_id, deltas)
+        batch.clear()
+
+    for game in user_game_repo.iter_pgns(user_id, REBUILD_BATCH_SIZE):
+        games += 1
+        batch.append(game)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    explorer_repo.session.commit()
+    return games
@@ -0,0 +1,38 @@
+"""Opaque cursors for keyset-paginated lists (GET /games, GET /puzzles).
+
+A cursor is the sort key of the last item on a page, JSON-encoded and
+base64url'd, so a client can only hand it back; the next page is whatever
+sorts after that key, read straight from an index at any depth.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Callable, Optional, Sequence
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor for this list."""
+
+
+def encode_cursor(*key: Any) -> str:
+    data = json.dumps([str(v) if v is not None and not isinstance(v, int) else v for v in key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[Any], Any]]) -> tuple:
+    """The sort key in a cursor, each part converted with `types` (None stays None)."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise InvalidCursor(cursor)
+        return tuple(None if value is None else convert(value) for convert, value in zip(types, key))
+    except (binascii.Error, UnicodeDecodeError, AttributeError, TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def paginate(items: Sequence[Any], limit: int, key: Callable[[Any], tuple]) -> tuple[Sequence[Any], Optional[str]]:
+    """Split up to limit + 1 fetched items into a page and the cursor for
+    the page after it (None if this is the last page)."""
+    if len(items) <= limit:
+        return items, None
+    return items[:limit], encode_cursor(*key(items[limit - 1]))
@@ -0,0 +1,211 @@
+"""Import games from multi-game PGN files (Chess.com / Lichess exports, database dumps)."""
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TextIO
+from uuid import UUID
+
+from db.repositories import ExplorerRepository, GamePositionRepository, UserGameRepository
+from schema import GameType
+from services.chess_com import allowed_time_classes, chess_com_game_id
+from services.game_import import IMPORT_BATCH_SIZE
+from services.position_index import index_imported_games
+
+HEADER_LINE = re.compile(r'^\[(?P<tag>[A-Za-z0-9_]+)\s+"(?P<value>(?:[^"\\]|\\.)*)"\s*\]\s*$')
+
+# Chess.com's split between time classes, on estimated game duration
+# (base + 40 * increment seconds).
+BULLET_UNDER_SECONDS = 180
+BLITZ_UNDER_SECONDS = 600
+
+# Chess.com result codes for the losing side / a draw, keyed on words that
+# appear in the PGN Termination header.
+LOSS_TERMINATIONS = (("checkmate", "checkmated"), ("time", "timeout"), ("abandon", "abandoned"))
+DRAW_TERMINATIONS = (
+    ("stalemate", "stalemate"), ("repetition", "repetition"), ("insufficient", "insufficient"),
+    ("50", "50move"), ("agreement", "agreed"),
+)
+
+
+@dataclass
+class PgnImportResult:
+    games_read: int = 0
+    added: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games_read / self.seconds if self.seconds else 0.0
+
+
+def iter_pgn_games(lines: Iterable[str]) -> Iterator[tuple[dict[str, str], str]]:
+    """
+    Split a PGN stream into (headers, pgn text) pairs without parsing moves.
+
+    This is a line scanner for export-format PGN (one tag per line, as written
+    by Chess.com, Lichess and most tools), so it runs far faster than
+    chess.pgn.read_game and holds only one game in memory at a time.
+    """
+    headers: dict[str, str] = {}
+    buffer: List[str] = []
+    in_movetext = False
+    for line in lines:
+        line = line.rstrip("\r\n").lstrip("\ufeff")
+        match = HEADER_LINE.match(line)
+        if match:
+            if in_movetext:
+                yield headers, "\n".join(buffer).strip()
+                headers, buffer, in_movetext = {}, [], False
+            headers[match["tag"]] = match["value"].replace('\\"', '"').replace("\\\\", "\\")
+        elif line.strip():
+            in_movetext = True
+        buffer.append(line)
+    if headers or in_movetext:
+        yield headers, "\n".join(buffer).strip()
+
+
+def time_class_for(time_control: Optional[str]) -> Optional[str]:
+    """Classify a PGN TimeControl ("600", "180+2", "1/86400") the way Chess.com does."""
+    if not time_control or time_control in ("-", "?"):
+        return None
+    if "/" in time_control:
+        return "daily"
+    base, _, increment = time_control.partition("+")
+    try:
+        estimated = int(base) + 40 * int(increment or 0)
+    except ValueError:
+        return None
+    if estimated < BULLET_UNDER_SECONDS:
+        return "bullet"
+    if estimated < BLITZ_UNDER_SECONDS:
+        return "blitz"
+    return "rapid"
+
+
+def _results(result: Optional[str], termination: str, movetext: str) -> tuple[Optional[str], Optional[str]]:
+    """(white_result, black_result) as Chess.com result codes."""
+    termination = termination.lower()
+    if result in ("1-0", "0-1"):
+        loss = next((code for keyword, code in LOSS_TERMINATIONS if keyword in termination), None)
+        if loss is None:
+            # Lichess only says "Normal" for both mates and resignations
+            loss = "checkmated" if "#" in movetext else "resigned"
+        return ("win", loss) if result == "1-0" else (loss, "win")
+    if result == "1/2-1/2":
+        draw = next((code for keyword, code in DRAW_TERMINATIONS if keyword in termination), "agreed")
+        return draw, draw
+    return None, None
+
+
+def _end_time(headers: dict[str, str]) -> Optional[int]:
+    """Unix end time: Chess.com's EndDate/EndTime, else the UTC (start) date/time."""
+    for date_tag, time_tag in (("EndDate", "EndTime"), ("UTCDate", "UTCTime"), ("Date", None)):
+        date = headers.get(date_tag)
+        if not date or "?" in date:
+            continue
+        clock = headers.get(time_tag, "00:00:00") if time_tag else "00:00:00"
+        try:
+            parsed = datetime.strptime(f"{date} {clock}", "%Y.%m.%d %H:%M:%S")
+        except ValueError:
+            continue
+        return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+    return None
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def game_uuid(headers: dict[str, str], pgn: str) -> str:
+    """
+    Stable key for a PGN game: its Chess.com Link or Lichess Site URL, else
+    a hash of the full game text. Chess.com games are also deduplicated on
+    chess_com_game_id, which matches copies imported from the archive API.
+    """
+    for tag in ("Link", "Site"):
+        value = headers.get(tag, "")
+        if value.startswith(("http://", "https://")):
+            return value
+    return "pgn:" + hashlib.sha1(pgn.encode("utf-8")).hexdigest()
+
+
+def pgn_game_row(headers: dict[str, str], pgn: str, username: str) -> dict[str, Any]:
+    """Build a user_games row (without user_id) from one scanned PGN game."""
+    movetext = pgn.split("\n\n", 1)[-1]
+    white_result, black_result = _results(headers.get("Result"), headers.get("Termination", ""), movetext)
+    return dict(
+        pgn=pgn,
+        tcn=None,
+        chess_com_username=username,
+        chess_com_game_uuid=game_uuid(headers, pgn),
+        chess_com_game_id=chess_com_game_id(headers.get("Link")),
+        end_time=_end_time(headers),
+        time_class=time_class_for(headers.get("TimeControl")),
+        time_control=headers.get("TimeControl"),
+        white_username=headers.get("White"),
+        black_username=headers.get("Black"),
+        white_result=white_result,
+        black_result=black_result,
+        white_rating=_int_or_none(headers.get("WhiteElo")),
+        black_rating=_int_or_none(headers.get("BlackElo")),
+    )
+
+
+def import_pgn_games(
+    lines: TextIO | Iterable[str],
+    *,
+    user_id: UUID,
+    username: str,
+    user_game_repo: UserGameRepository,
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+    game_types: List[GameType] | None = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_progress: Optional[Callable[[PgnImportResult], None]] = None,
+) -> PgnImportResult:
+    """
+    Stream games from a PGN file into user_games in committed batches.
+
+    Games whose time class is known but not requested are skipped, as are
+    games already stored for the user (deduplicated by the database on
+    `game_uuid`, and on the Chess.com game id so games fetched from the API
+    are not added again). New games are added to the position index and opening tree
+    batch by batch.
+    Memory use is bounded by one batch regardless of file size.
+    """
+    allowed = allowed_time_classes(game_types)
+    result = PgnImportResult()
+    start = time.perf_counter()
+    batch: List[dict[str, Any]] = []
+
+    def flush() -> None:
+        inserted = user_game_repo.copy_games(batch)
+        index_imported_games(explorer_repo, position_repo, user_id, batch, inserted)
+        added = len(inserted)
+        result.added += added
+        result.skipped += len(batch) - added
+        batch.clear()
+        result.seconds = time.perf_counter() - start
+        if on_progress:
+            on_progress(result)
+
+    for headers, pgn in iter_pgn_games(lines):
+        result.games_read += 1
+        row = pgn_game_row(headers, pgn, username)
+        if row["time_class"] is not None and row["time_class"] not in allowed:
+            result.skipped += 1
+            continue
+        batch.append(dict(row, user_id=user_id))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    result.seconds = time.perf_counter() - start
+    return result
@@ -0,0 +1,101 @@
+"""Replay the mainline of a stored PGN without building a python-chess game tree.
+
+chess.pgn.read_game parses headers, comments (Chess.com's clock annotations)
+and variations into a node tree; indexing only needs the moves, so the
+movetext is tokenised with regular expressions and played on a single board.
+Standard and Chess960 games are replayed; other variants (Chess.com's
+Three-Check, Crazyhouse, ...) are skipped, since their moves would not be
+legal on a standard board.
+"""
+import logging
+import re
+from typing import Iterator, Optional
+
+import chess
+
+from services.position_keys import STARTING_PLACEMENT, keyed, placement_hash, push_keyed
+
+FEN_HEADER = re.compile(r'^\[FEN\s+"([^"]+)"\]\s*$', re.MULTILINE)
+VARIANT_HEADER = re.compile(r'^\[Variant\s+"([^"]*)"\]\s*$', re.MULTILINE)
+HEADER_LINES = re.compile(r"^\[.*\]\s*$", re.MULTILINE)
+COMMENTS = re.compile(r"\{[^}]*\}|;[^\n]*")
+VARIATION = re.compile(r"\([^()]*\)")  # innermost; removed repeatedly
+NON_MOVE_TOKEN = re.compile(r"^(?:\d+\.+|\$\d+|1-0|0-1|1/2-1/2|\*)$")
+MOVE_NUMBER_PREFIX = re.compile(r"^\d+\.+")
+ANNOTATION_SUFFIX = re.compile(r"[?!]+$")
+# Variant header values, lowercased, of the games replay plays (as chess.pgn reads them)
+STANDARD_VARIANTS = {"", "standard", "chess", "normal", "classical", "from position"}
+CHESS960_VARIANTS = {"chess960", "chess 960", "fischerandom", "fischerrandom", "fischer random"}
+
+logger = logging.getLogger(__name__)
+
+
+def start_board(pgn: str) -> Optional[chess.Board]:
+    """The board a PGN's mainline starts from, honouring its FEN and Variant
+    headers, or None for an invalid FEN or a variant replay does not play."""
+    variant = VARIANT_HEADER.search(pgn)
+    variant = variant.group(1).strip().lower() if variant else ""
+    chess960 = variant in CHESS960_VARIANTS
+    if not chess960 and variant not in STANDARD_VARIANTS:
+        logger.info("Not replaying a %s game", variant)
+        return None
+    fen = FEN_HEADER.search(pgn)
+    try:
+        return chess.Board(fen.group(1) if fen else chess.STARTING_FEN, chess960=chess960)
+    except ValueError:
+        return None
+
+
+def mainline_sans(pgn: str) -> list[str]:
+    """The SAN tokens of a PGN's mainline, in order."""
+    movetext = COMMENTS.sub(" ", HEADER_LINES.sub("", pgn))
+    while "(" in movetext:
+        stripped = VARIATION.sub(" ", movetext)
+        if stripped == movetext:  # unbalanced parenthesis
+            break
+        movetext = stripped
+    sans = []
+    for token in movetext.split():
+        if NON_MOVE_TOKEN.match(token):
+            continue
+        token = ANNOTATION_SUFFIX.sub("", MOVE_NUMBER_PREFIX.sub("", token))
+        if token:
+            sans.append(token)
+    return sans
+
+
+def replay(
+    pgn: Optional[str], max_plies: Optional[int] = None, final: bool = False, strict: bool = False,
+) -> Iterator[tuple[chess.Board, Optional[chess.Move], Optional[str], int]]:
+    """
+    Yield (board before the move, move, san, position key of that board) for
+    each mainline move, then (board, None, None, key) for the position after
+    the last one if `final` is set and any move was played.
+
+    The board is shared and the move is pushed after the caller resumes, so
+    read what you need from it before advancing. Replay stops at the first
+    illegal or unparsable move, or with `strict` raises ValueError there, for
+    callers that must not keep a truncated game. Games start_board cannot set
+    up yield nothing.
+    """
+    if not pgn:
+        return
+    board = start_board(pgn)
+    if board is None:
+        return
+    placement = STARTING_PLACEMENT if board.board_fen() == chess.STARTING_BOARD_FEN else placement_hash(board)
+    played = False
+    for ply, san in enumerate(mainline_sans(pgn)):
+        if max_plies is not None and ply >= max_plies:
+            break
+        try:
+            move = board.parse_san(san)
+        except ValueError:
+            if strict:
+                raise ValueError(f"Unplayable move {san!r} after {ply} half-moves")
+            break
+        yield board, move, san, keyed(board, placement)
+        placement = push_keyed(board, move, placement)
+        played = True
+    if final and played:
+        yield board, None, None, keyed(board, placement)
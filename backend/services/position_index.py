@@ -0,0 +1,159 @@
+"""Position and material index of stored games, for searching them by position.
+
+Each game is replayed from its PGN once, when it is imported (or, for games
+stored before the index existed, when it is next analysed or rebuilt). Every
+position reached goes into game_positions under its Zobrist key, and every
+material balance into game_material, so a search is an index lookup in
+Postgres. The same replay feeds the opening explorer.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+import chess
+
+from db.models import UserGame
+from db.repositories import ExplorerRepository, GamePositionRepository, UserGameRepository
+from services.opening_explorer import game_deltas, player_color, user_outcome
+from services.pgn_replay import replay
+
+REBUILD_BATCH_SIZE = 500
+
+# Signature order of the pieces other than pawns
+SIGNATURE_PIECES = ((chess.KING, "K"), (chess.QUEEN, "Q"), (chess.ROOK, "R"), (chess.BISHOP, "B"), (chess.KNIGHT, "N"))
+MATERIAL_SIDE = re.compile(r"^[KQRBNP]*$")
+
+logger = logging.getLogger(__name__)
+
+
+def material_signature(board: chess.Board) -> tuple[str, int, int]:
+    """(pieces signature such as "KRvKR", White's pawns, Black's pawns)."""
+    sides = [
+        "".join(letter * chess.popcount(board.pieces_mask(piece_type, color)) for piece_type, letter in SIGNATURE_PIECES)
+        for color in (chess.WHITE, chess.BLACK)
+    ]
+    return (
+        "v".join(sides),
+        chess.popcount(board.pieces_mask(chess.PAWN, chess.WHITE)),
+        chess.popcount(board.pieces_mask(chess.PAWN, chess.BLACK)),
+    )
+
+
+def parse_material(text: str) -> Optional[tuple[str, int, int]]:
+    """Parse a signature such as "KRPPvKRP" (White first, any piece order) into
+    the form material_signature returns, or None if it is malformed."""
+    sides = text.upper().split("V")
+    if len(sides) != 2 or not all(MATERIAL_SIDE.match(side) for side in sides):
+        return None
+    pieces = ["".join(letter * side.count(letter) for _, letter in SIGNATURE_PIECES) for side in sides]
+    return "v".join(pieces), sides[0].count("P"), sides[1].count("P")
+
+
+@dataclass
+class GameReplay:
+    """What indexing needs from one replay of a game's mainline."""
+
+    positions: list[int] = field(default_factory=list)  # key before each ply, then the final position's
+    moves: list[tuple[str, str]] = field(default_factory=list)  # (uci, san) of each ply
+    materials: dict[tuple[str, int, int], int] = field(default_factory=dict)  # signature -> first ply
+
+    def plies(self) -> Iterator[tuple[int, str, str]]:
+        """(position key before the move, uci, san) of each ply."""
+        for key, (uci, san) in zip(self.positions, self.moves):
+            yield key, uci, san
+
+
+def replay_game(pgn: Optional[str]) -> GameReplay:
+    """Replay a PGN's mainline once, collecting positions, moves and material.
+
+    Material only changes on captures and promotions, so it is recounted after
+    those only. A game without playable moves, or with a move that cannot be
+    played (so that only part of it would be indexed), gives an empty replay.
+    """
+    game = GameReplay()
+    changed = True
+    try:
+        for ply, (board, move, san, key) in enumerate(replay(pgn, final=True, strict=True)):
+            if changed:
+                game.materials.setdefault(material_signature(board), ply)
+            game.positions.append(key)
+            if move is not None:
+                changed = move.promotion is not None or board.is_capture(move)
+                game.moves.append((move.uci(), san))
+    except ValueError as exc:
+        logger.warning("Not indexing a game: %s", exc)
+        return GameReplay()
+    return game
+
+
+def index_rows(
+    user_id: UUID, game_id: UUID, game: GameReplay,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """game_positions and game_material rows for a replayed game."""
+    positions = [
+        dict(game_id=game_id, ply=ply, user_id=user_id, position_key=key) for ply, key in enumerate(game.positions)
+    ]
+    materials = [
+        dict(game_id=game_id, material=material, white_pawns=white_pawns, black_pawns=black_pawns,
+             user_id=user_id, first_ply=ply)
+        for (material, white_pawns, black_pawns), ply in game.materials.items()
+    ]
+    return positions, materials
+
+
+def index_imported_games(
+    explorer_repo: ExplorerRepository,
+    position_repo: GamePositionRepository,
+    user_id: UUID,
+    rows: list[dict[str, Any]],
+    inserted: dict[str, UUID],
+) -> None:
+    """Replay newly inserted games (`inserted` as returned by copy_games) once
+    to add them to the position index and the user's opening tree, and commit."""
+    positions, materials, deltas = [], [], []
+    for row in rows:
+        game_id = inserted.get(row["chess_com_game_uuid"])
+        if game_id is None:
+            continue
+        game = replay_game(row.get("pgn"))
+        game_positions, game_materials = index_rows(user_id, game_id, game)
+        positions.extend(game_positions)
+        materials.extend(game_materials)
+        color = player_color(row.get("white_username"), row.get("black_username"), row.get("chess_com_username"))
+        if color is not None:
+            outcome = user_outcome(color, row.get("white_result"), row.get("black_result"))
+            deltas.extend(game_deltas(game.plies(), color, outcome))
+    position_repo.stage_add(positions, materials)
+    explorer_repo.stage_add(user_id, deltas)
+    position_repo.session.commit()
+
+
+def stage_index_game(position_repo: GamePositionRepository, game: UserGame) -> None:
+    """Index a stored game that predates the index, if it is not indexed yet. Not committed."""
+    if not position_repo.has_game(game.game_id):
+        position_repo.stage_add(*index_rows(game.user_id, game.game_id, replay_game(game.pgn)))
+
+
+def rebuild_position_index(
+    user_id: UUID, user_game_repo: UserGameRepository, position_repo: GamePositionRepository,
+) -> int:
+    """Recompute a user's position index from their stored games in one
+    transaction. Returns the number of games replayed."""
+    position_repo.delete_by_user_id(user_id)
+    games = 0
+    positions: list[dict[str, Any]] = []
+    materials: list[dict[str, Any]] = []
+    for row in user_game_repo.iter_pgns(user_id, REBUILD_BATCH_SIZE):
+        games += 1
+        game_positions, game_materials = index_rows(user_id, row.game_id, replay_game(row.pgn))
+        positions.extend(game_positions)
+        materials.extend(game_materials)
+        if games % REBUILD_BATCH_SIZE == 0:
+            position_repo.stage_add(positions, materials)
+            positions.clear()
+            materials.clear()
+    position_repo.stage_add(positions, materials)
+    position_repo.session.commit()
+    return games
@@ -0,0 +1,81 @@
+"""Compact position keys: Polyglot Zobrist hashes stored as signed 64-bit integers.
+
+The key covers piece placement, side to move, castling rights and a capturable
+en passant square, but not the halfmove clock or move number, so the same
+position reached by different move orders or at a different point in the game
+gets the same key.
+"""
+from functools import lru_cache
+from typing import Optional
+
+import chess
+import chess.polyglot
+
+# Games share their openings, so most FENs seen while saving repeat
+POSITION_KEY_CACHE_SIZE = 65536
+
+_HASHER = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+_PIECE_SQUARE = chess.polyglot.POLYGLOT_RANDOM_ARRAY[:768]
+
+
+def to_signed64(value: int) -> int:
+    """An unsigned 64-bit hash as the BIGINT Postgres can store."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def board_key(board: chess.Board) -> int:
+    """The position key of a board."""
+    return to_signed64(chess.polyglot.zobrist_hash(board))
+
+
+def _squares_hash(board: chess.Board, squares: list[int]) -> int:
+    value = 0
+    for square in squares:
+        piece = board.piece_at(square)
+        if piece:
+            value ^= _PIECE_SQUARE[64 * ((piece.piece_type - 1) * 2 + piece.color) + square]
+    return value
+
+
+def placement_hash(board: chess.Board) -> int:
+    """The piece-placement part of a board's Zobrist hash (see push_keyed)."""
+    return _HASHER.hash_board(board)
+
+
+STARTING_PLACEMENT = placement_hash(chess.Board())
+
+
+def push_keyed(board: chess.Board, move: chess.Move, placement: int) -> int:
+    """Push `move` and return the updated placement hash.
+
+    Rehashing a whole board costs a lookup per piece; only the squares a
+    move touches change, which makes replaying long games several times
+    cheaper than calling board_key after every move.
+    """
+    if board.is_castling(move):
+        squares = list(chess.SquareSet(chess.BB_RANK_1 if board.turn == chess.WHITE else chess.BB_RANK_8))
+    else:
+        squares = [move.from_square, move.to_square]
+        if board.is_en_passant(move):
+            squares.append(move.to_square + (-8 if board.turn == chess.WHITE else 8))
+    placement ^= _squares_hash(board, squares)
+    board.push(move)
+    return placement ^ _squares_hash(board, squares)
+
+
+def keyed(board: chess.Board, placement: int) -> int:
+    """The position key of `board`, given its placement hash."""
+    return to_signed64(
+        placement ^ _HASHER.hash_castling(board) ^ _HASHER.hash_ep_square(board) ^ _HASHER.hash_turn(board)
+    )
+
+
+@lru_cache(maxsize=POSITION_KEY_CACHE_SIZE)
+def position_key(fen: Optional[str]) -> Optional[int]:
+    """The position key of a FEN, or None when it is missing or invalid."""
+    if not fen:
+        return None
+    try:
+        return board_key(chess.Board(fen))
+    except ValueError:
+        return None
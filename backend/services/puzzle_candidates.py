@@ -1,9 +1,10 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Iterable, Optional
 
 from chess import Board, Move
 
 from db.models import UserGame
+from services.game_analysis import user_side
 
 
 MISTAKE_PRIORITY = {
@@ -27,47 +28,29 @@ class PuzzleCandidate:
     candidate_score: float
 
 
-def _user_side(game: UserGame) -> str:
-    username = (game.chess_com_username or "").lower()
-    if (game.white_username or "").lower() == username:
-        return "white"
-    if (game.black_username or "").lower() == username:
-        return "black"
-    raise ValueError("Unable to determine the user's side for this game")
-
-
-def _eval_cp(eval_dict: Optional[dict], perspective: str) -> Optional[int]:
-    """Convert an evaluation dict to centipawns from `perspective`'s point of view."""
-    if not eval_dict:
+def _eval_cp(eval_type: Optional[str], eval_value: Optional[int], perspective: str) -> Optional[int]:
+    """Convert a stored evaluation to centipawns from `perspective`'s point of view."""
+    if eval_type is None:
         return None
 
-    if eval_dict.get("type") == "mate":
-        white_cp = 10000 if eval_dict.get("value", 0) > 0 else -10000
+    if eval_type == "mate":
+        white_cp = 10000 if (eval_value or 0) > 0 else -10000
     else:
-        white_cp = int(eval_dict.get("value", 0))
+        white_cp = int(eval_value or 0)
 
     return white_cp if perspective == "white" else -white_cp
 
 
-def _solution_line(moves: list[dict], index: int) -> list[str]:
-    """Get the engine's best continuation from the position after move at `index`.
+def _solution_line(next_pv: Optional[str], next_best_move: Optional[str]) -> list[str]:
+    """Get the engine's best continuation from the position after the source move.
 
-    `moves[index+1].top_lines` / `best_move` are the engine's evaluation of the
-    position *before* `moves[index+1]` is played — which is the position *after*
-    the move at `index`.
+    The next move's `pv` / `best_move` are the engine's evaluation of the
+    position *before* that move is played — which is the position *after*
+    the source move.
     """
-    if index + 1 >= len(moves):
-        return []
-
-    next_move = moves[index + 1]
-    top_lines = next_move.get("top_lines") or []
-    if top_lines:
-        line = (top_lines[0] or {}).get("Line", "")
-        if line:
-            return [uci for uci in line.split() if uci]
-
-    best_reply = next_move.get("best_move")
-    return [best_reply] if best_reply else []
+    if next_pv:
+        return [uci for uci in next_pv.split() if uci]
+    return [next_best_move] if next_best_move else []
 
 
 def _uci_to_san(fen: str, uci: Optional[str]) -> Optional[str]:
@@ -82,7 +65,7 @@ def _uci_to_san(fen: str, uci: Optional[str]) -> Optional[str]:
         return uci
 
 
-def extract_puzzle_candidate(game: UserGame) -> PuzzleCandidate:
+def extract_puzzle_candidate(game: UserGame, sources: Iterable[Any]) -> PuzzleCandidate:
     """Extract a puzzle from an opponent's blunder in one of the user's games.
 
     Standard puzzle flow:
@@ -91,47 +74,45 @@ def extract_puzzle_candidate(game: UserGame) -> PuzzleCandidate:
 
     This matches the Lichess / Chess.com puzzle format where you punish the
     other side's mistake, playing as yourself.
+
+    `sources` are this game's rows from GameMoveRepository.get_puzzle_sources:
+    the opponent's mistakes and blunders with the engine's reply line.
     """
-    analysis = game.analysed_game or {}
-    moves = analysis.get("moves") or []
-    if not moves:
-        raise ValueError("Game has no analyzed move data")
+    side = user_side(game)
+    if side is None:
+        raise ValueError("Unable to determine the user's side for this game")
 
-    user_side = _user_side(game)
-    opponent_side = "black" if user_side == "white" else "white"
     best_candidate: Optional[PuzzleCandidate] = None
     best_sort_key: Optional[tuple[int, float, int]] = None
 
-    for i, move in enumerate(moves):
-        # Look at the OPPONENT's moves for blunders / mistakes
-        if move.get("side") != opponent_side:
-            continue
+    for row in sources:
+        move = row.GameMove
+        i = move.half_move_index
 
-        classification = (move.get("classification") or "").lower()
-        priority = MISTAKE_PRIORITY.get(classification)
+        priority = MISTAKE_PRIORITY.get((move.classification or "").lower())
         if not priority:
             continue
 
-        fen_before = move.get("fen_before")
-        played_uci = move.get("uci")
+        fen_before = move.fen_before
+        played_uci = move.uci
         if not fen_before or not played_uci:
             continue
 
-        continuation = _solution_line(moves, i)
+        continuation = _solution_line(row.next_pv, row.next_best_move)
         if not continuation:
             continue
 
         # Eval from the user's perspective after the opponent's blunder.
         # Must show a clear advantage for the user to be a valid puzzle.
-        cp = _eval_cp(move.get("eval_after"), user_side)
+        cp = _eval_cp(move.eval_after_type, move.eval_after_value, side)
         if cp is not None and cp < MIN_ADVANTAGE_CP:
             continue
 
-        cp_loss = float(move.get("cp_loss") or 0)
+        cp_loss = float(move.cp_loss or 0)
 
         # Build SAN representations for display context
-        played_san = move.get("san") or played_uci
-        best_san = _uci_to_san(fen_before, move.get("best_move"))
+        played_san = move.san or played_uci
+        best_san = _uci_to_san(fen_before, move.best_move)
 
         candidate = PuzzleCandidate(
             start_fen=fen_before,
@@ -1,3 +1,3 @@
-from .service import classify_puzzle_candidate
+from .service import classify_puzzle_batch, classify_puzzle_candidate
 
-__all__ = ["classify_puzzle_candidate"]
+__all__ = ["classify_puzzle_batch", "classify_puzzle_candidate"]
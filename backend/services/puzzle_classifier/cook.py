@@ -16,7 +16,6 @@ from chess import (
     square_file,
     square_rank,
 )
-from chess.pgn import ChildNode
 
 from . import util
 from .model import Puzzle, TagKind
@@ -166,11 +165,11 @@ def advanced_pawn(puzzle: Puzzle) -> bool:
 
 
 def double_check(puzzle: Puzzle) -> bool:
-    return any(len(node.board().checkers()) > 1 for node in puzzle.mainline[1::2])
+    return any(len(node.board.checkers()) > 1 for node in puzzle.mainline[1::2])
 
 
 def sacrifice(puzzle: Puzzle) -> bool:
-    diffs = [material_diff(n.board(), puzzle.pov) for n in puzzle.mainline]
+    diffs = [material_diff(n.board, puzzle.pov) for n in puzzle.mainline]
     initial = diffs[0]
     for d in diffs[1::2][1:]:
         if d - initial <= -2:
@@ -179,15 +178,15 @@ def sacrifice(puzzle: Puzzle) -> bool:
 
 
 def x_ray(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        if not util.is_capture(node):
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        if not node.is_capture:
             continue
-        prev_op_node = node.parent
-        assert isinstance(prev_op_node, ChildNode)
-        if prev_op_node.move.to_square != node.move.to_square or util.moved_piece_type(prev_op_node) == KING:
+        prev_op_node = line[i - 1]
+        if prev_op_node.move.to_square != node.move.to_square or prev_op_node.piece_type == KING:
             continue
-        prev_pl_node = prev_op_node.parent
-        assert isinstance(prev_pl_node, ChildNode)
+        prev_pl_node = line[i - 2]
         if prev_pl_node.move.to_square != prev_op_node.move.to_square:
             continue
         if prev_op_node.move.from_square in SquareSet.between(node.move.from_square, node.move.to_square):
@@ -197,16 +196,16 @@ def x_ray(puzzle: Puzzle) -> bool:
 
 def fork(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2][:-1]:
-        if util.moved_piece_type(node) is KING:
+        if node.piece_type is KING:
             continue
-        board = node.board()
+        board = node.board
         if util.is_in_bad_spot(board, node.move.to_square):
             continue
         nb = 0
         for piece, square in util.attacked_opponent_squares(board, node.move.to_square, puzzle.pov):
             if piece.piece_type == PAWN:
                 continue
-            if util.king_values[piece.piece_type] > util.king_values[util.moved_piece_type(node)] or (
+            if util.king_values[piece.piece_type] > util.king_values[node.piece_type] or (
                 util.is_hanging(board, piece, square) and square not in board.attackers(not puzzle.pov, node.move.to_square)
             ):
                 nb += 1
@@ -219,13 +218,13 @@ def hanging_piece(puzzle: Puzzle) -> bool:
     if len(puzzle.mainline) < 2:
         return False
     to = puzzle.mainline[1].move.to_square
-    captured = puzzle.mainline[0].board().piece_at(to)
-    if puzzle.mainline[0].board().is_check() and (not captured or captured.piece_type == PAWN):
+    captured = puzzle.mainline[0].board.piece_at(to)
+    if puzzle.mainline[0].is_check and (not captured or captured.piece_type == PAWN):
         return False
     if captured and captured.piece_type != PAWN:
-        if util.is_hanging(puzzle.mainline[0].board(), captured, to):
+        if util.is_hanging(puzzle.mainline[0].board, captured, to):
             op_move = puzzle.mainline[0].move
-            op_capture = puzzle.game.board().piece_at(op_move.to_square)
+            op_capture = puzzle.mainline[0].board_before.piece_at(op_move.to_square)
             if (
                 op_capture
                 and util.values[op_capture.piece_type] >= util.values[captured.piece_type]
@@ -234,21 +233,22 @@ def hanging_piece(puzzle: Puzzle) -> bool:
                 return False
             if len(puzzle.mainline) < 4:
                 return True
-            if material_diff(puzzle.mainline[3].board(), puzzle.pov) >= material_diff(puzzle.mainline[1].board(), puzzle.pov):
+            if material_diff(puzzle.mainline[3].board, puzzle.pov) >= material_diff(puzzle.mainline[1].board, puzzle.pov):
                 return True
     return False
 
 
 def trapped_piece(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
         square = node.move.to_square
-        captured = node.parent.board().piece_at(square)
+        captured = node.board_before.piece_at(square)
         if captured and captured.piece_type != PAWN:
-            prev = node.parent
-            assert isinstance(prev, ChildNode)
+            prev = line[i - 1]
             if prev.move.to_square == square:
                 square = prev.move.from_square
-            if util.is_trapped(prev.parent.board(), square):
+            if util.is_trapped(prev.board_before, square):
                 return True
     return False
 
@@ -260,14 +260,14 @@ def overloading(puzzle: Puzzle) -> bool:
 def discovered_attack(puzzle: Puzzle) -> bool:
     if discovered_check(puzzle):
         return True
-    for node in puzzle.mainline[1::2][1:]:
-        if util.is_capture(node):
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        if node.is_capture:
             between = SquareSet.between(node.move.from_square, node.move.to_square)
-            assert isinstance(node.parent, ChildNode)
-            if node.parent.move.to_square == node.move.to_square:
+            if line[i - 1].move.to_square == node.move.to_square:
                 return False
-            prev = node.parent.parent
-            assert isinstance(prev, ChildNode)
+            prev = line[i - 2]
             if (
                 prev.move.from_square in between
                 and node.move.to_square != prev.move.to_square
@@ -280,101 +280,101 @@ def discovered_attack(puzzle: Puzzle) -> bool:
 
 def discovered_check(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        board = node.board()
-        checkers = board.checkers()
+        checkers = node.board.checkers()
         if checkers and node.move.to_square not in checkers:
             return True
     return False
 
 
 def quiet_move(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline:
+    for node in puzzle.mainline[:-1]:
         if (
-            node.turn() != puzzle.pov
-            and not node.is_end()
-            and not node.board().is_check()
-            and not node.parent.board().is_check()
-            and not util.is_capture(node)
-            and not util.attacked_opponent_pieces(node.board(), node.move.to_square, puzzle.pov)
+            node.board.turn != puzzle.pov
+            and not node.is_check
+            and not node.board_before.is_check()
+            and not node.is_capture
+            and not util.attacked_opponent_pieces(node.board, node.move.to_square, puzzle.pov)
             and not util.is_advanced_pawn_move(node)
-            and util.moved_piece_type(node) != KING
+            and node.piece_type != KING
         ):
             return True
     return False
 
 
 def defensive_move(puzzle: Puzzle) -> bool:
-    if len(puzzle.mainline) < 2 or puzzle.mainline[-2].board().legal_moves.count() < 3:
+    if len(puzzle.mainline) < 2 or puzzle.mainline[-2].board.legal_moves.count() < 3:
         return False
     node = puzzle.mainline[-1]
-    if node.board().is_check() or util.is_capture(node):
+    if node.is_check or node.is_capture:
         return False
-    if util.attacked_opponent_pieces(node.board(), node.move.to_square, puzzle.pov):
+    if util.attacked_opponent_pieces(node.board, node.move.to_square, puzzle.pov):
         return False
     return not util.is_advanced_pawn_move(node)
 
 
 def check_escape(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        if node.board().is_check() or util.is_capture(node):
+        if node.is_check or node.is_capture:
             return False
-        if node.parent.board().legal_moves.count() < 3:
+        if node.board_before.legal_moves.count() < 3:
             return False
-        if node.parent.board().is_check():
+        if node.board_before.is_check():
             return True
     return False
 
 
 def attraction(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1:]:
-        if node.turn() == puzzle.pov:
+    line = puzzle.mainline
+    for i in range(1, len(line)):
+        node = line[i]
+        if node.board.turn == puzzle.pov:
             continue
         first_move_to = node.move.to_square
-        opponent_reply = util.next_node(node)
+        opponent_reply = line[i + 1] if i + 1 < len(line) else None
         if opponent_reply and opponent_reply.move.to_square == first_move_to:
-            attracted_piece = util.moved_piece_type(opponent_reply)
+            attracted_piece = opponent_reply.piece_type
             if attracted_piece in [KING, QUEEN, ROOK]:
                 attracted_to_square = opponent_reply.move.to_square
-                next_pl_node = util.next_node(opponent_reply)
+                next_pl_node = line[i + 2] if i + 2 < len(line) else None
                 if next_pl_node:
-                    attackers = next_pl_node.board().attackers(puzzle.pov, attracted_to_square)
+                    attackers = next_pl_node.board.attackers(puzzle.pov, attracted_to_square)
                     if next_pl_node.move.to_square in attackers:
                         if attracted_piece == KING:
                             return True
-                        n3 = util.next_next_node(next_pl_node)
+                        n3 = line[i + 4] if i + 4 < len(line) else None
                         if n3 and n3.move.to_square == attracted_to_square:
                             return True
     return False
 
 
 def deflection(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        captured_piece = node.parent.board().piece_at(node.move.to_square)
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        captured_piece = node.board_before.piece_at(node.move.to_square)
         if captured_piece or node.move.promotion:
-            capturing_piece = util.moved_piece_type(node)
+            capturing_piece = node.piece_type
             if captured_piece and util.king_values[captured_piece.piece_type] > util.king_values[capturing_piece]:
                 continue
             square = node.move.to_square
-            prev_op_move = node.parent.move
-            assert prev_op_move
-            grandpa = node.parent.parent
-            assert isinstance(grandpa, ChildNode)
+            prev_op_move = line[i - 1].move
+            grandpa = line[i - 2]
             prev_player_move = grandpa.move
-            prev_player_capture = grandpa.parent.board().piece_at(prev_player_move.to_square)
+            prev_player_capture = grandpa.board_before.piece_at(prev_player_move.to_square)
             if (
-                ((not prev_player_capture or util.values[prev_player_capture.piece_type] < util.moved_piece_type(grandpa)))
+                ((not prev_player_capture or util.values[prev_player_capture.piece_type] < grandpa.piece_type))
                 and square != prev_op_move.to_square
                 and square != prev_player_move.to_square
-                and (prev_op_move.to_square == prev_player_move.to_square or grandpa.board().is_check())
+                and (prev_op_move.to_square == prev_player_move.to_square or grandpa.is_check)
                 and (
-                    square in grandpa.board().attacks(prev_op_move.from_square)
+                    square in grandpa.board.attacks(prev_op_move.from_square)
                     or (
                         node.move.promotion
                         and square_file(node.move.to_square) == square_file(prev_op_move.from_square)
-                        and node.move.from_square in grandpa.board().attacks(prev_op_move.from_square)
+                        and node.move.from_square in grandpa.board.attacks(prev_op_move.from_square)
                     )
                 )
-                and (square not in node.parent.board().attacks(prev_op_move.to_square))
+                and (square not in node.board_before.attacks(prev_op_move.to_square))
             ):
                 return True
     return False
@@ -383,10 +383,10 @@ def deflection(puzzle: Puzzle) -> bool:
 def exposed_king(puzzle: Puzzle) -> bool:
     if puzzle.pov:
         pov = puzzle.pov
-        board = puzzle.mainline[0].board()
+        board = puzzle.mainline[0].board
     else:
         pov = not puzzle.pov
-        board = puzzle.mainline[0].board().mirror()
+        board = puzzle.mainline[0].board.mirror()
     king = board.king(not pov)
     assert king is not None
     if chess.square_rank(king) < 5:
@@ -402,88 +402,84 @@ def exposed_king(puzzle: Puzzle) -> bool:
         if board.piece_at(square) == Piece(PAWN, not pov):
             return False
     for node in puzzle.mainline[1::2][1:-1]:
-        if node.board().is_check():
+        if node.is_check:
             return True
     return False
 
 
 def skewer(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        prev = node.parent
-        assert isinstance(prev, ChildNode)
-        capture = prev.board().piece_at(node.move.to_square)
-        if capture and util.moved_piece_type(node) in util.ray_piece_types and not node.board().is_checkmate():
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node, prev = line[i], line[i - 1]
+        capture = prev.board.piece_at(node.move.to_square)
+        if capture and node.piece_type in util.ray_piece_types and not node.board.is_checkmate():
             between = SquareSet.between(node.move.from_square, node.move.to_square)
             op_move = prev.move
-            assert op_move
             if op_move.to_square == node.move.to_square or op_move.from_square not in between:
                 continue
-            if util.king_values[util.moved_piece_type(prev)] > util.king_values[capture.piece_type] and util.is_in_bad_spot(prev.board(), node.move.to_square):
+            if util.king_values[prev.piece_type] > util.king_values[capture.piece_type] and util.is_in_bad_spot(prev.board, node.move.to_square):
                 return True
     return False
 
 
 def self_interference(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        prev_board = node.parent.board()
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        prev_board = node.board_before
         square = node.move.to_square
         capture = prev_board.piece_at(square)
         if capture and util.is_hanging(prev_board, capture, square):
-            grandpa = node.parent.parent
-            assert grandpa
-            init_board = grandpa.board()
+            init_board = line[i - 2].board
             defenders = init_board.attackers(capture.color, square)
             defender = defenders.pop() if defenders else None
             defender_piece = init_board.piece_at(defender) if defender else None
             if defender and defender_piece and defender_piece.piece_type in util.ray_piece_types:
-                if node.parent.move and node.parent.move.to_square in SquareSet.between(square, defender):
+                if line[i - 1].move.to_square in SquareSet.between(square, defender):
                     return True
     return False
 
 
 def interference(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        prev_board = node.parent.board()
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        prev_board = node.board_before
         square = node.move.to_square
         capture = prev_board.piece_at(square)
-        assert node.parent.move
-        if capture and square != node.parent.move.to_square and util.is_hanging(prev_board, capture, square):
-            assert node.parent and node.parent.parent and node.parent.parent.parent
-            init_board = node.parent.parent.parent.board()
+        if capture and square != line[i - 1].move.to_square and util.is_hanging(prev_board, capture, square):
+            init_board = line[i - 3].board
             defenders = init_board.attackers(capture.color, square)
             defender = defenders.pop() if defenders else None
             defender_piece = init_board.piece_at(defender) if defender else None
             if defender and defender_piece and defender_piece.piece_type in util.ray_piece_types:
-                interfering = node.parent.parent
-                if interfering.move and interfering.move.to_square in SquareSet.between(square, defender):
+                if line[i - 2].move.to_square in SquareSet.between(square, defender):
                     return True
     return False
 
 
 def intermezzo(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        if util.is_capture(node):
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        if node.is_capture:
             capture_move = node.move
             capture_square = node.move.to_square
-            op_node = node.parent
-            assert isinstance(op_node, ChildNode)
-            prev_pov_node = node.parent.parent
-            assert isinstance(prev_pov_node, ChildNode)
-            if op_node.move.from_square not in prev_pov_node.board().attackers(not puzzle.pov, capture_square):
+            op_node, prev_pov_node = line[i - 1], line[i - 2]
+            if op_node.move.from_square not in prev_pov_node.board.attackers(not puzzle.pov, capture_square):
                 if prev_pov_node.move.to_square != capture_square:
-                    prev_op_node = prev_pov_node.parent
-                    assert isinstance(prev_op_node, ChildNode)
+                    prev_op_node = line[i - 3]
                     return (
                         prev_op_node.move.to_square == capture_square
-                        and util.is_capture(prev_op_node)
-                        and capture_move in prev_op_node.board().legal_moves
+                        and prev_op_node.is_capture
+                        and capture_move in prev_op_node.board.legal_moves
                     )
     return False
 
 
 def pin_prevents_attack(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        board = node.board()
+        board = node.board
         for square, piece in board.piece_map().items():
             if piece.color == puzzle.pov:
                 continue
@@ -507,7 +503,7 @@ def pin_prevents_attack(puzzle: Puzzle) -> bool:
 
 def pin_prevents_escape(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        board = node.board()
+        board = node.board
         for pinned_square, pinned_piece in board.piece_map().items():
             if pinned_piece.color == puzzle.pov:
                 continue
@@ -535,8 +531,8 @@ def pin_prevents_escape(puzzle: Puzzle) -> bool:
 def attacking_f2_f7(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
         square = node.move.to_square
-        if node.parent.board().piece_at(node.move.to_square) and square in [chess.F2, chess.F7]:
-            king = node.board().piece_at(chess.E8 if square == chess.F7 else chess.E1)
+        if node.board_before.piece_at(node.move.to_square) and square in [chess.F2, chess.F7]:
+            king = node.board.piece_at(chess.E8 if square == chess.F7 else chess.E1)
             return king is not None and king.piece_type == KING and king.color != puzzle.pov
     return False
 
@@ -551,23 +547,23 @@ def queenside_attack(puzzle: Puzzle) -> bool:
 
 def side_attack(puzzle: Puzzle, corner_file: int, king_files: list[int], nb_pieces: int) -> bool:
     back_rank = 7 if puzzle.pov else 0
-    init_board = puzzle.mainline[0].board()
+    init_board = puzzle.mainline[0].board
     king_square = init_board.king(not puzzle.pov)
     if (
         not king_square
         or square_rank(king_square) != back_rank
         or square_file(king_square) not in king_files
         or len(init_board.piece_map()) < nb_pieces
-        or not any(node.board().is_check() for node in puzzle.mainline[1::2])
+        or not any(node.is_check for node in puzzle.mainline[1::2])
     ):
         return False
     score = 0
     corner = chess.square(corner_file, back_rank)
     for node in puzzle.mainline[1::2]:
         corner_dist = square_distance(corner, node.move.to_square)
-        if node.board().is_check():
+        if node.is_check:
             score += 1
-        if util.is_capture(node) and corner_dist <= 3:
+        if node.is_capture and corner_dist <= 3:
             score += 1
         elif corner_dist >= 5:
             score -= 1
@@ -575,30 +571,28 @@ def side_attack(puzzle: Puzzle, corner_file: int, king_files: list[int], nb_piec
 
 
 def clearance(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        board = node.board()
-        if not node.parent.board().piece_at(node.move.to_square):
-            piece = board.piece_at(node.move.to_square)
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        if not node.board_before.piece_at(node.move.to_square):
+            piece = node.board.piece_at(node.move.to_square)
             if piece and piece.piece_type in util.ray_piece_types:
-                prev = node.parent.parent
-                assert prev
+                prev = line[i - 2]
                 prev_move = prev.move
-                assert prev_move
-                assert isinstance(node.parent, ChildNode)
                 if (
                     not prev_move.promotion
                     and prev_move.to_square != node.move.from_square
                     and prev_move.to_square != node.move.to_square
-                    and not node.parent.board().is_check()
-                    and (not board.is_check() or util.moved_piece_type(node.parent) != KING)
+                    and not line[i - 1].is_check
+                    and (not node.is_check or line[i - 1].piece_type != KING)
                 ):
                     if (
                         prev_move.from_square == node.move.to_square
                         or prev_move.from_square in SquareSet.between(node.move.from_square, node.move.to_square)
                     ):
                         if (
-                            (prev.parent and not prev.parent.board().piece_at(prev_move.to_square))
-                            or util.is_in_bad_spot(prev.board(), prev_move.to_square)
+                            not prev.board_before.piece_at(prev_move.to_square)
+                            or util.is_in_bad_spot(prev.board, prev_move.to_square)
                         ):
                             return True
     return False
@@ -607,9 +601,9 @@ def clearance(puzzle: Puzzle) -> bool:
 def en_passant(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
         if (
-            util.moved_piece_type(node) == PAWN
+            node.piece_type == PAWN
             and square_file(node.move.from_square) != square_file(node.move.to_square)
-            and not node.parent.board().piece_at(node.move.to_square)
+            and not node.board_before.piece_at(node.move.to_square)
         ):
             return True
     return False
@@ -617,11 +611,10 @@ def en_passant(puzzle: Puzzle) -> bool:
 
 def collinear(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        moving_piece = util.moved_piece_type(node)
-        if moving_piece not in util.ray_piece_types:
+        if node.piece_type not in util.ray_piece_types:
             continue
-        prev_board = node.parent.board()
-        if util.is_capture(node):
+        prev_board = node.board_before
+        if node.is_capture:
             continue
         from_sq = node.move.from_square
         to_sq = node.move.to_square
@@ -651,7 +644,7 @@ def promotion(puzzle: Puzzle) -> bool:
 
 def under_promotion(puzzle: Puzzle) -> bool:
     for node in puzzle.mainline[1::2]:
-        if node.board().is_checkmate():
+        if node.board.is_checkmate():
             return True if node.move.promotion == KNIGHT else False
         if node.move.promotion and node.move.promotion != QUEEN:
             return True
@@ -659,22 +652,20 @@ def under_promotion(puzzle: Puzzle) -> bool:
 
 
 def capturing_defender(puzzle: Puzzle) -> bool:
-    for node in puzzle.mainline[1::2][1:]:
-        board = node.board()
-        capture = node.parent.board().piece_at(node.move.to_square)
-        assert isinstance(node.parent, ChildNode)
-        if board.is_checkmate() or (
+    line = puzzle.mainline
+    for i in range(3, len(line), 2):
+        node = line[i]
+        capture = node.board_before.piece_at(node.move.to_square)
+        if node.board.is_checkmate() or (
             capture
-            and util.moved_piece_type(node) != KING
-            and util.values[capture.piece_type] <= util.values[util.moved_piece_type(node)]
-            and util.is_hanging(node.parent.board(), capture, node.move.to_square)
-            and node.parent.move.to_square != node.move.to_square
+            and node.piece_type != KING
+            and util.values[capture.piece_type] <= util.values[node.piece_type]
+            and util.is_hanging(node.board_before, capture, node.move.to_square)
+            and line[i - 1].move.to_square != node.move.to_square
         ):
-            prev = node.parent.parent
-            assert isinstance(prev, ChildNode)
-            if not prev.board().is_check() and prev.move.to_square != node.move.from_square:
-                assert prev.parent
-                init_board = prev.parent.board()
+            prev = line[i - 2]
+            if not prev.is_check and prev.move.to_square != node.move.from_square:
+                init_board = prev.board_before
                 defender_square = prev.move.to_square
                 defender = init_board.piece_at(defender_square)
                 if (
@@ -687,11 +678,10 @@ def capturing_defender(puzzle: Puzzle) -> bool:
 
 
 def back_rank_mate(puzzle: Puzzle) -> bool:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
     back_rank = 7 if puzzle.pov else 0
     if board.is_checkmate() and square_rank(king) == back_rank:
         squares = SquareSet.from_square(king + (-8 if puzzle.pov else 8))
@@ -714,15 +704,14 @@ def back_rank_mate(puzzle: Puzzle) -> bool:
 
 
 def anastasia_mate(puzzle: Puzzle) -> bool:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
     if square_file(king) in [0, 7] and square_rank(king) not in [0, 7]:
-        if square_file(node.move.to_square) == square_file(king) and util.moved_piece_type(node) in [QUEEN, ROOK]:
+        if square_file(node.move.to_square) == square_file(king) and node.piece_type in [QUEEN, ROOK]:
             if square_file(king) != 0:
-                board.apply_transform(chess.flip_horizontal)
+                board = board.transform(chess.flip_horizontal)
             king = board.king(not puzzle.pov)
             assert king is not None
             blocker = board.piece_at(king + 1)
@@ -734,12 +723,11 @@ def anastasia_mate(puzzle: Puzzle) -> bool:
 
 
 def hook_mate(puzzle: Puzzle) -> bool:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
-    if util.moved_piece_type(node) == ROOK and square_distance(node.move.to_square, king) == 1:
+    if node.piece_type == ROOK and square_distance(node.move.to_square, king) == 1:
         for rook_defender_square in board.attackers(puzzle.pov, node.move.to_square):
             defender = board.piece_at(rook_defender_square)
             if defender and defender.piece_type == KNIGHT and square_distance(rook_defender_square, king) == 1:
@@ -751,15 +739,14 @@ def hook_mate(puzzle: Puzzle) -> bool:
 
 
 def arabian_mate(puzzle: Puzzle) -> bool:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
     if (
         square_file(king) in [0, 7]
         and square_rank(king) in [0, 7]
-        and util.moved_piece_type(node) == ROOK
+        and node.piece_type == ROOK
         and square_distance(node.move.to_square, king) == 1
     ):
         for knight_square in board.attackers(puzzle.pov, node.move.to_square):
@@ -773,11 +760,10 @@ def arabian_mate(puzzle: Puzzle) -> bool:
 
 
 def boden_or_double_bishop_mate(puzzle: Puzzle) -> TagKind | None:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
     bishop_squares = list(board.pieces(BISHOP, puzzle.pov))
     if len(bishop_squares) < 2:
         return None
@@ -790,16 +776,15 @@ def boden_or_double_bishop_mate(puzzle: Puzzle) -> TagKind | None:
 
 
 def dovetail_mate(puzzle: Puzzle) -> bool:
-    node = puzzle.game.end()
-    board = node.board()
+    node = puzzle.mainline[-1]
+    board = node.board
     king = board.king(not puzzle.pov)
     assert king is not None
-    assert isinstance(node, ChildNode)
     if square_file(king) in [0, 7] or square_rank(king) in [0, 7]:
         return False
     queen_square = node.move.to_square
     if (
-        util.moved_piece_type(node) != QUEEN
+        node.piece_type != QUEEN
         or square_file(queen_square) == square_file(king)
         or square_rank(queen_square) == square_rank(king)
         or square_distance(queen_square, king) > 1
@@ -818,7 +803,7 @@ def dovetail_mate(puzzle: Puzzle) -> bool:
 
 
 def piece_endgame(puzzle: Puzzle, piece_type: PieceType) -> bool:
-    for board in [puzzle.mainline[i].board() for i in [0, 1]]:
+    for board in [puzzle.mainline[i].board for i in [0, 1]]:
         if not board.pieces(piece_type, WHITE) and not board.pieces(piece_type, BLACK):
             return False
         for piece in board.piece_map().values():
@@ -836,11 +821,11 @@ def queen_rook_endgame(puzzle: Puzzle) -> bool:
             and all(p.piece_type in [QUEEN, ROOK, PAWN, KING] for p in pieces)
         )
 
-    return all(test(puzzle.mainline[i].board()) for i in [0, 1])
+    return all(test(puzzle.mainline[i].board) for i in [0, 1])
 
 
 def smothered_mate(puzzle: Puzzle) -> bool:
-    board = puzzle.game.end().board()
+    board = puzzle.mainline[-1].board
     king_square = board.king(not puzzle.pov)
     assert king_square is not None
     for checker_square in board.checkers():
@@ -856,7 +841,7 @@ def smothered_mate(puzzle: Puzzle) -> bool:
 
 
 def mate_in(puzzle: Puzzle) -> TagKind | None:
-    if not puzzle.game.end().board().is_checkmate():
+    if not puzzle.mainline[-1].board.is_checkmate():
         return None
     moves_to_mate = len(puzzle.mainline) // 2
     if moves_to_mate == 1:
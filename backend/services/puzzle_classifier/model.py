@@ -1,8 +1,8 @@
 from dataclasses import dataclass, field
 from typing import List, Literal
 
-from chess import Color
-from chess.pgn import ChildNode, Game
+from chess import Board, Color, Move, PieceType
+from chess.pgn import Game
 
 
 TagKind = Literal[
@@ -67,14 +67,41 @@ TagKind = Literal[
 ]
 
 
+@dataclass
+class Ply:
+    """One move of a puzzle's mainline and what the detectors ask about it,
+    worked out once instead of replaying the line from its start on every
+    `node.board()`. Boards are shared by all detectors: copy before changing one."""
+
+    move: Move
+    board_before: Board
+    board: Board
+    piece_type: PieceType  # on the destination square, so the promoted piece for a promotion
+    is_capture: bool
+    is_check: bool
+
+
+def mainline_plies(game: Game) -> List[Ply]:
+    plies = []
+    board = game.board()
+    for move in game.mainline_moves():
+        after = board.copy(stack=False)
+        after.push(move)
+        piece_type = after.piece_type_at(move.to_square)
+        assert piece_type
+        plies.append(Ply(move, board, after, piece_type, board.is_capture(move), after.is_check()))
+        board = after
+    return plies
+
+
 @dataclass
 class Puzzle:
     id: str
     game: Game
     cp: int
     pov: Color = field(init=False)
-    mainline: List[ChildNode] = field(init=False)
+    mainline: List[Ply] = field(init=False)
 
     def __post_init__(self) -> None:
         self.pov = not self.game.turn()
-        self.mainline = list(self.game.mainline())
+        self.mainline = mainline_plies(self.game)
@@ -20,9 +20,27 @@ def classify_puzzle_candidate(
 
     for uci in solution_uci:
         move = Move.from_uci(uci)
-        if move not in node.board().legal_moves:
+        if move not in board.legal_moves:
             raise ValueError(f"Illegal puzzle line move: {uci}")
+        board.push(move)
         node = node.add_main_variation(move)
 
     puzzle = Puzzle(id=puzzle_id, game=node.game(), cp=int(cp or 0))
     return list(dict.fromkeys(cook(puzzle)))
+
+
+def classify_puzzle_batch(
+    candidates: list[tuple[str, str, list[str], int | None]],
+) -> list[tuple[list[str] | None, Exception | None]]:
+    """classify_puzzle_candidate over (puzzle_id, start_fen, solution_uci, cp)
+    tuples, for a worker process: each result is (tags, None), or (None, the
+    exception) so one bad line does not lose the rest of the batch."""
+    results = []
+    for puzzle_id, start_fen, solution_uci, cp in candidates:
+        try:
+            tags = classify_puzzle_candidate(puzzle_id=puzzle_id, start_fen=start_fen, solution_uci=solution_uci, cp=cp)
+        except Exception as exc:
+            results.append((None, exc))
+        else:
+            results.append((tags, None))
+    return results
@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple, TypeVar
+from typing import List, Tuple, TypeVar
 
 import chess
 from chess import (
@@ -16,7 +16,8 @@ from chess import (
     square_file,
     square_rank,
 )
-from chess.pgn import ChildNode
+
+from .model import Ply
 
 
 A = TypeVar("A")
@@ -27,49 +28,30 @@ def pp(a: A, msg=None) -> A:
     return a
 
 
-def moved_piece_type(node: ChildNode) -> chess.PieceType:
-    pt = node.board().piece_type_at(node.move.to_square)
-    assert pt
-    return pt
-
-
-def is_advanced_pawn_move(node: ChildNode) -> bool:
+def is_advanced_pawn_move(node: Ply) -> bool:
     if node.move.promotion:
         return True
-    if moved_piece_type(node) != chess.PAWN:
+    if node.piece_type != chess.PAWN:
         return False
     to_rank = square_rank(node.move.to_square)
-    return to_rank < 3 if node.turn() else to_rank > 4
+    return to_rank < 3 if node.board.turn else to_rank > 4
 
 
-def is_very_advanced_pawn_move(node: ChildNode) -> bool:
+def is_very_advanced_pawn_move(node: Ply) -> bool:
     if not is_advanced_pawn_move(node):
         return False
     to_rank = square_rank(node.move.to_square)
-    return to_rank < 2 if node.turn() else to_rank > 5
+    return to_rank < 2 if node.board.turn else to_rank > 5
 
 
-def is_king_move(node: ChildNode) -> bool:
-    return moved_piece_type(node) == chess.KING
+def is_king_move(node: Ply) -> bool:
+    return node.piece_type == chess.KING
 
 
-def is_castling(node: ChildNode) -> bool:
+def is_castling(node: Ply) -> bool:
     return is_king_move(node) and square_distance(node.move.from_square, node.move.to_square) > 1
 
 
-def is_capture(node: ChildNode) -> bool:
-    return node.parent.board().is_capture(node.move)
-
-
-def next_node(node: ChildNode) -> Optional[ChildNode]:
-    return node.variations[0] if node.variations else None
-
-
-def next_next_node(node: ChildNode) -> Optional[ChildNode]:
-    nn = next_node(node)
-    return next_node(nn) if nn else None
-
-
 values = {PAWN: 1, KNIGHT: 3, BISHOP: 3, ROOK: 5, QUEEN: 9}
 king_values = {PAWN: 1, KNIGHT: 3, BISHOP: 3, ROOK: 5, QUEEN: 9, KING: 99}
 ray_piece_types = [QUEEN, ROOK, BISHOP]
@@ -144,6 +126,7 @@ def is_trapped(board: Board, square: Square) -> bool:
         return False
     if not is_in_bad_spot(board, square):
         return False
+    board = board.copy(stack=False)  # escapes are tried on it, and the caller's may be shared
     for escape in board.legal_moves:
         if escape.from_square == square:
             capturing = board.piece_at(escape.to_square)
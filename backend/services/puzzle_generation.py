@@ -0,0 +1,184 @@
+"""Puzzle generation over all of a user's analysed games (POST /puzzles/generate).
+
+Finding each game's candidate is a quick scan of its stored mistakes; tagging
+it (puzzle_classifier's cook) replays the solution line through dozens of
+motif detectors and is where the time goes. So candidates are extracted
+here, and only plain (id, FEN, UCI line, cp) tuples are sent to a process
+pool sized to the cores, in a few chunks per process. The tagged puzzles are
+written back with one upsert.
+
+Each game is stamped with the analysed_at of the analysis it was looked at
+for, so later calls only process games that are new or re-analysed since;
+force=True looks at every analysed game again.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from uuid import UUID
+
+from core.config import settings
+from db.models import UserGame
+from db.repositories import GameMoveRepository, UserGameRepository, UserPuzzleRepository
+from services.puzzle_candidates import PuzzleCandidate, extract_puzzle_candidate
+from services.puzzle_classifier import classify_puzzle_batch
+
+# Fewer candidates than this are tagged in-process; starting the pool costs more
+INLINE_MAX = 16
+CHUNKS_PER_WORKER = 4
+MAX_ERRORS = 20
+
+_executors: dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def puzzle_workers() -> int:
+    return settings.PUZZLE_WORKERS or os.cpu_count() or 1
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """The shared tagging pool of this size, started on first use. Workers are
+    spawned, not forked, as the API process has threads and open connections."""
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executors[workers]
+
+
+def _drop_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next _pool call starts a fresh one."""
+    with _executors_lock:
+        if _executors.get(workers) is pool:
+            del _executors[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools() -> None:
+    """Stop the tagging pools' workers (on API shutdown)."""
+    with _executors_lock:
+        pools = list(_executors.values())
+        _executors.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+
+def classify_candidates(
+    candidates: list[tuple[str, str, list[str], Optional[int]]], workers: Optional[int] = None,
+) -> list[tuple[Optional[list[str]], Optional[Exception]]]:
+    """classify_puzzle_batch over the pool, results in input order. If a
+    worker dies the batch is retried once on a fresh pool."""
+    workers = workers or puzzle_workers()
+    if len(candidates) <= INLINE_MAX or workers == 1:
+        return classify_puzzle_batch(candidates)
+    size = -(-len(candidates) // (workers * CHUNKS_PER_WORKER))
+    chunks = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+    for attempt in range(2):
+        pool = _pool(workers)
+        try:
+            return [result for chunk in pool.map(classify_puzzle_batch, chunks) for result in chunk]
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash); the pool is unusable from now on
+            _drop_pool(workers, pool)
+            if attempt:
+                raise
+            logger.warning("Puzzle tagging pool broke, retrying on a new one")
+
+
+def puzzle_row(user_id: UUID, game: UserGame, candidate: PuzzleCandidate, raw_tags: list[str]) -> dict[str, Any]:
+    """The user_puzzles columns for a game's tagged candidate."""
+    return {
+        "user_id": user_id,
+        "game_id": game.game_id,
+        "end_time": game.end_time,
+        "start_fen": candidate.start_fen,
+        "source_half_move_index": candidate.source_half_move_index,
+        "played_move": candidate.played_move,
+        "best_move": candidate.best_move,
+        "solution_uci": candidate.solution_uci,
+        "cp": candidate.cp,
+        "raw_tags": raw_tags,
+        "normalized_tags": [],
+        "candidate_score": candidate.candidate_score,
+        "status": "classified",
+    }
+
+
+@dataclass
+class GenerationResult:
+    total: int = 0  # games processed
+    generated: int = 0
+    skipped: int = 0  # no candidate, or its line is not legal
+    failed: int = 0
+    up_to_date: int = 0  # games not processed, already done for their current analysis
+    errors: list[str] = field(default_factory=list)
+
+    def error(self, game_id: UUID, exc: Exception) -> bool:
+        """Count a game that produced no puzzle. True if it was skipped, so
+        there is nothing to retry until it is re-analysed."""
+        skipped = isinstance(exc, ValueError)
+        if skipped:
+            self.skipped += 1
+        else:
+            self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"{game_id}: {exc}")
+        return skipped
+
+
+def generate_all_puzzles(
+    user_id: UUID,
+    user_game_repo: UserGameRepository,
+    game_move_repo: GameMoveRepository,
+    user_puzzle_repo: UserPuzzleRepository,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> GenerationResult:
+    """Extract, tag and store the puzzle candidate of each of a user's analysed
+    games not yet processed for their current analysis (every one with force)."""
+    games = user_game_repo.get_for_puzzles(user_id, force=force)
+    result = GenerationResult(total=len(games))
+    if not force:
+        result.up_to_date = user_game_repo.count_analysed_by_user_id(user_id) - len(games)
+    if not games:
+        return result
+
+    sources_by_game: dict = defaultdict(list)
+    game_ids = None if force else [game.game_id for game in games]
+    for row in game_move_repo.get_puzzle_sources(user_id, game_ids=game_ids):
+        sources_by_game[row.GameMove.game_id].append(row)
+
+    # Failed games are left unstamped to be tried again next time
+    stamps = {game.game_id: game.analysed_at for game in games}
+    found: list[tuple[UserGame, PuzzleCandidate]] = []
+    for game in games:
+        try:
+            found.append((game, extract_puzzle_candidate(game, sources_by_game[game.game_id])))
+        except Exception as exc:
+            if not result.error(game.game_id, exc):
+                del stamps[game.game_id]
+
+    tagged = classify_candidates(
+        [
+            (f"{game.game_id}:{c.source_half_move_index}", c.start_fen, c.solution_uci, c.cp)
+            for game, c in found
+        ],
+        workers,
+    )
+    rows = []
+    for (game, candidate), (raw_tags, exc) in zip(found, tagged):
+        if exc is not None:
+            if not result.error(game.game_id, exc):
+                del stamps[game.game_id]
+            continue
+        rows.append(puzzle_row(user_id, game, candidate, raw_tags))
+    user_game_repo.stage_puzzle_stamps(stamps)
+    user_puzzle_repo.upsert_many(rows)  # commits the stamps with the puzzles
+    result.generated = len(rows)
+    return result
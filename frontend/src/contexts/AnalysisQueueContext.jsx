@@ -1,9 +1,15 @@
-import React, { createContext, useContext, useState, useCallback, useRef } from 'react'
+import React, { createContext, useContext, useState, useCallback, useEffect, useRef } from 'react'
 import { analyzeFullGame, WORKER_COUNT } from '../engine/analyzeFullGame'
-import { saveGameAnalysis } from '../services/games'
+import { getGame, saveGameAnalyses, saveGameAnalysesOnUnload } from '../services/games'
 
 const AnalysisQueueContext = createContext(null)
 
+// Finished analyses are saved in batches of up to this many: at once when no
+// other analysis is running, else after SAVE_DEBOUNCE_MS, and when the page
+// is closed or reloaded
+const SAVE_BATCH_SIZE = 8
+const SAVE_DEBOUNCE_MS = 2000
+
 export function useAnalysisQueue() {
   const ctx = useContext(AnalysisQueueContext)
   if (!ctx) throw new Error('useAnalysisQueue must be used within AnalysisQueueProvider')
@@ -24,6 +30,43 @@ export function AnalysisQueueProvider({ children }) {
   const seenIdsRef = useRef(new Set())
   const activeSessionsRef = useRef(new Set())
   const processingRef = useRef(false)
+  const pendingSavesRef = useRef([])
+  const saveTimerRef = useRef(null)
+
+  const flushSaves = useCallback(async () => {
+    clearTimeout(saveTimerRef.current)
+    saveTimerRef.current = null
+    const batch = pendingSavesRef.current.splice(0)
+    if (batch.length === 0) return
+    try {
+      const { results } = await saveGameAnalyses(batch)
+      const failed = results.filter((r) => r.status !== 'saved' && r.status !== 'duplicate')
+      for (const r of failed) {
+        console.error(`[Queue] Saving analysis of game ${r.game_id} failed: ${r.status}`)
+      }
+      if (failed.length > 0) {
+        setError({ gameId: failed[0].game_id, message: `Saving analysis failed (${failed[0].status})` })
+      }
+    } catch (err) {
+      console.error(`[Queue] Saving ${batch.length} analyses failed:`, err)
+      setError({ gameId: batch[0].game_id, message: err.message })
+    }
+  }, [])
+
+  useEffect(() => {
+    const saveOnUnload = () => {
+      clearTimeout(saveTimerRef.current)
+      saveTimerRef.current = null
+      const batch = pendingSavesRef.current.splice(0)
+      if (batch.length > 0) saveGameAnalysesOnUnload(batch)
+    }
+    window.addEventListener('pagehide', saveOnUnload)
+    window.addEventListener('beforeunload', saveOnUnload)
+    return () => {
+      window.removeEventListener('pagehide', saveOnUnload)
+      window.removeEventListener('beforeunload', saveOnUnload)
+    }
+  }, [])
 
   const processQueue = useCallback(async () => {
     if (pausedRef.current) return
@@ -51,7 +94,9 @@ export function AnalysisQueueProvider({ children }) {
         try {
           console.log(`[Queue] Worker ${workerId} → game ${game.game_id}`)
 
-          const result = await analyzeFullGame(game.pgn, {
+          // The games list leaves PGNs out, so fetch each game's as it comes up
+          const pgn = game.pgn ?? (await getGame(game.game_id)).pgn
+          const result = await analyzeFullGame(pgn, {
             signal: abortController.signal,
             gameId: game.game_id,
             workerId,
@@ -73,13 +118,20 @@ export function AnalysisQueueProvider({ children }) {
             `[Analysis] Worker ${workerId} finished game ${game.game_id} — ${numMoves} moves in ${elapsed}s (${perMove}s/move; ${timingBreakdown})`
           )
 
-          await saveGameAnalysis(game.game_id, {
+          pendingSavesRef.current.push({
+            game_id: game.game_id,
             analysed_game: { moves: result.moves, summary: result.summary },
             white_accuracy: result.summary.white_accuracy,
             black_accuracy: result.summary.black_accuracy,
             user_blunder_count:
               result.summary.white_blunders + result.summary.black_blunders,
           })
+          // This worker still counts as running
+          if (pendingSavesRef.current.length >= SAVE_BATCH_SIZE || runningRef.current <= 1) {
+            await flushSaves()
+          } else if (!saveTimerRef.current) {
+            saveTimerRef.current = setTimeout(flushSaves, SAVE_DEBOUNCE_MS)
+          }
 
           setCompletedCount((c) => c + 1)
         } catch (err) {
@@ -103,12 +155,14 @@ export function AnalysisQueueProvider({ children }) {
     await Promise.all(
       Array.from({ length: workerCount }, (_, i) => runWorker(i))
     )
+    // Analyses finished before the queue emptied, paused or was cancelled
+    await flushSaves()
 
     abortRef.current = null
     setIsProcessing(false)
     setActiveWorkers(0)
     console.log('[Queue] All workers finished')
-  }, [])
+  }, [flushSaves])
 
   const enqueueGames = useCallback((games) => {
     const newGames = games.filter(
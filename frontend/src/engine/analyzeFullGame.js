@@ -1,5 +1,6 @@
 import { Chess } from 'chess.js'
 import { createAnalysisSession } from './stockfishAnalysis'
+import api from '../services/api'
 
 export const BATCH_DEPTH = 13
 export const WORKER_COUNT = Math.max(1, (navigator.hardwareConcurrency || 2) - 2)
@@ -9,6 +10,7 @@ const FULL_GAME_MULTI_PV = 1
 const fenCache = new Map()
 let cacheHits = 0
 let cacheMisses = 0
+let serverCacheHits = 0
 
 // Lichess winning chances: sigmoid mapping cp → [-1, 1]
 // Constant from https://github.com/lichess-org/lila/blob/master/modules/analyse/src/main/WinPercent.scala
@@ -45,6 +47,35 @@ function moveAccuracy(cpLoss) {
   return Math.max(0, 103.1668 * Math.exp(-0.04354 * Math.abs(cpLoss)) - 3.1668)
 }
 
+/**
+ * Ask the server for evals of these positions already searched (by anyone) to
+ * at least BATCH_DEPTH. Returns a FEN → result map; empty if the lookup fails,
+ * in which case every position is analysed locally.
+ */
+async function lookupServerEvals(fens) {
+  const found = new Map()
+  if (fens.length === 0) return found
+  try {
+    const { data } = await api.post('/evals/lookup', {
+      fens,
+      depth: BATCH_DEPTH,
+      multipv: FULL_GAME_MULTI_PV,
+    })
+    data.results.forEach((result, i) => {
+      if (result) {
+        found.set(fens[i], {
+          evaluation: result.evaluation,
+          best_move: result.best_move,
+          top_lines: result.top_lines,
+        })
+      }
+    })
+  } catch (e) {
+    console.warn(`[Cache] Server eval lookup failed (${e.message}) — analysing locally`)
+  }
+  return found
+}
+
 function nowMs() {
   if (globalThis.performance?.now) return globalThis.performance.now()
   return Date.now()
@@ -99,7 +130,9 @@ export async function analyzeFullGame(pgn, { onProgress, signal, gameId, workerI
     const engineStart = nowMs()
     const evals = []
     let gameCacheHits = 0
+    let gameServerCacheHits = 0
     let gameCacheMisses = 0
+    const serverEvals = await lookupServerEvals([...new Set(fens.filter((fen) => !fenCache.has(fen)))])
 
     for (let i = 0; i < fens.length; i++) {
       if (signal?.aborted) throw new Error('Analysis cancelled')
@@ -110,6 +143,12 @@ export async function analyzeFullGame(pgn, { onProgress, signal, gameId, workerI
         cacheHits++
         gameCacheHits++
         console.log(`[Cache] ${label} HIT position ${i + 1}/${fens.length} (${gameId || '?'})`)
+      } else if (serverEvals.has(fens[i])) {
+        const result = serverEvals.get(fens[i])
+        fenCache.set(fens[i], result)
+        evals.push(result)
+        serverCacheHits++
+        gameServerCacheHits++
       } else {
         if (gameId) {
           console.log(`[Pool] ${label} → position ${i + 1}/${fens.length} (${gameId})`)
@@ -124,7 +163,7 @@ export async function analyzeFullGame(pgn, { onProgress, signal, gameId, workerI
     }
     const engineMs = nowMs() - engineStart
     console.log(
-      `[Cache] Game ${gameId || '?'} — ${gameCacheHits} hits / ${gameCacheMisses} misses (${fenCache.size} cached positions, ${cacheHits} total hits / ${cacheMisses} total misses)`
+      `[Cache] Game ${gameId || '?'} — ${gameCacheHits} hits, ${gameServerCacheHits} server hits / ${gameCacheMisses} misses (${fenCache.size} cached positions, ${cacheHits} total hits, ${serverCacheHits} server hits / ${cacheMisses} total misses)`
     )
 
     // Build move-by-move analysis
@@ -203,6 +242,7 @@ export async function analyzeFullGame(pgn, { onProgress, signal, gameId, workerI
       msPerMove: roundTiming(totalMs / moves.length),
       msPerPosition: roundTiming(totalMs / fens.length),
       cacheHits: gameCacheHits,
+      serverCacheHits: gameServerCacheHits,
       cacheMisses: gameCacheMisses,
     }
 
@@ -82,11 +82,13 @@ function Puzzles() {
 
     try {
       const result = await generatePuzzles()
-      if (!result.total) {
+      if (!result.total && result.up_to_date) {
+        setGenerationSummary(`Your puzzles are up to date with all ${result.up_to_date} analysed game${result.up_to_date === 1 ? '' : 's'}. Analyse new games to get more.`)
+      } else if (!result.total) {
         setGenerationSummary('No analysed games are ready yet. Analyse a few games first, then generate puzzles here.')
       } else {
         const parts = [
-          `Generated ${result.generated} puzzle candidate${result.generated === 1 ? '' : 's'} from ${result.total} analysed game${result.total === 1 ? '' : 's'}.`,
+          `Generated ${result.generated} puzzle candidate${result.generated === 1 ? '' : 's'} from ${result.total} new or re-analysed game${result.total === 1 ? '' : 's'}.`,
         ]
         if (result.skipped) {
           parts.push(`Skipped ${result.skipped} game${result.skipped === 1 ? '' : 's'} without a clear tactical candidate.`)
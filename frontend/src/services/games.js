@@ -1,18 +1,47 @@
-import api from './api'
+import api, { API_BASE_URL, getToken } from './api'
 
+const IMPORT_POLL_INTERVAL_MS = 1000
+
+/**
+ * All of the user's games (without PGNs), newest first, following the
+ * list's cursors page by page.
+ */
 export const fetchGames = async (timeframe, timeClass) => {
   const params = {}
   if (timeframe) params.timeframe = timeframe
   if (timeClass) params.time_class = timeClass
-  const response = await api.get('/games', { params })
+  const games = []
+  let cursor = null
+  do {
+    const response = await api.get('/games', { params: cursor ? { ...params, cursor } : params })
+    games.push(...response.data.games)
+    cursor = response.data.next_cursor
+  } while (cursor)
+  return { games, total: games.length }
+}
+
+export const getImportJob = async (jobId) => {
+  const response = await api.get(`/games/import/${jobId}`)
   return response.data
 }
 
+/**
+ * Start a Chess.com import and wait for the background job to finish.
+ * Resolves with the final job ({ status, games_added, ... }).
+ */
 export const fetchFromChessCom = async ({ timeframe, gameTypes = ['rapid', 'blitz', 'bullet'] } = {}) => {
   const payload = { game_types: gameTypes }
   if (timeframe) payload.timeframe = timeframe
   const response = await api.post('/games/import', payload)
-  return response.data
+  let job = response.data
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise((resolve) => setTimeout(resolve, IMPORT_POLL_INTERVAL_MS))
+    job = await getImportJob(job.job_id)
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.errors?.[0] || 'Import from Chess.com failed')
+  }
+  return job
 }
 
 export const getGame = async (gameId) => {
@@ -25,6 +54,33 @@ export const saveGameAnalysis = async (gameId, data) => {
   return response.data
 }
 
+// Each entry is a saveGameAnalysis body plus its game_id; returns per-game statuses
+export const saveGameAnalyses = async (analyses) => {
+  const response = await api.patch('/games/analysis:batch', { games: analyses })
+  return response.data
+}
+
+/**
+ * Save analyses while the page is being closed or reloaded. A keepalive
+ * fetch outlives the page (axios' XHR does not); browsers cap such bodies
+ * at 64 KB in total, so each analysis goes in its own request and as many
+ * as fit get through.
+ */
+export const saveGameAnalysesOnUnload = (analyses) => {
+  const token = getToken()
+  for (const analysis of analyses) {
+    fetch(`${API_BASE_URL}/games/analysis:batch`, {
+      method: 'PATCH',
+      keepalive: true,
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ games: [analysis] }),
+    }).catch(() => {})
+  }
+}
+
 export const fetchCommonMistakes = async (timeframe, timeClass) => {
   const params = {}
   if (timeframe) params.timeframe = timeframe
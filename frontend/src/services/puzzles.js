@@ -1,8 +1,15 @@
 import api from './api'
 
+/** All of the user's puzzles, following the list's cursors page by page. */
 export const getPuzzles = async (params = {}) => {
-  const response = await api.get('/puzzles', { params })
-  return response.data
+  const puzzles = []
+  let cursor = null
+  do {
+    const response = await api.get('/puzzles', { params: cursor ? { ...params, cursor } : params })
+    puzzles.push(...response.data.puzzles)
+    cursor = response.data.next_cursor
+  } while (cursor)
+  return { puzzles, total: puzzles.length }
 }
 
 export const getPuzzle = async (puzzleId) => {
@@ -10,8 +17,8 @@ export const getPuzzle = async (puzzleId) => {
   return response.data
 }
 
-export const generatePuzzles = async () => {
-  const response = await api.post('/puzzles/generate')
+export const generatePuzzles = async ({ force = false } = {}) => {
+  const response = await api.post('/puzzles/generate', null, { params: force ? { force: true } : {} })
   return response.data
 }
 